@@ -1,17 +1,62 @@
 from __future__ import annotations
 
-from fastapi import FastAPI
+import threading
+import tracemalloc
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
-from app.api.routes_admin import router as admin_router
-from app.api.routes_chat import router as chat_router
+from app.api.routes_admin import router as admin_router, submit_collection_gc
+from app.api.routes_chat import get_chat_service, router as chat_router
+from app.core.concurrency import ModelBusyError
 from app.core.config import get_settings
-from app.core.logging import setup_logging
+from app.core.logging import get_logger, setup_logging
+from app.core.metrics import enable_snapshots
+from app.rag.jobs import JobConflictError, get_job_manager
+from app.rag.pipeline import collection_gc_due
 
 settings = get_settings()
 setup_logging(settings.log_level)
+logger = get_logger(__name__)
+
+
+def _collect_collections_periodically(stop: threading.Event) -> None:
+    while not stop.wait(settings.collection_gc_interval_s):
+        # Only queue a job when a version is due, so idle ticks neither take the mutation slot nor fill job history.
+        if not collection_gc_due(settings):
+            continue
+        try:
+            submit_collection_gc(get_job_manager(), get_chat_service(), settings)
+        except JobConflictError:
+            # An ingest/reindex holds the slot; try again on the next tick.
+            logger.debug("Skipping collection GC while another index job runs")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    if settings.metrics_dir is not None:
+        # Each uvicorn worker runs its own lifespan, so every worker gets its own snapshot file.
+        enable_snapshots(settings.metrics_dir, "api", settings.metrics_flush_interval_s)
+    if settings.memory_trace_serving and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    if settings.warmup_on_startup:
+        # Runs off the event loop so /health answers while the model loads; /ready reports progress.
+        threading.Thread(target=get_chat_service().warmup, name="warmup", daemon=True).start()
+    stop = threading.Event()
+    if settings.collection_gc_interval_s > 0:
+        threading.Thread(
+            target=_collect_collections_periodically, args=(stop,), name="collection-gc", daemon=True
+        ).start()
+    try:
+        yield
+    finally:
+        stop.set()
 
-app = FastAPI(title=settings.app_name)
+
+app = FastAPI(title=settings.app_name, lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -20,5 +65,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.exception_handler(ModelBusyError)
+def model_busy_handler(request: Request, exc: ModelBusyError) -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after_s)},
+    )
+
+
 app.include_router(chat_router)
 app.include_router(admin_router)
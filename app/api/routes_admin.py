@@ -1,15 +1,30 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Any
+from typing import Any, Literal
 
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
 
 from app.api.routes_chat import get_chat_service
 from app.core.config import get_settings
-from app.rag.chunking import build_chunks, load_chunks_jsonl, write_chunks_jsonl
-from app.rag.ingest.export_reader import ingest_export, load_messages_jsonl, resolve_input_path
-from app.rag.schema import AdminStatsResponse, IngestRequest, ReindexRequest
+from app.core.logging import get_logger
+from app.core.memory import last_reports, process_memory, top_allocations
+from app.core.profiling import list_profiles
+from app.rag.chunk_log import append_tombstone
+from app.rag.ingest.export_reader import resolve_input_path
+from app.rag.jobs import Job, JobConflictError, get_job_manager
+from app.rag.manifest import read_manifest, record_chat_deleted, record_collection_reset, update_manifest
+from app.rag.pipeline import (
+    collect_retired_collections,
+    compact_chunk_log,
+    record_index_points,
+    run_ingest,
+    run_reindex,
+)
+from app.rag.schema import AdminStatsResponse, IngestRequest, JobStatusResponse, ReindexRequest
+
+logger = get_logger(__name__)
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -22,11 +37,16 @@ def _settings():
     return get_settings()
 
 
-@router.post("/ingest")
-def ingest_endpoint(request: IngestRequest) -> dict[str, Any]:
-    settings = _settings()
-    service = _service()
+def _jobs():
+    return get_job_manager()
+
+
+def _conflict(exc: JobConflictError) -> HTTPException:
+    return HTTPException(status_code=409, detail=str(exc))
 
+
+def _ingest_args(request: IngestRequest) -> dict[str, Any]:
+    settings = _settings()
     try:
         input_path = resolve_input_path(settings.raw_data_dir, request.input_path)
     except FileNotFoundError as exc:
@@ -40,86 +60,214 @@ def ingest_endpoint(request: IngestRequest) -> dict[str, Any]:
         if request.exclude_title_keywords is not None
         else settings.exclude_title_keywords_list
     )
+    return {
+        "input_path": input_path,
+        "allowlist_it_only": allowlist_it_only,
+        "exclude_title_keywords": exclude_title_keywords,
+    }
 
-    summary = ingest_export(
-        input_path=input_path,
-        output_messages_path=settings.messages_jsonl_path,
-        allowlist_it_only=allowlist_it_only,
-        exclude_title_keywords=exclude_title_keywords,
-    )
 
-    messages = load_messages_jsonl(settings.messages_jsonl_path)
-    chunks = build_chunks(
-        messages,
-        max_tokens=settings.max_chunk_tokens,
-        overlap_messages=settings.overlap_messages,
+def _reindex_args(request: ReindexRequest) -> dict[str, Any]:
+    settings = _settings()
+    chunks_path = Path(request.chunks_path) if request.chunks_path else settings.chunks_jsonl_path
+    blue_green = request.blue_green if request.blue_green is not None else settings.blue_green_reindex
+    return {"chunks_path": chunks_path, "reset_collection": request.reset_collection, "blue_green": blue_green}
+
+
+def submit_collection_gc(jobs, service, settings) -> Job:
+    """Queue a drop of retired blue/green collections; it holds the mutation slot so it never races a switch."""
+    return jobs.submit("collection_gc", lambda progress: {"dropped": collect_retired_collections(service, settings)})
+
+
+def submit_chunk_compaction(jobs, settings, min_garbage_ratio: float = 0.0) -> Job:
+    """Queue a rewrite of chunks.jsonl without tombstoned chats; it holds the mutation slot like a reindex."""
+    return jobs.submit(
+        "chunk_compaction",
+        lambda progress: compact_chunk_log(settings, min_garbage_ratio=min_garbage_ratio, progress=progress),
     )
-    write_chunks_jsonl(settings.chunks_jsonl_path, chunks)
 
-    service.store.create_collection(reset=False)
-    if chunks:
-        vectors = service.embedder.embed_texts([chunk.text for chunk in chunks])
-        service.store.upsert_chunks(chunks, vectors)
 
-    summary["chunk_count"] = len(chunks)
-    summary["output_chunks_path"] = str(settings.chunks_jsonl_path)
-    return summary
+@router.post("/ingest")
+def ingest_endpoint(request: IngestRequest) -> dict[str, Any]:
+    args = _ingest_args(request)
+    try:
+        with _jobs().exclusive("ingest"):
+            return run_ingest(_service(), _settings(), **args)
+    except JobConflictError as exc:
+        raise _conflict(exc) from exc
 
 
 @router.post("/reindex")
 def reindex_endpoint(request: ReindexRequest) -> dict[str, Any]:
+    args = _reindex_args(request)
+    try:
+        with _jobs().exclusive("reindex"):
+            return run_reindex(_service(), _settings(), **args)
+    except JobConflictError as exc:
+        raise _conflict(exc) from exc
+
+
+@router.post("/jobs/ingest", response_model=JobStatusResponse, status_code=202)
+def submit_ingest_job(request: IngestRequest) -> JobStatusResponse:
+    args = _ingest_args(request)
+    service = _service()
     settings = _settings()
+    try:
+        job = _jobs().submit("ingest", lambda progress: run_ingest(service, settings, progress=progress, **args))
+    except JobConflictError as exc:
+        raise _conflict(exc) from exc
+    return JobStatusResponse(**job.to_dict())
+
+
+@router.post("/jobs/reindex", response_model=JobStatusResponse, status_code=202)
+def submit_reindex_job(request: ReindexRequest) -> JobStatusResponse:
+    args = _reindex_args(request)
     service = _service()
+    settings = _settings()
+    try:
+        job = _jobs().submit("reindex", lambda progress: run_reindex(service, settings, progress=progress, **args))
+    except JobConflictError as exc:
+        raise _conflict(exc) from exc
+    return JobStatusResponse(**job.to_dict())
 
-    chunks_path = Path(request.chunks_path) if request.chunks_path else settings.chunks_jsonl_path
-    chunks = load_chunks_jsonl(chunks_path)
 
-    service.store.create_collection(reset=request.reset_collection)
-    if not chunks:
-        return {
-            "collection_name": settings.collection_name,
-            "indexed_chunks": 0,
-            "message": f"No chunks found at {chunks_path}",
-        }
+@router.post("/jobs/collection-gc", response_model=JobStatusResponse, status_code=202)
+def submit_collection_gc_job() -> JobStatusResponse:
+    try:
+        job = submit_collection_gc(_jobs(), _service(), _settings())
+    except JobConflictError as exc:
+        raise _conflict(exc) from exc
+    return JobStatusResponse(**job.to_dict())
 
-    vectors = service.embedder.embed_texts([chunk.text for chunk in chunks])
-    service.store.upsert_chunks(chunks, vectors)
 
-    return {
-        "collection_name": settings.collection_name,
-        "indexed_chunks": len(chunks),
-        "chunks_path": str(chunks_path),
-    }
+@router.post("/jobs/chunk-compaction", response_model=JobStatusResponse, status_code=202)
+def submit_chunk_compaction_job() -> JobStatusResponse:
+    try:
+        job = submit_chunk_compaction(_jobs(), _settings())
+    except JobConflictError as exc:
+        raise _conflict(exc) from exc
+    return JobStatusResponse(**job.to_dict())
+
+
+@router.get("/jobs", response_model=list[JobStatusResponse])
+def list_jobs_endpoint() -> list[JobStatusResponse]:
+    return [JobStatusResponse(**job.to_dict()) for job in _jobs().list_jobs()]
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatusResponse)
+def job_status_endpoint(job_id: str) -> JobStatusResponse:
+    job = _jobs().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return JobStatusResponse(**job.to_dict())
+
+
+@router.post("/jobs/{job_id}/cancel", response_model=JobStatusResponse)
+def cancel_job_endpoint(job_id: str) -> JobStatusResponse:
+    job = _jobs().cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return JobStatusResponse(**job.to_dict())
 
 
 @router.get("/stats", response_model=AdminStatsResponse)
-def stats_endpoint() -> AdminStatsResponse:
+def stats_endpoint(include_chats: bool = False) -> AdminStatsResponse:
     settings = _settings()
     service = _service()
 
     qdrant_stats = service.store.stats()
-    messages_count = len(load_messages_jsonl(settings.messages_jsonl_path))
-    chunks_count = len(load_chunks_jsonl(settings.chunks_jsonl_path))
+    manifest = read_manifest(settings.manifest_path, settings.messages_jsonl_path, settings.chunks_jsonl_path)
 
     return AdminStatsResponse(
         collection_name=qdrant_stats["collection_name"],
+        serving_collection=qdrant_stats.get("serving_collection"),
         points_count=qdrant_stats["points_count"],
         indexed_vectors_count=qdrant_stats["indexed_vectors_count"],
-        messages_count=messages_count,
-        chunks_count=chunks_count,
+        messages_count=manifest["messages_count"],
+        chunks_count=manifest["chunks_count"],
+        indexed_chunks_count=manifest["indexed_chunks_count"],
+        chat_count=len(manifest["chats"]),
+        index_generation=manifest["index_generation"],
+        date_from=manifest["date_range"]["start"],
+        date_to=manifest["date_range"]["end"],
+        topics=manifest["topics"],
+        bytes=manifest["bytes"],
+        last_ingest=manifest["last_ingest"],
+        last_reindex=manifest["last_reindex"],
+        chats=manifest["chats"] if include_chats else None,
     )
 
 
+@router.get("/memory")
+def memory_endpoint(top_n: int | None = None) -> dict[str, Any]:
+    """Process RSS, resident serving state, top live allocation sites and the last ingest/reindex stage report."""
+    return {
+        "process": process_memory(),
+        "serving": _service().memory_report(),
+        "top_allocations": top_allocations(top_n or _settings().memory_top_n),
+        "last_runs": last_reports(),
+    }
+
+
+@router.get("/profiles")
+def list_profiles_endpoint(limit: int = 50) -> dict[str, Any]:
+    settings = _settings()
+    return {"profile_dir": str(settings.profile_dir), "profiles": list_profiles(settings.profile_dir, limit)}
+
+
+@router.get("/profiles/{profile_id}/{kind}")
+def download_profile_endpoint(profile_id: str, kind: Literal["stats", "collapsed"]) -> FileResponse:
+    path = _settings().profile_dir / f"{profile_id}{'.prof' if kind == 'stats' else '.collapsed'}"
+    if "/" in profile_id or "\\" in profile_id or not path.is_file():
+        raise HTTPException(status_code=404, detail=f"Unknown profile: {profile_id}")
+    return FileResponse(path, filename=path.name)
+
+
 @router.post("/collection/reset")
 def reset_collection_endpoint() -> dict[str, str]:
     settings = _settings()
     service = _service()
-    service.store.create_collection(reset=True)
+    try:
+        with _jobs().exclusive("reset"):
+            service.store.create_collection(reset=True)
+            update_manifest(
+                settings.manifest_path,
+                settings.messages_jsonl_path,
+                settings.chunks_jsonl_path,
+                record_collection_reset,
+            )
+            record_index_points(service.store)
+    except JobConflictError as exc:
+        raise _conflict(exc) from exc
     return {"status": "ok", "collection_name": settings.collection_name}
 
 
 @router.delete("/chats/{chat_id}")
-def delete_chat_endpoint(chat_id: str) -> dict[str, str]:
+def delete_chat_endpoint(chat_id: str) -> dict[str, Any]:
+    settings = _settings()
     service = _service()
-    service.store.delete_by_chat_id(chat_id)
-    return {"status": "ok", "chat_id": chat_id}
+    jobs = _jobs()
+    try:
+        with jobs.exclusive("delete"):
+            service.store.delete_by_chat_id(chat_id)
+            append_tombstone(settings.chunks_jsonl_path, chat_id)
+            manifest = update_manifest(
+                settings.manifest_path,
+                settings.messages_jsonl_path,
+                settings.chunks_jsonl_path,
+                lambda manifest: record_chat_deleted(manifest, chat_id),
+            )
+            record_index_points(service.store)
+    except JobConflictError as exc:
+        raise _conflict(exc) from exc
+
+    # The manifest's running garbage count keeps the request O(1) in corpus size; the job rescans before compacting.
+    compaction_job_id = None
+    garbage = manifest.get("garbage_chunks", 0)
+    if garbage and garbage / (manifest["chunks_count"] + garbage) >= settings.chunk_compaction_garbage_ratio:
+        try:
+            compaction_job_id = submit_chunk_compaction(jobs, settings, settings.chunk_compaction_garbage_ratio).job_id
+        except JobConflictError:
+            # Another job took the slot in between; the next delete (or the admin job) compacts instead.
+            logger.debug("Skipping chunk compaction while another index job runs")
+    return {"status": "ok", "chat_id": chat_id, "compaction_job_id": compaction_job_id}
@@ -1,27 +1,91 @@
 from __future__ import annotations
 
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
-from time import perf_counter
+from time import perf_counter, sleep
+from typing import Any, Callable, Iterator
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 
+from app.core.concurrency import ModelBusyError, ModelGovernor
 from app.core.config import Settings, get_settings
+from app.core.logging import get_logger
+from app.core.metrics import (
+    ASK_DURATION,
+    CONTENT_TYPE,
+    INDEX_CHUNKS,
+    INDEX_GENERATION,
+    INDEX_MESSAGES,
+    render_metrics,
+)
+from app.core.profiling import profiled, should_sample
+from app.core.tracing import RequestTrace, tracing
 from app.rag.answer import AnswerGenerator
+from app.rag.chunk_log import deleted_chats
+from app.rag.chunk_store import source_stamp
 from app.rag.embeddings import LocalEmbedder
+from app.rag.manifest import load_manifest
+from app.rag.message_index import MessageIndex, open_message_index
+from app.rag.pipeline import record_index_points
 from app.rag.qdrant_store import QdrantStore
 from app.rag.retriever import Retriever
-from app.rag.schema import AskRequest, AskResponse, Citation
+from app.rag.schema import (
+    AskBatchItem,
+    AskBatchRequest,
+    AskBatchResponse,
+    AskRequest,
+    AskResponse,
+    ChatMessagesResponse,
+    Citation,
+    NormalizedMessage,
+    RetrievalContext,
+    TimingSpan,
+)
+
+logger = get_logger(__name__)
 
 router = APIRouter()
 
 
+def _citations(contexts: list[RetrievalContext]) -> list[Citation]:
+    return [
+        Citation(
+            chat_id=ctx.chat_id,
+            message_ids=ctx.message_ids,
+            snippet=(ctx.text[:300] + "...") if len(ctx.text) > 300 else ctx.text,
+            score=ctx.score,
+            created_at=ctx.created_at,
+        )
+        for ctx in contexts
+    ]
+
+
+def _sse(event: str, data: dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
 class ChatService:
     def __init__(self, settings: Settings) -> None:
         self.settings = settings
+        self.governor = ModelGovernor(
+            max_concurrency=settings.model_max_concurrency,
+            queue_size=settings.model_queue_size,
+            admission_timeout_s=settings.model_admission_timeout_s,
+            retry_after_s=settings.model_busy_retry_after_s,
+        )
         self.embedder = LocalEmbedder(
             model_name=settings.emb_model_name,
             batch_size=settings.emb_batch_size,
             normalize_embeddings=settings.emb_normalize,
+            backend=settings.emb_backend,
+            onnx_dir=settings.emb_onnx_dir,
+            onnx_quantized=settings.emb_onnx_quantized,
+            intra_op_threads=settings.emb_intra_op_threads,
+            governor=self.governor,
+            server_socket=settings.emb_server_socket,
         )
         self.store = QdrantStore(
             url=settings.qdrant_url,
@@ -31,12 +95,151 @@ class ChatService:
         )
         self.retriever = Retriever(self.embedder, self.store, settings)
         self.answerer = AnswerGenerator(settings)
+        self._message_index_lock = threading.Lock()
+        self._message_index: MessageIndex | None = None
+        self._readiness_lock = threading.Lock()
+        self._readiness: dict[str, dict[str, Any]] = {
+            "embedder": {"status": "pending"},
+            "vector_store": {"status": "pending"},
+        }
 
     def health(self) -> dict[str, str]:
         return {"status": "ok"}
 
+    def _set_readiness(self, component: str, status: str, **details: Any) -> None:
+        with self._readiness_lock:
+            self._readiness[component] = {"status": status, **details}
+
+    def _warmup_delay_s(self, attempt: int) -> float:
+        return min(self.settings.warmup_backoff_s * 2 ** (attempt - 1), self.settings.warmup_max_backoff_s)
+
+    def _warm_component(self, component: str, probe: Callable[[], None]) -> bool:
+        attempts = max(1, self.settings.warmup_retries)
+        for attempt in range(1, attempts + 1):
+            started = perf_counter()
+            try:
+                probe()
+            except Exception as exc:
+                logger.warning("Warm-up of %s failed (attempt %s/%s): %s", component, attempt, attempts, exc)
+                self._set_readiness(component, "failed" if attempt == attempts else "pending", error=str(exc))
+                if attempt < attempts:
+                    sleep(self._warmup_delay_s(attempt))
+                continue
+            self._set_readiness(component, "ready", warmup_ms=round((perf_counter() - started) * 1000, 1))
+            return True
+        return False
+
+    def _keep_probing(self, component: str, probe: Callable[[], None]) -> None:
+        """Re-probe a failed component with capped backoff until it recovers; it stays ``failed`` until then."""
+        attempt = max(1, self.settings.warmup_retries)
+        while True:
+            sleep(self._warmup_delay_s(attempt))
+            attempt += 1
+            started = perf_counter()
+            try:
+                probe()
+            except Exception as exc:
+                logger.warning("Re-probe of %s failed (attempt %s): %s", component, attempt, exc)
+                self._set_readiness(component, "failed", error=str(exc))
+                continue
+            logger.info("%s recovered after %s attempts", component, attempt)
+            self._set_readiness(component, "ready", warmup_ms=round((perf_counter() - started) * 1000, 1))
+            return
+
+    def _probe_embedder(self) -> None:
+        vector = self.embedder.embed_query("warm-up probe")
+        if vector.shape[0] != self.settings.emb_vector_size:
+            raise RuntimeError(
+                f"Embedding dimension {vector.shape[0]} does not match EMB_VECTOR_SIZE={self.settings.emb_vector_size}"
+            )
+
+    def _probe_vector_store(self) -> None:
+        self.store.client.get_collections()
+
+    def warmup(self) -> None:
+        """Load the model, run one probe embedding and open the Qdrant connection.
+
+        Components still failing after ``warmup_retries`` attempts keep being re-probed in the background.
+        """
+        for component, probe in (("embedder", self._probe_embedder), ("vector_store", self._probe_vector_store)):
+            if not self._warm_component(component, probe):
+                threading.Thread(
+                    target=self._keep_probing, args=(component, probe), name=f"reprobe-{component}", daemon=True
+                ).start()
+            elif component == "vector_store":
+                # Seed the index-size gauge once; ingest/reindex/delete/reset keep it current.
+                record_index_points(self.store)
+
+    def refresh_index_gauges(self) -> None:
+        """Update manifest gauges at scrape time; the point count is set by the write paths instead."""
+        manifest = load_manifest(self.settings.manifest_path)
+        if manifest is not None:
+            INDEX_CHUNKS.set(manifest["chunks_count"])
+            INDEX_MESSAGES.set(manifest["messages_count"])
+            INDEX_GENERATION.set(manifest["index_generation"])
+
+    def memory_report(self) -> dict[str, Any]:
+        """Resident serving state: the embedding model and the keyword corpus cache."""
+        return {"embedder": self.embedder.memory_report(), "keyword_corpus": self.retriever.memory_report()}
+
+    def message_index(self) -> MessageIndex | None:
+        """Offset index over messages.jsonl, reopened (rebuilt if missing or stale) when the file changes."""
+        path = self.settings.messages_jsonl_path
+        try:
+            stamp = source_stamp(path)
+        except FileNotFoundError:
+            return None
+        with self._message_index_lock:
+            if self._message_index is None or self._message_index.source != stamp:
+                self._message_index = open_message_index(path)
+            return self._message_index
+
+    def message(self, message_id: str) -> NormalizedMessage | None:
+        index = self.message_index()
+        if index is None:
+            return None
+        # Deleted chats stay in messages.jsonl until compaction; their tombstones hide them until then.
+        return index.message(message_id, exclude_chat_ids=deleted_chats(self.settings.chunks_jsonl_path))
+
+    def chat_messages(self, chat_id: str, around: str | None, window: int) -> ChatMessagesResponse | None:
+        index = self.message_index()
+        if index is None or chat_id in deleted_chats(self.settings.chunks_jsonl_path):
+            return None
+        found = index.chat_window(chat_id, around, window)
+        if found is None:
+            return None
+        messages, total = found
+        return ChatMessagesResponse(chat_id=chat_id, around=around, total=total, messages=messages)
+
+    def readiness(self) -> dict[str, Any]:
+        with self._readiness_lock:
+            components = {name: dict(state) for name, state in self._readiness.items()}
+        ready = all(state["status"] == "ready" for state in components.values())
+        return {"status": "ready" if ready else "not_ready", "components": components}
+
     def ask(self, request: AskRequest) -> AskResponse:
-        started = perf_counter()
+        return self._answer(request, started=perf_counter())
+
+    def _answer(
+        self,
+        request: AskRequest,
+        started: float,
+        vector_results: list[RetrievalContext] | None = None,
+    ) -> AskResponse:
+        with tracing(request.trace or self.settings.trace_requests) as trace:
+            response = self._traced_answer(request, started, vector_results)
+        ASK_DURATION.observe(response.latency_ms / 1000, mode=request.mode or self.settings.mode)
+        if trace is not None:
+            response.timings = [TimingSpan(**item) for item in trace.to_list()]
+            trace.log("ask", latency_ms=round(response.latency_ms, 3), citations=len(response.citations))
+        return response
+
+    def _traced_answer(
+        self,
+        request: AskRequest,
+        started: float,
+        vector_results: list[RetrievalContext] | None,
+    ) -> AskResponse:
         contexts = self.retriever.retrieve(
             question=request.question,
             top_k=request.top_k,
@@ -44,30 +247,142 @@ class ChatService:
             date_from=request.date_from,
             date_to=request.date_to,
             chat_ids=request.chat_ids,
+            vector_results=vector_results,
         )
-        answer, confidence = self.answerer.generate(
+        answer = self.answerer.generate_answer(
             question=request.question,
             contexts=contexts,
             mode=request.mode,
         )
 
-        citations = [
-            Citation(
-                chat_id=ctx.chat_id,
-                message_ids=ctx.message_ids,
-                snippet=(ctx.text[:300] + "...") if len(ctx.text) > 300 else ctx.text,
-                score=ctx.score,
-                created_at=ctx.created_at,
-            )
-            for ctx in contexts
-        ]
-
         latency_ms = (perf_counter() - started) * 1000
         return AskResponse(
-            answer=answer,
-            citations=citations,
-            confidence=confidence,
+            answer=answer.text,
+            citations=_citations(contexts),
+            confidence=answer.confidence,
             latency_ms=latency_ms,
+            fallback_reason=answer.fallback_reason,
+            prompt_tokens=answer.prompt_tokens,
+            prompt_tokens_saved=answer.prompt_tokens_saved,
+        )
+
+    def ask_stream(self, request: AskRequest) -> Iterator[str]:
+        """Retrieve eagerly, then return the Server-Sent Events stream for the answer.
+
+        Retrieval runs before the response starts so a busy model still maps to a 503.
+        Events: ``citations`` once, ``token`` per answer piece, then ``done`` (or ``error``).
+        """
+        started = perf_counter()
+        with tracing(request.trace or self.settings.trace_requests) as trace:
+            contexts = self.retriever.retrieve(
+                question=request.question,
+                top_k=request.top_k,
+                topic=request.topic,
+                date_from=request.date_from,
+                date_to=request.date_to,
+                chat_ids=request.chat_ids,
+            )
+        retrieval_ms = (perf_counter() - started) * 1000
+        return self._stream_events(request, contexts, started, retrieval_ms, trace)
+
+    def _stream_events(
+        self,
+        request: AskRequest,
+        contexts: list[RetrievalContext],
+        started: float,
+        retrieval_ms: float,
+        trace: RequestTrace | None = None,
+    ) -> Iterator[str]:
+        citations = _citations(contexts)
+        yield _sse("citations", {"citations": [c.model_dump() for c in citations]})
+
+        generation_started = perf_counter()
+        first_token_ms: float | None = None
+        try:
+            # The trace is resumed per step only: Starlette may advance this generator in different contexts.
+            with tracing(trace is not None, trace):
+                stream = self.answerer.generate_stream(request.question, contexts, mode=request.mode)
+            while True:
+                with tracing(trace is not None, trace):
+                    piece = next(stream.pieces, None)
+                if piece is None:
+                    break
+                if first_token_ms is None:
+                    first_token_ms = (perf_counter() - started) * 1000
+                yield _sse("token", {"text": piece})
+        except Exception as exc:
+            logger.warning("Streaming answer failed: %s", exc)
+            yield _sse("error", {"detail": str(exc)})
+            return
+
+        latency_ms = (perf_counter() - started) * 1000
+        ASK_DURATION.observe(latency_ms / 1000, mode=request.mode or self.settings.mode)
+        done: dict[str, Any] = {
+            "confidence": stream.confidence,
+            "latency_ms": latency_ms,
+            "fallback_reason": stream.fallback_reason,
+            "prompt_tokens": stream.prompt_tokens,
+            "prompt_tokens_saved": stream.prompt_tokens_saved,
+            "timings_ms": {
+                "retrieval": retrieval_ms,
+                "first_token": first_token_ms,
+                "generation": (perf_counter() - generation_started) * 1000,
+            },
+        }
+        if trace is not None:
+            done["timings"] = trace.to_list()
+            trace.log("ask_stream", latency_ms=round(latency_ms, 3), citations=len(citations))
+        yield _sse("done", done)
+
+    def ask_batch(self, batch: AskBatchRequest) -> AskBatchResponse:
+        """Answer many questions with one embedding call and one Qdrant round trip.
+
+        Answers are generated concurrently; an item that fails carries its error
+        instead of failing the batch. Item latency is measured from batch start.
+        """
+        started = perf_counter()
+        items = batch.items
+        vector_results: list[list[RetrievalContext] | None] = [None] * len(items)
+        try:
+            vector_results = list(
+                self.retriever.vector_search_batch(
+                    [
+                        {
+                            "question": item.question,
+                            "top_k": item.top_k,
+                            "topic": item.topic,
+                            "date_from": item.date_from,
+                            "date_to": item.date_to,
+                            "chat_ids": item.chat_ids,
+                        }
+                        for item in items
+                    ]
+                )
+            )
+        except ModelBusyError:
+            raise
+        except Exception as exc:
+            # Items retry the vector search individually, so one bad filter only fails its own item.
+            logger.warning("Batched vector search failed, searching items one by one: %s", exc)
+
+        def answer_item(index: int) -> AskBatchItem:
+            try:
+                response = self._answer(items[index], started, vector_results=vector_results[index])
+            except Exception as exc:
+                logger.warning("Batch item %s failed: %s", index, exc)
+                return AskBatchItem(index=index, error=str(exc), latency_ms=(perf_counter() - started) * 1000)
+            return AskBatchItem(index=index, response=response, latency_ms=response.latency_ms)
+
+        workers = max(1, min(self.settings.ask_batch_concurrency, len(items)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ask-batch") as executor:
+            results = list(executor.map(answer_item, range(len(items))))
+
+        failed = sum(1 for result in results if result.error is not None)
+        return AskBatchResponse(
+            results=results,
+            succeeded=len(results) - failed,
+            failed=failed,
+            latency_ms=(perf_counter() - started) * 1000,
         )
 
 
@@ -82,6 +397,76 @@ def health() -> dict[str, str]:
     return get_chat_service().health()
 
 
+@router.get("/ready")
+def ready() -> JSONResponse:
+    readiness = get_chat_service().readiness()
+    return JSONResponse(status_code=200 if readiness["status"] == "ready" else 503, content=readiness)
+
+
+@router.get("/metrics")
+def metrics() -> PlainTextResponse:
+    service = get_chat_service()
+    service.refresh_index_gauges()
+    return PlainTextResponse(render_metrics(service.settings.metrics_dir), media_type=CONTENT_TYPE)
+
+
+def _profile_requested(settings: Settings, header: str | None) -> bool:
+    if settings.profile_header and header in ("1", "true"):
+        return True
+    return should_sample(settings.profile_sample_rate)
+
+
 @router.post("/ask", response_model=AskResponse)
-def ask(request: AskRequest) -> AskResponse:
-    return get_chat_service().ask(request)
+def ask(request: AskRequest, x_profile: str | None = Header(default=None)) -> AskResponse:
+    settings = get_settings()
+    if not _profile_requested(settings, x_profile):
+        return get_chat_service().ask(request)
+    with profiled(
+        "ask",
+        settings.profile_dir,
+        settings.profile_interval_ms,
+        settings.profile_keep,
+        question_chars=len(request.question),
+        top_k=request.top_k,
+        filtered=bool(request.topic or request.date_from or request.date_to or request.chat_ids),
+    ) as profile:
+        response = get_chat_service().ask(request)
+        if profile is not None:
+            profile["latency_ms"] = round(response.latency_ms, 3)
+    return response
+
+
+@router.post("/ask/stream")
+def ask_stream(request: AskRequest) -> StreamingResponse:
+    return StreamingResponse(
+        get_chat_service().ask_stream(request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/ask/batch", response_model=AskBatchResponse)
+def ask_batch(request: AskBatchRequest) -> AskBatchResponse:
+    return get_chat_service().ask_batch(request)
+
+
+@router.get("/messages/{message_id}", response_model=NormalizedMessage)
+def get_message(message_id: str) -> NormalizedMessage:
+    message = get_chat_service().message(message_id)
+    if message is None:
+        raise HTTPException(status_code=404, detail=f"Unknown message: {message_id}")
+    return message
+
+
+@router.get("/chats/{chat_id}/messages", response_model=ChatMessagesResponse)
+def get_chat_messages(
+    chat_id: str,
+    around: str | None = None,
+    window: int = Query(default=5, ge=0, le=50),
+) -> ChatMessagesResponse:
+    """Messages of ``chat_id`` in conversation order: ``window`` either side of ``around``, or the first ones."""
+    response = get_chat_service().chat_messages(chat_id, around, window)
+    if response is None:
+        detail = f"Unknown chat: {chat_id}" if around is None else f"Unknown message {around} in chat {chat_id}"
+        raise HTTPException(status_code=404, detail=detail)
+    return response
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+from statistics import median
+from time import perf_counter
+from typing import Any
+
+import numpy as np
+
+from app.bench.embeddings_bench import synthetic_chunk_texts
+from app.core.config import get_settings
+from app.core.logging import setup_logging
+from app.rag.embeddings import LocalEmbedder
+
+_QUERIES = [
+    "How do I run FastAPI with uvicorn?",
+    "Where are the vectors stored?",
+    "How did I fix the docker network timeout?",
+    "Show the SQL for the events table",
+]
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    return float(np.percentile(np.array(values), pct)) if values else 0.0
+
+
+def bench_backend(embedder: LocalEmbedder, queries: int, bulk_texts: list[str]) -> dict[str, Any]:
+    embedder.embed_texts(bulk_texts[: embedder.batch_size])  # load and warm up
+
+    latencies_ms: list[float] = []
+    for idx in range(queries):
+        started = perf_counter()
+        embedder.embed_query(_QUERIES[idx % len(_QUERIES)])
+        latencies_ms.append((perf_counter() - started) * 1000)
+
+    started = perf_counter()
+    vectors = embedder.embed_texts(bulk_texts)
+    bulk_s = perf_counter() - started
+
+    return {
+        "query_latency_ms": {
+            "p50": round(median(latencies_ms), 2),
+            "p95": round(_percentile(latencies_ms, 95), 2),
+        },
+        "bulk_throughput_per_s": round(len(bulk_texts) / bulk_s, 1),
+        "vectors": vectors,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare torch and ONNX embedding backends")
+    parser.add_argument("--queries", type=int, default=200, help="Single-query latency samples per backend")
+    parser.add_argument("--bulk", type=int, default=2000, help="Texts embedded for the throughput run")
+    parser.add_argument("--onnx-dir", default=None, help="Exported model directory (default: EMB_ONNX_DIR)")
+    args = parser.parse_args()
+
+    settings = get_settings()
+    setup_logging(settings.log_level)
+    onnx_dir = Path(args.onnx_dir) if args.onnx_dir else settings.emb_onnx_dir
+    bulk_texts = synthetic_chunk_texts(args.bulk)
+
+    backends = {
+        "torch": LocalEmbedder(settings.emb_model_name, batch_size=settings.emb_batch_size),
+        "onnx": LocalEmbedder(settings.emb_model_name, settings.emb_batch_size, backend="onnx", onnx_dir=onnx_dir),
+        "onnx_int8": LocalEmbedder(
+            settings.emb_model_name,
+            settings.emb_batch_size,
+            backend="onnx",
+            onnx_dir=onnx_dir,
+            onnx_quantized=True,
+        ),
+    }
+
+    report: dict[str, Any] = {}
+    reference: np.ndarray | None = None
+    for name, embedder in backends.items():
+        try:
+            result = bench_backend(embedder, args.queries, bulk_texts)
+        except (FileNotFoundError, ImportError) as exc:
+            report[name] = {"skipped": str(exc)}
+            continue
+        vectors = result.pop("vectors")
+        if reference is None:
+            reference = vectors
+        else:
+            result["min_cosine_vs_first"] = round(float((reference * vectors).sum(axis=1).min()), 4)
+        report[name] = result
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import argparse
+import json
+import random
+from time import perf_counter
+from typing import Any
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.core.logging import setup_logging
+from app.rag.embeddings import LocalEmbedder, length_sorted_batches
+
+_WORDS = (
+    "fastapi uvicorn docker qdrant vector index query python async await retry timeout cache "
+    "postgres schema migration deploy container network socket thread pool batch embed"
+).split()
+
+_CODE_LINES = [
+    "def handler(request: Request) -> Response:",
+    "    payload = await request.json()",
+    "    result = service.run(payload, timeout=30)",
+    "    return JSONResponse(result)",
+    "for idx, row in enumerate(rows):",
+    "    if row.get('status') != 'ok':",
+    "        logger.warning('row %s failed', idx)",
+    "SELECT id, created_at FROM events WHERE chat_id = $1 ORDER BY created_at;",
+]
+
+
+def synthetic_chunk_texts(count: int, long_ratio: float = 0.2, seed: int = 7) -> list[str]:
+    """Mix of short chat turns and long chunks with code blocks, as produced by build_chunks."""
+    rng = random.Random(seed)
+    texts: list[str] = []
+    for _ in range(count):
+        if rng.random() < long_ratio:
+            prose = " ".join(rng.choices(_WORDS, k=rng.randint(60, 160)))
+            code = "\n".join(rng.choices(_CODE_LINES, k=rng.randint(20, 60)))
+            texts.append(f"[assistant | 2024-01-01T00:00:00Z | m]\n{prose}\n```python\n{code}\n```")
+        else:
+            texts.append(f"[user | 2024-01-01T00:00:00Z | m]\n{' '.join(rng.choices(_WORDS, k=rng.randint(4, 30)))}")
+    return texts
+
+
+def padding_overhead(texts: list[str], batches: list[np.ndarray]) -> float:
+    """Padded length over real length, using character length as the token proxy."""
+    lengths = np.fromiter((len(t) for t in texts), dtype=np.int64, count=len(texts))
+    padded = sum(int(lengths[batch].max()) * len(batch) for batch in batches)
+    return padded / max(int(lengths.sum()), 1)
+
+
+def _input_order_embed(embedder: LocalEmbedder, texts: list[str]) -> np.ndarray:
+    # The pre-bucketing implementation, kept here as the baseline.
+    model = embedder._load_model()
+    parts = [
+        model.encode(
+            texts[start : start + embedder.batch_size],
+            batch_size=embedder.batch_size,
+            normalize_embeddings=embedder.normalize_embeddings,
+            show_progress_bar=False,
+            convert_to_numpy=True,
+        )
+        for start in range(0, len(texts), embedder.batch_size)
+    ]
+    return np.vstack(parts).astype(np.float32)
+
+
+def run_benchmark(count: int, batch_size: int, long_ratio: float, with_model: bool) -> dict[str, Any]:
+    settings = get_settings()
+    texts = synthetic_chunk_texts(count, long_ratio=long_ratio)
+    input_order = [np.arange(start, min(start + batch_size, count)) for start in range(0, count, batch_size)]
+    report: dict[str, Any] = {
+        "texts": count,
+        "batch_size": batch_size,
+        "long_ratio": long_ratio,
+        "padding_overhead": {
+            "input_order": round(padding_overhead(texts, input_order), 3),
+            "length_bucketed": round(padding_overhead(texts, length_sorted_batches(texts, batch_size)), 3),
+        },
+    }
+    if not with_model:
+        return report
+
+    embedder = LocalEmbedder(settings.emb_model_name, batch_size=batch_size, normalize_embeddings=True)
+    embedder.embed_texts(texts[:batch_size])  # load and warm up the model
+
+    started = perf_counter()
+    baseline = _input_order_embed(embedder, texts)
+    baseline_s = perf_counter() - started
+
+    started = perf_counter()
+    bucketed = embedder.embed_texts(texts)
+    bucketed_s = perf_counter() - started
+
+    report["throughput_per_s"] = {
+        "input_order": round(count / baseline_s, 1),
+        "length_bucketed": round(count / bucketed_s, 1),
+    }
+    report["speedup"] = round(baseline_s / bucketed_s, 2)
+    report["max_abs_diff"] = float(np.abs(baseline - bucketed).max())
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark input-order vs length-bucketed embedding batches")
+    parser.add_argument("--count", type=int, default=2000, help="Number of synthetic chunk texts")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--long-ratio", type=float, default=0.2, help="Fraction of long code-block chunks")
+    parser.add_argument("--no-model", action="store_true", help="Only report padding overhead")
+    args = parser.parse_args()
+
+    setup_logging(get_settings().log_level)
+    report = run_benchmark(args.count, args.batch_size, args.long_ratio, with_model=not args.no_model)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import argparse
+import copy
+import json
+import sys
+import tempfile
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Callable, Iterator
+
+from app.bench.synthetic_export import ExportSpec, write_export
+from app.core.config import get_settings
+from app.core.logging import setup_logging
+from app.rag.chunking import build_chunks
+from app.rag.ingest.export_reader import _apply_privacy, _read_file
+from app.rag.ingest.normalize import apply_topics
+from app.rag.records import MessageRecord
+
+# Per-stage ingest benchmark on a synthetic export: parse -> redact -> topics -> chunk (-> embed).
+# Each stage reports wall time, items/s and peak/retained traced memory; --baseline flags regressions.
+# The parse stage's retained memory over its message count is the in-memory cost per message.
+
+
+@contextmanager
+def _stage(report: dict[str, Any], name: str, trace_memory: bool) -> Iterator[dict[str, Any]]:
+    entry: dict[str, Any] = {}
+    if trace_memory:
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+    started = perf_counter()
+    yield entry
+    wall_s = perf_counter() - started
+    entry["wall_s"] = round(wall_s, 4)
+    entry["per_s"] = round(entry.get("items", 0) / wall_s, 1) if wall_s > 0 else None
+    if trace_memory:
+        current, peak = tracemalloc.get_traced_memory()
+        entry["peak_mb"] = round((peak - before) / 1_048_576, 2)
+        entry["retained_mb"] = round((current - before) / 1_048_576, 2)
+        if entry.get("items"):
+            entry["retained_bytes_per_item"] = round((current - before) / entry["items"])
+    report["stages"][name] = entry
+
+
+def _traced_bytes(build: Callable[[], Any]) -> int:
+    before, _ = tracemalloc.get_traced_memory()
+    built = build()
+    current, _ = tracemalloc.get_traced_memory()
+    del built
+    return current - before
+
+
+def _bytes_per_message(messages: list[MessageRecord], record_bytes: int) -> dict[str, int]:
+    """Traced bytes per message held as MessageRecords vs NormalizedMessage models.
+
+    ``record_bytes`` is the parse stage's retained memory per message. Models built from the records share
+    their strings, so the model figure swaps the record shells (measured via shallow copies) for the models.
+    """
+    if not messages:
+        return {"records": 0, "models": 0}
+    shells = _traced_bytes(lambda: [copy.copy(message) for message in messages])
+    models = _traced_bytes(lambda: [message.to_model() for message in messages])
+    return {"records": record_bytes, "models": round(record_bytes + (models - shells) / len(messages))}
+
+
+def run_benchmark(
+    export_path: Path,
+    max_chunk_tokens: int,
+    overlap_messages: int,
+    embed_limit: int = 0,
+    trace_memory: bool = True,
+    compare_models: bool = False,
+) -> dict[str, Any]:
+    report: dict[str, Any] = {
+        "export": str(export_path),
+        "export_bytes": export_path.stat().st_size,
+        "tracemalloc": trace_memory,
+        "stages": {},
+    }
+    if trace_memory:
+        tracemalloc.start()
+    started = perf_counter()
+    try:
+        with _stage(report, "parse", trace_memory) as stage:
+            messages = _read_file(export_path)
+            stage["items"] = len(messages)
+        if trace_memory and compare_models:
+            record_bytes = report["stages"]["parse"].get("retained_bytes_per_item", 0)
+            report["bytes_per_message"] = _bytes_per_message(messages, record_bytes)
+
+        with _stage(report, "redact", trace_memory) as stage:
+            stage["items"] = len(messages)
+            messages, stats = _apply_privacy(messages)
+            stage["redactions"] = stats.to_dict()
+
+        with _stage(report, "topics", trace_memory) as stage:
+            messages = apply_topics(messages)
+            stage["items"] = len(messages)
+
+        with _stage(report, "chunk", trace_memory) as stage:
+            stage["items"] = len(messages)
+            chunks = build_chunks(messages, max_tokens=max_chunk_tokens, overlap_messages=overlap_messages)
+            stage["chunks"] = len(chunks)
+
+        if embed_limit:
+            from app.rag.embeddings import LocalEmbedder
+
+            settings = get_settings()
+            embedder = LocalEmbedder(settings.emb_model_name, batch_size=settings.emb_batch_size)
+            texts = [chunk.text for chunk in chunks[:embed_limit]]
+            embedder.embed_texts(texts[: embedder.batch_size])  # model load is not part of the stage
+            with _stage(report, "embed", trace_memory) as stage:
+                stage["items"] = len(embedder.embed_texts(texts))
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+    report["total_wall_s"] = round(perf_counter() - started, 4)
+    return report
+
+
+def compare(report: dict[str, Any], baseline: dict[str, Any], threshold: float) -> list[str]:
+    """Stages whose throughput dropped, or whose peak memory grew, by more than ``threshold`` (0.2 = 20 %)."""
+    regressions: list[str] = []
+    for name, current in report["stages"].items():
+        previous = baseline.get("stages", {}).get(name)
+        if not previous:
+            continue
+        if previous.get("per_s") and current.get("per_s") is not None:
+            change = current["per_s"] / previous["per_s"] - 1
+            if change < -threshold:
+                regressions.append(f"{name}: throughput {previous['per_s']} -> {current['per_s']}/s ({change:+.0%})")
+        if previous.get("peak_mb") and current.get("peak_mb") is not None:
+            change = current["peak_mb"] / previous["peak_mb"] - 1
+            if change > threshold:
+                regressions.append(
+                    f"{name}: peak memory {previous['peak_mb']} -> {current['peak_mb']} MB ({change:+.0%})"
+                )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Per-stage ingest benchmark on a synthetic ChatGPT export")
+    parser.add_argument("--messages", type=int, default=10_000, help="Synthetic export size (1k .. 1M)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--export", default=None, help="Benchmark an existing export instead of generating one")
+    parser.add_argument("--embed", type=int, default=0, help="Also embed the first N chunks (loads the model)")
+    parser.add_argument("--no-tracemalloc", action="store_true", help="Skip memory tracing (faster, cleaner timings)")
+    parser.add_argument(
+        "--compare-models",
+        action="store_true",
+        help="Also report bytes per message when held as NormalizedMessage models",
+    )
+    parser.add_argument("--out", default=None, help="Write the JSON report here")
+    parser.add_argument("--baseline", default=None, help="Compare against a previous JSON report")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Regression threshold (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    settings = get_settings()
+    setup_logging(settings.log_level)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.export:
+            export_path = Path(args.export)
+        else:
+            export_path = Path(tmp) / "synthetic_export.zip"
+            write_export(export_path, ExportSpec(messages=args.messages, seed=args.seed))
+        report = run_benchmark(
+            export_path,
+            max_chunk_tokens=settings.max_chunk_tokens,
+            overlap_messages=settings.overlap_messages,
+            embed_limit=args.embed,
+            trace_memory=not args.no_tracemalloc,
+            compare_models=args.compare_models,
+        )
+    report["messages"] = report["stages"]["parse"]["items"]
+    if not args.export:
+        report["seed"] = args.seed
+
+    regressions: list[str] = []
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        regressions = compare(report, baseline, args.threshold)
+        report["regressions"] = regressions
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n", encoding="utf-8")
+    print(text)
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
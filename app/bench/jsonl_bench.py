@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import tempfile
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Callable
+from uuid import UUID
+
+from app.bench.embeddings_bench import synthetic_chunk_texts
+from app.rag.chunk_store import open_chunk_store, write_chunk_store
+from app.rag.chunking import load_chunks_jsonl, write_chunks_jsonl
+from app.rag.schema import ChunkRecord
+
+# Load time of chunks.jsonl: the previous line-by-line json.loads + model_validate path against the
+# headered orjson format, validated and trusted, and against opening the mmap'd columnar store
+# (plus its fetch-by-id and filter-scan costs).
+
+
+def synthetic_chunks(count: int, seed: int = 7) -> list[ChunkRecord]:
+    rng = random.Random(seed)
+    texts = synthetic_chunk_texts(min(count, 5000), seed=seed)
+    return [
+        ChunkRecord(
+            chunk_id=str(UUID(int=rng.getrandbits(128), version=4)),
+            chat_id=f"chat-{idx // 20}",
+            chat_title=f"notes {idx // 20}",
+            message_ids=[f"m{idx}-{offset}" for offset in range(rng.randint(1, 6))],
+            start_at="2024-01-01T00:00:00Z",
+            end_at="2024-01-01T00:05:00Z",
+            topic=rng.choice(["python", "devops", "fastapi", "database"]),
+            text=texts[idx % len(texts)],
+        )
+        for idx in range(count)
+    ]
+
+
+def _write_legacy(path: Path, chunks: list[ChunkRecord]) -> None:
+    with path.open("w", encoding="utf-8") as f:
+        for chunk in chunks:
+            f.write(chunk.model_dump_json())
+            f.write("\n")
+
+
+def _load_legacy(path: Path) -> list[ChunkRecord]:
+    chunks: list[ChunkRecord] = []
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                chunks.append(ChunkRecord.model_validate(json.loads(line)))
+    return chunks
+
+
+def _timed(fn: Callable[[], Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = perf_counter()
+        fn()
+        best = min(best, perf_counter() - started)
+    return best
+
+
+def run_benchmark(count: int, repeat: int = 3, seed: int = 7) -> dict[str, Any]:
+    chunks = synthetic_chunks(count, seed=seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = Path(tmp) / "legacy.jsonl"
+        fast_path = Path(tmp) / "chunks.jsonl"
+        write_s = {
+            "legacy": _timed(lambda: _write_legacy(legacy_path, chunks), repeat),
+            "orjson": _timed(lambda: write_chunks_jsonl(fast_path, chunks), repeat),
+        }
+        load_s = {
+            "legacy": _timed(lambda: _load_legacy(legacy_path), repeat),
+            "validated": _timed(lambda: load_chunks_jsonl(fast_path, validate=True), repeat),
+            "trusted": _timed(lambda: load_chunks_jsonl(fast_path), repeat),
+        }
+        assert load_chunks_jsonl(fast_path) == chunks
+        file_mb = round(fast_path.stat().st_size / 1_048_576, 1)
+
+        write_s["store"] = _timed(lambda: write_chunk_store(fast_path, chunks), repeat)
+        load_s["store_open"] = _timed(lambda: open_chunk_store(fast_path), repeat)
+        store = open_chunk_store(fast_path)
+        assert store is not None and store.record(count - 1) == chunks[-1]
+        sample = random.Random(seed).sample(chunks, min(1000, count))
+        fetch_s = _timed(lambda: [store.get(chunk.chunk_id) for chunk in sample], repeat)
+        filter_s = _timed(lambda: store.filter_rows(topic="python", chat_ids=["chat-1", "chat-2"]), repeat)
+    return {
+        "chunks": count,
+        "file_mb": file_mb,
+        "write_s": {name: round(value, 3) for name, value in write_s.items()},
+        "load_s": {name: round(value, 3) for name, value in load_s.items()},
+        "load_chunks_per_s": {name: round(count / value) for name, value in load_s.items()},
+        "load_speedup": {name: round(load_s["legacy"] / value, 2) for name, value in load_s.items()},
+        "store_fetch_by_id_us": round(fetch_s / len(sample) * 1e6, 2),
+        "store_filter_ms": round(filter_s * 1000, 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="chunks.jsonl load/write time: legacy vs orjson (validated/trusted) vs the chunk store"
+    )
+    parser.add_argument("--count", type=int, default=500_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    print(json.dumps(run_benchmark(args.count, repeat=args.repeat, seed=args.seed), indent=2))
+
+
+if __name__ == "__main__":
+    main()
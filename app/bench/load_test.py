@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import tempfile
+import zlib
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Callable
+
+import numpy as np
+
+from app.bench.synthetic_export import ExportSpec, write_export
+from app.core.config import Settings, get_settings
+from app.core.logging import setup_logging
+from app.eval.metrics import percentile
+from app.rag.answer import AnswerGenerator
+from app.rag.chunking import load_chunks_jsonl
+from app.rag.ingest.normalize import TOPIC_KEYWORDS
+from app.rag.schema import AskRequest, ChunkRecord
+
+# Load test for /ask: the same question mix is replayed at each concurrency level, either over HTTP
+# against a running API or in-process against ChatService. Offline runs use Qdrant's in-memory or
+# local-path mode, a synthetic corpus and, optionally, a hashing embedder instead of the model.
+
+_QUESTION_TEMPLATES = [
+    "how do I fix the {kw} error after the upgrade",
+    "why does {kw} fail under load",
+    "what did we change in {kw} last time",
+    "{kw} timeout when restarting",
+]
+
+Send = Callable[[AskRequest], bool]
+
+
+class HashEmbedder:
+    """Deterministic bag-of-words vectors (token hashes into signed buckets, L2-normalized); no model load."""
+
+    def __init__(self, dim: int) -> None:
+        self.dim = dim
+
+    def _vector(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token in text.lower().split():
+            digest = zlib.crc32(token.encode("utf-8"))
+            vector[digest % self.dim] += 1.0 if digest & 0x8000_0000 else -1.0
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+    def embed_texts(self, texts: list[str], interactive: bool = False) -> np.ndarray:
+        return np.stack([self._vector(text) for text in texts]) if texts else np.zeros((0, self.dim), np.float32)
+
+    def embed_query(self, text: str) -> np.ndarray:
+        return self._vector(text)
+
+    def embed_queries(self, texts: list[str]) -> np.ndarray:
+        return self.embed_texts(texts)
+
+    def memory_report(self) -> dict[str, Any]:
+        return {"loaded": True, "backend": "hash"}
+
+
+def build_service(settings: Settings, stub_embedder: bool, qdrant: str | None):
+    """ChatService for in-process runs; ``qdrant`` is ``:memory:``, a local directory, or None for ``qdrant_url``."""
+    from qdrant_client import QdrantClient
+
+    from app.api.routes_chat import ChatService
+
+    service = ChatService(settings)
+    if stub_embedder:
+        service.embedder = service.retriever.embedder = HashEmbedder(settings.emb_vector_size)
+    if qdrant == ":memory:":
+        service.store.client = QdrantClient(location=":memory:")
+    elif qdrant:
+        service.store.client = QdrantClient(path=qdrant)
+    return service
+
+
+def seed_index(service, settings: Settings, messages: int, seed: int) -> dict[str, Any]:
+    """Ingest a synthetic export into ``settings.processed_data_dir`` and the service's collection."""
+    from app.rag.pipeline import run_ingest
+
+    export_path = settings.processed_data_dir / "synthetic_export.json"
+    write_export(export_path, ExportSpec(messages=messages, seed=seed))
+    return run_ingest(service, settings, export_path, allowlist_it_only=False, exclude_title_keywords=[])
+
+
+def question_mix(
+    dataset_path: Path | None,
+    chunks: list[ChunkRecord],
+    count: int,
+    seed: int,
+    filter_ratio: float,
+    mode: str | None = None,
+) -> list[AskRequest]:
+    """Eval-dataset questions plus topic-keyword questions; ``filter_ratio`` of them get a random filter."""
+    rng = random.Random(seed)
+    questions: list[str] = []
+    if dataset_path is not None and dataset_path.exists():
+        questions.extend(row["question"] for row in json.loads(dataset_path.read_text(encoding="utf-8")))
+    keywords = sorted({keyword for group in TOPIC_KEYWORDS.values() for keyword in group})
+    questions.extend(template.format(kw=keyword) for template in _QUESTION_TEMPLATES for keyword in keywords)
+
+    topics = sorted({chunk.topic for chunk in chunks if chunk.topic}) or sorted(TOPIC_KEYWORDS)
+    stamps = [chunk.start_at for chunk in chunks if chunk.start_at]
+    requests: list[AskRequest] = []
+    for _ in range(count):
+        fields: dict[str, Any] = {"question": rng.choice(questions), "mode": mode}
+        if rng.random() < filter_ratio:
+            kind = rng.choice(["topic", "date", "top_k"] if stamps else ["topic", "top_k"])
+            if kind == "topic":
+                fields["topic"] = rng.choice(topics)
+            elif kind == "date":
+                center = datetime.fromisoformat(rng.choice(stamps).replace("Z", "+00:00"))
+                fields["date_from"] = (center - timedelta(days=15)).isoformat()
+                fields["date_to"] = (center + timedelta(days=15)).isoformat()
+            else:
+                fields["top_k"] = rng.choice([5, 20, 50])
+        requests.append(AskRequest(**fields))
+    return requests
+
+
+def in_process_sender(service) -> Send:
+    def send(request: AskRequest) -> bool:
+        return AnswerGenerator.is_abstain(service.ask(request).answer)
+
+    return send
+
+
+def http_sender(client, url: str) -> Send:
+    def send(request: AskRequest) -> bool:
+        response = client.post(f"{url.rstrip('/')}/ask", json=request.model_dump(exclude_none=True))
+        response.raise_for_status()
+        return AnswerGenerator.is_abstain(response.json()["answer"])
+
+    return send
+
+
+def _error_key(exc: Exception) -> str:
+    response = getattr(exc, "response", None)
+    status = getattr(response, "status_code", None)
+    return f"http_{status}" if status is not None else type(exc).__name__
+
+
+def run_level(send: Send, requests: list[AskRequest], concurrency: int) -> dict[str, Any]:
+    """Replay ``requests`` on ``concurrency`` threads; latency percentiles cover successful requests only."""
+
+    def one(request: AskRequest) -> tuple[float, str | None, bool]:
+        started = perf_counter()
+        try:
+            abstained = send(request)
+        except Exception as exc:
+            return perf_counter() - started, _error_key(exc), False
+        return perf_counter() - started, None, abstained
+
+    started = perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, requests))
+    wall_s = perf_counter() - started
+
+    latencies_ms = [elapsed * 1000 for elapsed, error, _ in results if error is None]
+    errors = Counter(error for _, error, _ in results if error is not None)
+    answered = len(latencies_ms)
+    return {
+        "concurrency": concurrency,
+        "requests": len(results),
+        "wall_s": round(wall_s, 3),
+        "qps": round(answered / wall_s, 1) if wall_s > 0 else 0.0,
+        "p50_ms": round(percentile(latencies_ms, 50), 2),
+        "p95_ms": round(percentile(latencies_ms, 95), 2),
+        "p99_ms": round(percentile(latencies_ms, 99), 2),
+        "error_rate": round(sum(errors.values()) / len(results), 4) if results else 0.0,
+        "abstain_rate": round(sum(1 for _, error, a in results if error is None and a) / answered, 4)
+        if answered
+        else 0.0,
+        "errors": dict(errors),
+    }
+
+
+def run_load_test(
+    send: Send,
+    requests: list[AskRequest],
+    levels: list[int],
+    warmup: int = 5,
+) -> list[dict[str, Any]]:
+    """One report per concurrency level; a few unmeasured requests first absorb model and corpus loading."""
+    for request in requests[:warmup]:
+        try:
+            send(request)
+        except Exception:
+            pass
+    return [run_level(send, requests, concurrency) for concurrency in levels]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load-test /ask and report latency percentiles and QPS per level")
+    parser.add_argument("--url", default=None, help="Drive a running API over HTTP instead of ChatService in-process")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per concurrency level")
+    parser.add_argument("--dataset", default="app/eval/dataset.example.json", help="Eval dataset for the question mix")
+    parser.add_argument("--filter-ratio", type=float, default=0.3, help="Share of requests with a random filter")
+    parser.add_argument("--mode", choices=["extractive", "llm"], default=None)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--warmup", type=int, default=5, help="Unmeasured requests before the first level")
+    parser.add_argument("--stub-embedder", action="store_true", help="Hash tokens instead of loading the model")
+    parser.add_argument("--qdrant", default=None, help="':memory:' or a local directory instead of QDRANT_URL")
+    parser.add_argument(
+        "--seed-messages",
+        type=int,
+        default=0,
+        help="Index a synthetic export of this size into a scratch collection first (in-process only)",
+    )
+    parser.add_argument("--timeout", type=float, default=30.0, help="HTTP timeout per request")
+    parser.add_argument("--out", default=None, help="Write the JSON report here")
+    args = parser.parse_args()
+
+    settings = get_settings()
+    setup_logging(settings.log_level)
+    levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+    report: dict[str, Any] = {"target": args.url or "in-process", "seed": args.seed}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.url:
+            import httpx
+
+            chunks = load_chunks_jsonl(settings.chunks_jsonl_path)
+            requests = question_mix(Path(args.dataset), chunks, args.requests, args.seed, args.filter_ratio, args.mode)
+            limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+            with httpx.Client(timeout=args.timeout, limits=limits) as client:
+                report["levels"] = run_load_test(http_sender(client, args.url), requests, levels, args.warmup)
+        else:
+            if args.seed_messages:
+                # Keep the scratch corpus away from the real processed files and collection.
+                settings = settings.model_copy(
+                    update={"processed_data_dir": Path(tmp), "collection_name": "load_test_chunks"}
+                )
+            service = build_service(settings, stub_embedder=args.stub_embedder, qdrant=args.qdrant)
+            if args.seed_messages:
+                summary = seed_index(service, settings, args.seed_messages, args.seed)
+                report["seeded_chunks"] = summary["chunk_count"]
+            chunks = load_chunks_jsonl(settings.chunks_jsonl_path)
+            requests = question_mix(Path(args.dataset), chunks, args.requests, args.seed, args.filter_ratio, args.mode)
+            report["embedder"] = "hash" if args.stub_embedder else settings.emb_model_name
+            report["levels"] = run_load_test(in_process_sender(service), requests, levels, args.warmup)
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n", encoding="utf-8")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import zipfile
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
+from html import escape
+from pathlib import Path
+from typing import Any, Iterator
+
+from app.rag.ingest.normalize import TOPIC_KEYWORDS
+
+# Seeded stand-in for a real ChatGPT export: mapping trees with regenerated branches,
+# fenced code, PII-like strings for the redactor, and HTML chats in both layouts the
+# HTML parser understands. Sizes from 1k to 1M messages; conversations are streamed to
+# disk so the generator itself stays small even when the export does not.
+
+_FILLER = (
+    "please explain why the service fails after the upgrade and how to check it step by step "
+    "i tried restarting but the error comes back when the load increases in the evening"
+).split()
+
+_CODE_SNIPPETS = [
+    "def handler(request):\n    payload = request.json()\n    return {'ok': True, 'items': len(payload)}",
+    "docker run --rm -p 8000:8000 -e QDRANT_URL=http://qdrant:6333 rag-api:latest",
+    "SELECT chat_id, count(*) FROM messages WHERE created_at > now() - interval '7 days' GROUP BY 1;",
+    "for attempt in range(5):\n    try:\n        return client.get(url, timeout=3)\n    except TimeoutError:\n"
+    "        time.sleep(2 ** attempt)",
+    "apiVersion: apps/v1\nkind: Deployment\nmetadata:\n  name: api\nspec:\n  replicas: 3",
+]
+
+# Each matches one RedactionStats bucket (emails, phones, tokens, passwords).
+_PII = [
+    "reach me at {name}.dev@example.com",
+    "call +1 (415) 555-{num:04d} after six",
+    "the key was sk-{token}",
+    "password: hunter{num}",
+    "token hf_{token} is in the env file",
+]
+
+
+@dataclass
+class ExportSpec:
+    messages: int = 10_000
+    seed: int = 7
+    messages_per_chat: int = 40
+    branch_ratio: float = 0.1
+    code_ratio: float = 0.2
+    pii_ratio: float = 0.05
+    html_ratio: float = 0.05
+
+
+class _Text:
+    def __init__(self, rng: random.Random, spec: ExportSpec) -> None:
+        self.rng = rng
+        self.spec = spec
+        self.topics = sorted(TOPIC_KEYWORDS)
+
+    def title(self, topic: str) -> str:
+        keyword = self.rng.choice(sorted(TOPIC_KEYWORDS[topic]))
+        return f"{keyword} notes {self.rng.randint(1, 999)}"
+
+    def message(self, topic: str, role: str) -> str:
+        rng = self.rng
+        words = rng.choices(_FILLER, k=rng.randint(8, 60 if role == "assistant" else 25))
+        words.insert(rng.randrange(len(words)), rng.choice(sorted(TOPIC_KEYWORDS[topic])))
+        parts = [" ".join(words)]
+        if role == "assistant" and rng.random() < self.spec.code_ratio:
+            parts.append(f"```\n{rng.choice(_CODE_SNIPPETS)}\n```")
+        if rng.random() < self.spec.pii_ratio:
+            token = "".join(rng.choices("abcdefghijklmnopqrstuvwxyz0123456789", k=24))
+            parts.append(rng.choice(_PII).format(name=rng.choice(_FILLER), num=rng.randint(0, 9999), token=token))
+        return "\n\n".join(parts)
+
+
+def _json_conversation(text: _Text, chat_idx: int, count: int, started: int) -> dict[str, Any]:
+    """One chat as a mapping tree; a share of assistant turns get a regenerated sibling branch."""
+    rng = text.rng
+    topic = rng.choice(text.topics)
+    mapping: dict[str, Any] = {}
+    parent: str | None = None
+    made = 0
+    while made < count:
+        role = "user" if made % 2 == 0 else "assistant"
+        node_id = f"c{chat_idx}-n{made}"
+        mapping[node_id] = {
+            "id": node_id,
+            "parent": parent,
+            "children": [],
+            "message": {
+                "id": f"c{chat_idx}-m{made}",
+                "author": {"role": role},
+                # Mix epoch seconds and ISO strings, as real exports do.
+                "create_time": started + made * 30 if made % 3 else _iso(started + made * 30),
+                "content": {"content_type": "text", "parts": [text.message(topic, role)]},
+            },
+        }
+        if parent is not None:
+            mapping[parent]["children"].append(node_id)
+        made += 1
+        if role == "assistant" and made < count and rng.random() < text.spec.branch_ratio:
+            # A regenerated answer: same parent, never continued.
+            branch_id = f"c{chat_idx}-n{made}"
+            mapping[branch_id] = {
+                "id": branch_id,
+                "parent": parent,
+                "children": [],
+                "message": {
+                    "id": f"c{chat_idx}-m{made}",
+                    "author": {"role": "assistant"},
+                    "create_time": started + made * 30,
+                    "content": {"content_type": "text", "parts": [text.message(topic, "assistant")]},
+                },
+            }
+            if parent is not None:
+                mapping[parent]["children"].append(branch_id)
+            made += 1
+        parent = node_id
+    return {"id": f"chat-{chat_idx}", "title": text.title(topic), "create_time": started, "mapping": mapping}
+
+
+def _html_conversation(text: _Text, chat_idx: int, count: int, started: int) -> str:
+    rng = text.rng
+    topic = rng.choice(text.topics)
+    title = escape(text.title(topic))
+    rows: list[str] = []
+    # Alternate between the data-attribute layout and the plain "User:" fallback layout.
+    tagged = chat_idx % 2 == 0
+    for idx in range(count):
+        role = "user" if idx % 2 == 0 else "assistant"
+        body = escape(text.message(topic, role)).replace("\n", "<br>")
+        if tagged:
+            rows.append(
+                f'<div data-message-author-role="{role}" data-message-created-at="{_iso(started + idx * 30)}">'
+                f"<p>{body}</p></div>"
+            )
+        else:
+            rows.append(f"<p>{role.capitalize()}: {body}</p>")
+    return f"<html><head><title>{title}</title></head><body>{''.join(rows)}</body></html>"
+
+
+def _iso(epoch: int) -> str:
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def iter_chats(spec: ExportSpec) -> Iterator[tuple[str, int, Any]]:
+    """Yield ``("json" | "html", message_count, chat)`` until ``spec.messages`` messages are produced."""
+    rng = random.Random(spec.seed)
+    text = _Text(rng, spec)
+    produced = 0
+    chat_idx = 0
+    started = 1_700_000_000
+    while produced < spec.messages:
+        wanted = int(rng.gauss(spec.messages_per_chat, spec.messages_per_chat / 3))
+        count = min(spec.messages - produced, max(2, wanted))
+        started += rng.randint(600, 86_400)
+        if rng.random() < spec.html_ratio:
+            yield "html", count, _html_conversation(text, chat_idx, count, started)
+        else:
+            yield "json", count, _json_conversation(text, chat_idx, count, started)
+        produced += count
+        chat_idx += 1
+
+
+def write_export(path: Path, spec: ExportSpec) -> dict[str, Any]:
+    """Write a ``.json`` (JSON chats only) or ``.zip`` (conversations.json + HTML chats) export."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    counts = {"json_messages": 0, "html_messages": 0, "chats": 0}
+    as_zip = path.suffix.lower() == ".zip"
+    if not as_zip:
+        spec = replace(spec, html_ratio=0.0)
+
+    archive = zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) if as_zip else None
+    try:
+        stream = archive.open("conversations.json", "w") if archive else path.open("wb")
+        html_chats: list[tuple[int, str]] = []
+        with stream:
+            stream.write(b"[")
+            first = True
+            for kind, count, chat in iter_chats(spec):
+                counts["chats"] += 1
+                if kind == "html":
+                    counts["html_messages"] += count
+                    html_chats.append((counts["chats"], chat))
+                    continue
+                counts["json_messages"] += count
+                stream.write((b"" if first else b",\n") + json.dumps(chat).encode("utf-8"))
+                first = False
+            stream.write(b"]")
+        if archive:
+            for idx, html in html_chats:
+                archive.writestr(f"chats/chat-{idx}.html", html)
+    finally:
+        if archive:
+            archive.close()
+    return {"path": str(path), "bytes": path.stat().st_size, **counts}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate a seeded synthetic ChatGPT export")
+    parser.add_argument("--messages", type=int, default=10_000, help="Total messages (1k .. 1M)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", default="data/raw/synthetic_export.zip", help=".zip (with HTML chats) or .json")
+    parser.add_argument("--branch-ratio", type=float, default=0.1, help="Assistant turns with a regenerated branch")
+    parser.add_argument("--code-ratio", type=float, default=0.2, help="Assistant turns with a code block")
+    parser.add_argument("--pii-ratio", type=float, default=0.05, help="Messages with an email/phone/key/password")
+    parser.add_argument("--html-ratio", type=float, default=0.05, help="Chats written as HTML (ZIP only)")
+    args = parser.parse_args()
+
+    spec = ExportSpec(
+        messages=args.messages,
+        seed=args.seed,
+        branch_ratio=args.branch_ratio,
+        code_ratio=args.code_ratio,
+        pii_ratio=args.pii_ratio,
+        html_ratio=args.html_ratio,
+    )
+    print(json.dumps(write_export(Path(args.out), spec), indent=2))
+
+
+if __name__ == "__main__":
+    main()
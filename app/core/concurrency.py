@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+
+class ModelBusyError(RuntimeError):
+    def __init__(self, message: str, retry_after_s: int) -> None:
+        super().__init__(message)
+        self.retry_after_s = retry_after_s
+
+
+class ModelGovernor:
+    """Caps in-flight model calls and sheds load once the wait queue is full.
+
+    Request threads queue for one of ``max_concurrency`` slots. When more than
+    ``queue_size`` callers are already waiting, or a slot does not free up within
+    ``admission_timeout_s``, the caller gets ``ModelBusyError`` instead of piling
+    more threads onto the CPU.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        queue_size: int,
+        admission_timeout_s: float,
+        retry_after_s: int = 1,
+    ) -> None:
+        self.max_concurrency = max(1, max_concurrency)
+        self.queue_size = max(0, queue_size)
+        self.admission_timeout_s = admission_timeout_s
+        self.retry_after_s = retry_after_s
+        self._semaphore = threading.BoundedSemaphore(self.max_concurrency)
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._in_flight = 0
+        self._rejected = 0
+
+    @contextmanager
+    def slot(self, bounded: bool = True) -> Iterator[None]:
+        """Hold a model slot; ``bounded=False`` waits indefinitely (bulk indexing)."""
+        with self._lock:
+            if bounded and self._in_flight + self._waiting >= self.max_concurrency + self.queue_size:
+                self._rejected += 1
+                raise ModelBusyError("Model queue is full", self.retry_after_s)
+            self._waiting += 1
+        try:
+            acquired = self._semaphore.acquire(timeout=self.admission_timeout_s if bounded else None)
+        finally:
+            with self._lock:
+                self._waiting -= 1
+        if not acquired:
+            with self._lock:
+                self._rejected += 1
+            raise ModelBusyError("Timed out waiting for a model slot", self.retry_after_s)
+
+        with self._lock:
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            self._semaphore.release()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "in_flight": self._in_flight,
+                "waiting": self._waiting,
+                "rejected": self._rejected,
+            }
+
+
+def set_intra_op_threads(threads: int) -> None:
+    """Pin torch's per-process intra-op thread pool (no-op when ``threads`` <= 0)."""
+    if threads <= 0:
+        return
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(threads)
@@ -17,16 +17,56 @@ class Settings(BaseSettings):
     qdrant_url: str = "http://qdrant:6333"
     collection_name: str = "chat_chunks"
     qdrant_timeout_s: float = 10.0
+    blue_green_reindex: bool = False
+    collection_gc_grace_s: float = 600.0
+    # How often the API looks for retired collections past their grace period; 0 disables the timer.
+    collection_gc_interval_s: float = 300.0
+    # Share of chunks.jsonl rows hidden by delete tombstones at which a delete queues a compaction job.
+    chunk_compaction_garbage_ratio: float = 0.2
 
     emb_model_name: str = "sentence-transformers/all-MiniLM-L6-v2"
     emb_vector_size: int = 384
     emb_batch_size: int = 32
     emb_normalize: bool = True
+    emb_backend: Literal["torch", "onnx"] = "torch"
+    emb_onnx_dir: Path = Path("models/onnx")
+    emb_onnx_quantized: bool = False
+    emb_intra_op_threads: int = 0
+    model_max_concurrency: int = 2
+    model_queue_size: int = 16
+    model_admission_timeout_s: float = 5.0
+    model_busy_retry_after_s: int = 1
+    emb_server_socket: Path | None = None
+    emb_server_max_batch: int = 64
+    emb_server_max_wait_ms: float = 5.0
+    emb_server_max_pending: int = 1024
+    warmup_on_startup: bool = True
+    warmup_retries: int = 5
+    warmup_backoff_s: float = 1.0
+    warmup_max_backoff_s: float = 60.0
+    emb_pool_workers: int = 0
+    emb_pool_threads: int = 0
+    index_batch_size: int = 512
 
     max_chunk_tokens: int = 900
     overlap_messages: int = 2
 
     top_k_default: int = 10
+    ask_batch_concurrency: int = 4
+    trace_requests: bool = False
+    # Shared directory for multi-process metrics (uvicorn --workers, scripts); unset = this process only.
+    metrics_dir: Path | None = None
+    metrics_flush_interval_s: float = 5.0
+    # Opt-in profiling: the fraction of /ask calls profiled, and whether "X-Profile: 1" forces a profile.
+    profile_sample_rate: float = 0.0
+    profile_header: bool = False
+    profile_dir: Path = Path("data/profiles")
+    profile_interval_ms: float = 5.0
+    profile_keep: int = 50
+    # tracemalloc attribution for ingest/reindex stages (slower runs) and for the serving process.
+    memory_trace_ingest: bool = False
+    memory_trace_serving: bool = False
+    memory_top_n: int = 10
     confidence_threshold: float = 0.35
 
     mode: Literal["extractive", "llm"] = "extractive"
@@ -35,10 +75,21 @@ class Settings(BaseSettings):
 
     openai_api_key: str | None = None
     openai_model: str = "gpt-4o-mini"
+    openai_base_url: str | None = None
+    openai_connect_timeout_s: float = 3.0
+    openai_read_timeout_s: float = 20.0
+    openai_max_concurrency: int = 4
+    openai_queue_timeout_s: float = 2.0
+    openai_max_retries: int = 2
+    openai_retry_base_s: float = 0.25
+    llm_max_contexts: int = 8
+    llm_context_token_budget: int = 3000
 
     raw_data_dir: Path = Path("data/raw")
     processed_data_dir: Path = Path("data/processed")
 
+    job_workers: int = 2
+
     allowlist_it_only: bool = False
     exclude_title_keywords: str = ""
 
@@ -55,6 +106,10 @@ class Settings(BaseSettings):
     def chunks_jsonl_path(self) -> Path:
         return self.processed_data_dir / "chunks.jsonl"
 
+    @property
+    def manifest_path(self) -> Path:
+        return self.processed_data_dir / "manifest.json"
+
     @property
     def exclude_title_keywords_list(self) -> list[str]:
         return [k.strip().lower() for k in self.exclude_title_keywords.split(",") if k.strip()]
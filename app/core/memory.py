@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import os
+import random
+import sys
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+_MB = 1_048_576
+
+
+def _mb(value: float) -> float:
+    return round(value / _MB, 2)
+
+
+def rss_bytes() -> int | None:
+    """Current resident set size; ``None`` where /proc is not available."""
+    try:
+        pages = int(Path("/proc/self/statm").read_text().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def peak_rss_bytes() -> int | None:
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def process_memory() -> dict[str, Any]:
+    rss = rss_bytes()
+    peak = peak_rss_bytes()
+    return {
+        "rss_mb": _mb(rss) if rss is not None else None,
+        "peak_rss_mb": _mb(peak) if peak is not None else None,
+        "tracemalloc": tracemalloc.is_tracing(),
+    }
+
+
+def top_allocations(limit: int = 10, snapshot: tracemalloc.Snapshot | None = None) -> list[dict[str, Any]]:
+    """Largest live allocation sites (file:line) while tracemalloc is tracing; empty otherwise."""
+    if snapshot is None:
+        if not tracemalloc.is_tracing():
+            return []
+        snapshot = tracemalloc.take_snapshot()
+    snapshot = snapshot.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+    return [
+        {
+            "site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+            "size_mb": _mb(stat.size),
+            "count": stat.count,
+        }
+        for stat in snapshot.statistics("lineno")[:limit]
+    ]
+
+
+def approx_deep_size(items: Iterable[Any], count: int, sample: int = 256, seed: int = 0) -> int:
+    """Estimate the deep size of ``count`` similar objects from a random sample of ``items``."""
+    pool = list(items)
+    if not pool:
+        return 0
+    picked = random.Random(seed).sample(pool, min(sample, len(pool)))
+    measured = sum(_deep_size(item, set()) for item in picked)
+    return int(measured / len(picked) * count)
+
+
+def _deep_size(obj: Any, seen: set[int]) -> int:
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_size(key, seen) + _deep_size(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(_deep_size(item, seen) for item in obj)
+    elif hasattr(obj, "__dict__"):
+        size += _deep_size(vars(obj), seen)
+    elif hasattr(obj, "__slots__"):
+        size += sum(_deep_size(getattr(obj, slot), seen) for slot in obj.__slots__ if hasattr(obj, slot))
+    return size
+
+
+class MemoryTracker:
+    """Peak and retained memory per pipeline stage.
+
+    RSS is always recorded. With ``trace`` the tracker also runs tracemalloc (if nothing else already
+    does), which attributes Python allocations per stage and keeps the top allocation sites at the stage
+    boundary where the most memory was live. Tracing slows Python-heavy stages down noticeably.
+    """
+
+    def __init__(self, trace: bool = False, top_n: int = 10) -> None:
+        self.trace = trace
+        self.top_n = top_n
+        self.stages: dict[str, dict[str, Any]] = {}
+        self._owns_tracing = False
+        self._high_water = -1
+        self._top: list[dict[str, Any]] = []
+
+    def start(self) -> MemoryTracker:
+        if self.trace and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracing = True
+        return self
+
+    def stop(self) -> None:
+        if self._owns_tracing:
+            tracemalloc.stop()
+            self._owns_tracing = False
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        tracing = self.trace and tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+        rss_before = rss_bytes()
+        try:
+            yield
+        finally:
+            entry: dict[str, Any] = {}
+            rss_after = rss_bytes()
+            if rss_after is not None:
+                entry["rss_mb"] = _mb(rss_after)
+                if rss_before is not None:
+                    entry["rss_delta_mb"] = _mb(rss_after - rss_before)
+            if tracing:
+                current, peak = tracemalloc.get_traced_memory()
+                entry["peak_mb"] = _mb(peak - before)
+                entry["retained_mb"] = _mb(current - before)
+                entry["live_mb"] = _mb(current)
+                if current > self._high_water:
+                    self._high_water = current
+                    self._top = top_allocations(self.top_n)
+                    for site in self._top:
+                        site["stage"] = name
+            self.stages[name] = entry
+
+    def report(self) -> dict[str, Any]:
+        peak = peak_rss_bytes()
+        return {
+            "tracemalloc": self.trace,
+            "stages": dict(self.stages),
+            "peak_rss_mb": _mb(peak) if peak is not None else None,
+            "top_allocations": list(self._top),
+        }
+
+
+_LAST_REPORTS: dict[str, dict[str, Any]] = {}
+_LAST_LOCK = threading.Lock()
+
+
+def remember_report(kind: str, report: dict[str, Any]) -> None:
+    """Keep the latest report per run kind (ingest, reindex) for the admin endpoint."""
+    with _LAST_LOCK:
+        _LAST_REPORTS[kind] = report
+
+
+def last_reports() -> dict[str, dict[str, Any]]:
+    with _LAST_LOCK:
+        return dict(_LAST_REPORTS)
@@ -0,0 +1,332 @@
+from __future__ import annotations
+
+import atexit
+import json
+import math
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Iterable
+
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Prometheus text exposition format 0.0.4; kept in-house so the hot path is a lock and a few adds.
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelKey = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, str]) -> LabelKey:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: LabelKey, extra: dict[str, str] | None = None) -> str:
+        pairs = list(zip(self.labelnames, key)) + list((extra or {}).items())
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def render(self, state: dict[LabelKey, Any] | None = None) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples(self.state() if state is None else state))
+        return lines
+
+    @abstractmethod
+    def state(self) -> dict[LabelKey, Any]:
+        """A copy of every series, in the JSON-friendly form ``merge`` and ``render`` accept."""
+
+    @abstractmethod
+    def merge(self, states: list[dict[LabelKey, Any]]) -> dict[LabelKey, Any]:
+        """Combine the series of several processes into one state."""
+
+    @abstractmethod
+    def _samples(self, state: dict[LabelKey, Any]) -> list[str]:
+        """Exposition lines for ``state``."""
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> None:
+        super().__init__(name, help_text, labelnames)
+        self._values: dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def state(self) -> dict[LabelKey, Any]:
+        with self._lock:
+            return dict(self._values)
+
+    def merge(self, states: list[dict[LabelKey, Any]]) -> dict[LabelKey, Any]:
+        merged: dict[LabelKey, float] = {}
+        for state in states:
+            for key, value in state.items():
+                merged[key] = merged.get(key, 0.0) + value
+        return merged
+
+    def _samples(self, state: dict[LabelKey, Any]) -> list[str]:
+        return [f"{self.name}{self._labels(key)} {_format_value(value)}" for key, value in sorted(state.items())]
+
+
+class Gauge(_Metric):
+    """Last value per label set; across processes the most recently set value wins."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> None:
+        super().__init__(name, help_text, labelnames)
+        # Per label set: (value, wall-clock time it was set).
+        self._values: dict[LabelKey, tuple[float, float]] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = (float(value), time.time())
+
+    def value(self, **labels: str) -> float | None:
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+        return entry[0] if entry else None
+
+    def state(self) -> dict[LabelKey, Any]:
+        with self._lock:
+            return dict(self._values)
+
+    def merge(self, states: list[dict[LabelKey, Any]]) -> dict[LabelKey, Any]:
+        merged: dict[LabelKey, Any] = {}
+        for state in states:
+            for key, entry in state.items():
+                if key not in merged or entry[1] >= merged[key][1]:
+                    merged[key] = entry
+        return merged
+
+    def _samples(self, state: dict[LabelKey, Any]) -> list[str]:
+        return [f"{self.name}{self._labels(key)} {_format_value(entry[0])}" for key, entry in sorted(state.items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (last = +Inf)], sum, count.
+        self._series: dict[LabelKey, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0, 0.0])
+            series[0][index] += 1
+            series[1][0] += value
+            series[1][1] += 1
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return int(series[1][1]) if series else 0
+
+    def state(self) -> dict[LabelKey, Any]:
+        with self._lock:
+            return {key: (list(counts), totals[0], totals[1]) for key, (counts, totals) in self._series.items()}
+
+    def merge(self, states: list[dict[LabelKey, Any]]) -> dict[LabelKey, Any]:
+        merged: dict[LabelKey, Any] = {}
+        for state in states:
+            for key, (counts, total, count) in state.items():
+                if len(counts) != len(self.buckets) + 1:
+                    continue  # written with other buckets (older build); cannot be combined
+                previous = merged.get(key)
+                if previous is None:
+                    merged[key] = (list(counts), total, count)
+                else:
+                    merged[key] = (
+                        [a + b for a, b in zip(previous[0], counts)],
+                        previous[1] + total,
+                        previous[2] + count,
+                    )
+        return merged
+
+    def _samples(self, state: dict[LabelKey, Any]) -> list[str]:
+        lines: list[str] = []
+        for key, (counts, total, count) in sorted(state.items()):
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, math.inf), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{self._labels(key, {'le': _format_value(bound)})} {cumulative}")
+            lines.append(f"{self.name}_sum{self._labels(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{self._labels(key)} {_format_value(count)}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, help_text, labelnames))  # type: ignore[return-value]
+
+    def gauge(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self.register(Gauge(name, help_text, labelnames))  # type: ignore[return-value]
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, help_text, labelnames, buckets))  # type: ignore[return-value]
+
+    def _all(self) -> list[_Metric]:
+        with self._lock:
+            return list(self._metrics.values())
+
+    def snapshot(self) -> dict[str, list[list[Any]]]:
+        """JSON-ready ``{metric: [[labels, state], ...]}`` of this process, as written to ``METRICS_DIR``."""
+        return {metric.name: [[list(key), value] for key, value in metric.state().items()] for metric in self._all()}
+
+    def render(self, snapshots: Iterable[dict[str, list[list[Any]]]] = ()) -> str:
+        """Render this registry, merged with ``snapshots`` taken from other processes."""
+        snapshots = list(snapshots)
+        lines: list[str] = []
+        for metric in self._all():
+            states = [metric.state()]
+            for snapshot in snapshots:
+                states.append({tuple(key): value for key, value in snapshot.get(metric.name, [])})
+            lines.extend(metric.render(metric.merge(states) if snapshots else states[0]))
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+ASK_DURATION = REGISTRY.histogram(
+    "rag_ask_duration_seconds", "End-to-end /ask latency (including /ask/batch items)", ["mode"]
+)
+STAGE_DURATION = REGISTRY.histogram(
+    "rag_stage_duration_seconds", "Latency of one pipeline stage (embed, vector_search, keyword_search, ...)", ["stage"]
+)
+ABSTAINS = REGISTRY.counter("rag_abstain_total", "Answers that took the insufficient-context path")
+CACHE_REQUESTS = REGISTRY.counter("rag_cache_requests_total", "Cache lookups by cache and result", ["cache", "result"])
+LLM_FALLBACKS = REGISTRY.counter("rag_llm_fallbacks_total", "LLM answers that fell back to extractive", ["reason"])
+QDRANT_ERRORS = REGISTRY.counter("rag_qdrant_errors_total", "Failed Qdrant operations", ["operation"])
+INDEXED_ITEMS = REGISTRY.counter(
+    "rag_indexed_items_total", "Messages parsed and chunks indexed by ingest/reindex", ["kind", "item"]
+)
+INDEX_RUN_DURATION = REGISTRY.histogram(
+    "rag_index_run_duration_seconds",
+    "Wall time of ingest/reindex runs",
+    ["kind"],
+    buckets=(1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0),
+)
+INDEX_THROUGHPUT = REGISTRY.gauge(
+    "rag_index_throughput_chunks_per_second", "Chunks indexed per second in the last run", ["kind"]
+)
+INDEX_POINTS = REGISTRY.gauge("rag_index_points", "Points in the serving Qdrant collection")
+INDEX_CHUNKS = REGISTRY.gauge("rag_index_chunks", "Chunks recorded in the index manifest")
+INDEX_MESSAGES = REGISTRY.gauge("rag_index_messages", "Messages recorded in the index manifest")
+INDEX_GENERATION = REGISTRY.gauge("rag_index_generation", "Index generation from the manifest")
+
+# Multi-process mode: with METRICS_DIR set, every process (API workers, ingest/reindex scripts) writes its
+# registry to <dir>/<role>-<pid>.json and /metrics merges them. Files of exited processes are kept so counters
+# stay monotonic; clear the directory when deploying, as with prometheus_client's multiprocess mode.
+_SNAPSHOT_PATH: Path | None = None
+
+
+def write_snapshot() -> None:
+    """Persist this process's registry if snapshots are enabled (atomic replace, so readers never see half a file)."""
+    if _SNAPSHOT_PATH is None:
+        return
+    partial = _SNAPSHOT_PATH.with_suffix(".tmp")
+    partial.write_text(json.dumps(REGISTRY.snapshot()), encoding="utf-8")
+    os.replace(partial, _SNAPSHOT_PATH)
+
+
+def _flush_periodically(interval_s: float) -> None:
+    while True:
+        time.sleep(interval_s)
+        try:
+            write_snapshot()
+        except OSError as exc:
+            # Never let a full disk take the worker down; the next flush retries.
+            logger.warning("Could not write metrics snapshot: %s", exc)
+
+
+def enable_snapshots(directory: Path, role: str, interval_s: float = 0.0) -> None:
+    """Write this process's metrics under ``directory`` at exit and, if ``interval_s`` > 0, periodically."""
+    global _SNAPSHOT_PATH
+    if _SNAPSHOT_PATH is not None:
+        return
+    directory.mkdir(parents=True, exist_ok=True)
+    _SNAPSHOT_PATH = directory / f"{role}-{os.getpid()}.json"
+    atexit.register(write_snapshot)
+    if interval_s > 0:
+        threading.Thread(target=_flush_periodically, args=(interval_s,), name="metrics-flush", daemon=True).start()
+
+
+def render_metrics(directory: Path | None) -> str:
+    """This process's live metrics merged with the snapshots other processes left in ``directory``."""
+    if directory is None or not directory.is_dir():
+        return REGISTRY.render()
+    snapshots = []
+    for path in sorted(directory.glob("*.json")):
+        if path == _SNAPSHOT_PATH:
+            continue
+        try:
+            snapshots.append(json.loads(path.read_text(encoding="utf-8")))
+        except (OSError, ValueError):
+            continue
+    return REGISTRY.render(snapshots)
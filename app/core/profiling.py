@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import cProfile
+import json
+import os
+import pstats
+import random
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from time import perf_counter
+from types import FrameType
+from typing import Any, Iterator
+
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# One profile per process at a time: the profiler hooks are process-wide on newer Pythons, and two
+# overlapping samplers would mostly measure each other.
+_ACTIVE = threading.Lock()
+
+
+def _frame_name(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+def _collapse(frame: FrameType | None) -> str:
+    names: list[str] = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class _StackSampler:
+    """Samples one thread's Python stack every ``interval_s`` into collapsed-stack counts."""
+
+    def __init__(self, thread_id: int, interval_s: float) -> None:
+        self.thread_id = thread_id
+        self.interval_s = interval_s
+        self.stacks: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[_collapse(frame)] += 1
+
+
+def should_sample(rate: float) -> bool:
+    return rate > 0 and random.random() < rate
+
+
+def _top_functions(profiler: cProfile.Profile, limit: int = 10) -> list[dict[str, Any]]:
+    stats = pstats.Stats(profiler).stats  # type: ignore[attr-defined]
+    ranked = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    return [
+        {
+            "function": f"{func} ({Path(filename).name}:{line})",
+            "calls": calls,
+            "cumulative_ms": round(cumulative * 1000, 3),
+        }
+        for (filename, line, func), (_, calls, _, cumulative, _) in ranked
+    ]
+
+
+def _prune(directory: Path, keep: int) -> None:
+    metas = sorted(directory.glob("*.json"))
+    for meta in metas[: max(len(metas) - keep, 0)]:
+        for suffix in (".prof", ".collapsed", ".json"):
+            meta.with_suffix(suffix).unlink(missing_ok=True)
+
+
+def _write(
+    directory: Path,
+    meta: dict[str, Any],
+    profiler: cProfile.Profile,
+    sampler: _StackSampler,
+    keep: int,
+) -> None:
+    directory.mkdir(parents=True, exist_ok=True)
+    base = directory / meta["id"]
+    profiler.dump_stats(str(base.with_suffix(".prof")))
+    collapsed = "".join(f"{stack} {count}\n" for stack, count in sampler.stacks.most_common())
+    base.with_suffix(".collapsed").write_text(collapsed, encoding="utf-8")
+    meta["samples"] = sum(sampler.stacks.values())
+    meta["top_functions"] = _top_functions(profiler)
+    meta["files"] = {"stats": base.with_suffix(".prof").name, "collapsed": base.with_suffix(".collapsed").name}
+    # The sidecar goes last: list_profiles only reports profiles whose files are complete.
+    base.with_suffix(".json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    if keep > 0:
+        _prune(directory, keep)
+
+
+@contextmanager
+def profiled(
+    name: str,
+    directory: Path,
+    interval_ms: float = 5.0,
+    keep: int = 50,
+    **details: Any,
+) -> Iterator[dict[str, Any] | None]:
+    """Profile the block with cProfile and a stack sampler.
+
+    Writes ``<id>.prof`` (pstats), ``<id>.collapsed`` (one ``frame;frame;frame count`` line per stack, for
+    flamegraph.pl / speedscope) and an ``<id>.json`` summary under ``directory``, keeping the newest ``keep``.
+    Yields the summary dict so the caller can add details, or ``None`` when another profile is already running.
+    """
+    if not _ACTIVE.acquire(blocking=False):
+        logger.info("Skipping %s profile: another profile is running in this process", name)
+        yield None
+        return
+
+    started_at = datetime.now(timezone.utc)
+    meta: dict[str, Any] = {
+        "id": f"{started_at.strftime('%Y%m%dT%H%M%S%fZ')}-{name}-{os.getpid()}",
+        "name": name,
+        "started_at": started_at.isoformat(),
+        "pid": os.getpid(),
+        **details,
+    }
+    profiler = cProfile.Profile()
+    sampler = _StackSampler(threading.get_ident(), interval_ms / 1000)
+    started = perf_counter()
+    try:
+        sampler.start()
+        profiler.enable()
+        yield meta
+    finally:
+        profiler.disable()
+        sampler.stop()
+        meta["duration_ms"] = round((perf_counter() - started) * 1000, 3)
+        try:
+            _write(directory, meta, profiler, sampler, keep)
+            logger.info("Wrote %s profile to %s", name, directory / meta["id"])
+        except OSError as exc:
+            logger.warning("Could not write %s profile: %s", name, exc)
+        finally:
+            _ACTIVE.release()
+
+
+def list_profiles(directory: Path, limit: int = 50) -> list[dict[str, Any]]:
+    """Summaries of the newest profiles, newest first."""
+    if not directory.exists():
+        return []
+    profiles: list[dict[str, Any]] = []
+    for meta_path in sorted(directory.glob("*.json"), reverse=True)[:limit]:
+        try:
+            profiles.append(json.loads(meta_path.read_text(encoding="utf-8")))
+        except (OSError, ValueError):
+            continue
+    return profiles
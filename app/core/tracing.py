@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import json
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Any, Iterator
+
+from app.core.logging import get_logger
+from app.core.metrics import STAGE_DURATION
+
+logger = get_logger(__name__)
+
+
+class RequestTrace:
+    """Spans recorded for one request, in start order; each carries a duration and free-form counts."""
+
+    def __init__(self) -> None:
+        self.spans: list[dict[str, Any]] = []
+        self._stack: list[str] = []
+
+    def to_list(self) -> list[dict[str, Any]]:
+        return [dict(span) for span in self.spans]
+
+    def log(self, event: str, **fields: Any) -> None:
+        logger.info(json.dumps({"event": event, **fields, "spans": self.spans}, default=str))
+
+
+_CURRENT: ContextVar[RequestTrace | None] = ContextVar("request_trace", default=None)
+
+
+@contextmanager
+def tracing(enabled: bool, trace: RequestTrace | None = None) -> Iterator[RequestTrace | None]:
+    """Activate a trace for the current context; spans opened elsewhere attach to it.
+
+    Pass ``trace`` to resume one started earlier, e.g. around each step of a streamed response, whose
+    generator must not hold the context across a ``yield``.
+    """
+    if not enabled:
+        yield None
+        return
+    trace = trace or RequestTrace()
+    token = _CURRENT.set(trace)
+    try:
+        yield trace
+    finally:
+        _CURRENT.reset(token)
+
+
+@contextmanager
+def span(name: str, **counts: Any) -> Iterator[dict[str, Any]]:
+    """Time a stage into the stage-latency histogram; with an active trace, also record it with its counts."""
+    trace = _CURRENT.get()
+    if trace is None:
+        started = perf_counter()
+        try:
+            yield counts
+        finally:
+            STAGE_DURATION.observe(perf_counter() - started, stage=name)
+        return
+
+    record: dict[str, Any] = {
+        "name": name,
+        "parent": trace._stack[-1] if trace._stack else None,
+        "duration_ms": 0.0,
+        "counts": counts,
+    }
+    trace.spans.append(record)
+    trace._stack.append(name)
+    started = perf_counter()
+    try:
+        yield counts
+    finally:
+        elapsed = perf_counter() - started
+        STAGE_DURATION.observe(elapsed, stage=name)
+        record["duration_ms"] = round(elapsed * 1000, 3)
+        trace._stack.pop()
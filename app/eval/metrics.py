@@ -26,3 +26,14 @@ def abstain_rate(abstains: list[bool]) -> float:
     if not abstains:
         return 0.0
     return sum(1 for v in abstains if v) / len(abstains)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Linear-interpolated percentile (``pct`` in 0..100), matching numpy's default method."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return float(ordered[low] + (ordered[high] - ordered[low]) * (rank - low))
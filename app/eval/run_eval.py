@@ -1,16 +1,28 @@
 from __future__ import annotations
 
 import argparse
+import itertools
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from time import perf_counter
+from typing import Any
 
 from app.api.routes_chat import get_chat_service
-from app.core.config import get_settings
+from app.core.config import Settings, get_settings
 from app.core.logging import setup_logging
-from app.eval.metrics import abstain_rate, average_latency_ms, hit_at_k, keyword_hit
-from app.rag.chunking import build_chunks, load_chunks_jsonl, write_chunks_jsonl
-from app.rag.ingest.export_reader import ingest_export, load_messages_jsonl
+from app.eval.metrics import abstain_rate, average_latency_ms, hit_at_k, keyword_hit, percentile
+from app.rag.answer import AnswerGenerator
+from app.rag.chunking import load_chunks_jsonl
+from app.rag.manifest import load_manifest
+from app.rag.pipeline import run_ingest
+from app.rag.retriever import Retriever
+from app.rag.schema import RetrievalContext
+
+# Sweepable settings; the first three change what is retrieved, the rest only the answer stage.
+_RETRIEVAL_KEYS = ("top_k", "hybrid_keyword", "enable_rerank")
+_SWEEP_KEYS = (*_RETRIEVAL_KEYS, "confidence_threshold", "mode")
 
 
 def _prepare_index() -> None:
@@ -25,20 +37,14 @@ def _prepare_index() -> None:
     if not sample_path.exists():
         return
 
-    ingest_export(
+    service.store.create_collection(reset=True)
+    run_ingest(
+        service,
+        settings,
         input_path=sample_path,
-        output_messages_path=settings.messages_jsonl_path,
         allowlist_it_only=False,
         exclude_title_keywords=[],
     )
-    messages = load_messages_jsonl(settings.messages_jsonl_path)
-    chunks = build_chunks(messages, max_tokens=settings.max_chunk_tokens, overlap_messages=settings.overlap_messages)
-    write_chunks_jsonl(settings.chunks_jsonl_path, chunks)
-
-    service.store.create_collection(reset=True)
-    if chunks:
-        vectors = service.embedder.embed_texts([c.text for c in chunks])
-        service.store.upsert_chunks(chunks, vectors)
 
 
 def run_eval(dataset_path: Path, top_k: int) -> None:
@@ -84,20 +90,239 @@ def run_eval(dataset_path: Path, top_k: int) -> None:
     print("|---|---:|")
     print(f"| Hit@5 | {hit_at_5:.2f} |")
     print(f"| Avg latency (ms) | {avg_latency:.1f} |")
+    print(f"| p50 latency (ms) | {percentile(latencies, 50):.1f} |")
+    print(f"| p95 latency (ms) | {percentile(latencies, 95):.1f} |")
     print(f"| Abstain rate | {abstain:.2f} |")
     print("| Embedding cost | 0 (local model) |")
 
 
+def parse_grid(specs: list[str]) -> list[dict[str, str]]:
+    """``["top_k=5,10", "hybrid_keyword=true,false"]`` -> the cross product as one dict per configuration."""
+    axes: list[list[tuple[str, str]]] = []
+    for spec in specs:
+        name, _, values = spec.partition("=")
+        name = name.strip()
+        if name not in _SWEEP_KEYS or not values.strip():
+            raise ValueError(f"Grid axis must be one of {', '.join(_SWEEP_KEYS)} with values, got {spec!r}")
+        axes.append([(name, value.strip()) for value in values.split(",") if value.strip()])
+    return [dict(combo) for combo in itertools.product(*axes)]
+
+
+def _config_settings(base: Settings, config: dict[str, str]) -> Settings:
+    overrides = {key: value for key, value in config.items() if key != "top_k"}
+    return Settings.model_validate({**base.model_dump(), **overrides})
+
+
+def _retrieval_key(config: dict[str, str], settings: Settings, default_top_k: int) -> tuple[int, bool, bool]:
+    return int(config.get("top_k", default_top_k)), settings.hybrid_keyword, settings.enable_rerank
+
+
+class RetrievalCache:
+    """Retrieved contexts and their latency per (retrieval config, question).
+
+    Answer-stage settings share entries, so sweeping them never re-queries Qdrant. With ``path`` the
+    cache survives between runs; it is discarded when the index generation in the manifest changes.
+    """
+
+    def __init__(self, path: Path | None = None, generation: int | None = None) -> None:
+        self.path = path
+        self.generation = generation
+        self._lock = threading.Lock()
+        self._entries: dict[str, dict[str, Any]] = {}
+        if path is not None and path.exists():
+            stored = json.loads(path.read_text(encoding="utf-8"))
+            if stored.get("generation") == generation:
+                self._entries = stored.get("entries", {})
+
+    @staticmethod
+    def _key(retrieval_key: tuple[int, bool, bool], question: str) -> str:
+        top_k, hybrid, rerank = retrieval_key
+        return f"top_k={top_k}|hybrid={hybrid}|rerank={rerank}|{question}"
+
+    def has(self, retrieval_key: tuple[int, bool, bool], question: str) -> bool:
+        with self._lock:
+            return self._key(retrieval_key, question) in self._entries
+
+    def get(self, retrieval_key: tuple[int, bool, bool], question: str) -> tuple[list[RetrievalContext], float] | None:
+        with self._lock:
+            entry = self._entries.get(self._key(retrieval_key, question))
+        if entry is None:
+            return None
+        return [RetrievalContext.model_validate(ctx) for ctx in entry["contexts"]], entry["retrieval_ms"]
+
+    def put(
+        self,
+        retrieval_key: tuple[int, bool, bool],
+        question: str,
+        contexts: list[RetrievalContext],
+        retrieval_ms: float,
+    ) -> None:
+        entry = {"contexts": [ctx.model_dump() for ctx in contexts], "retrieval_ms": retrieval_ms}
+        with self._lock:
+            self._entries[self._key(retrieval_key, question)] = entry
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            payload = {"generation": self.generation, "entries": self._entries}
+        self.path.write_text(json.dumps(payload), encoding="utf-8")
+
+
+def _retrieve_all(
+    service,
+    settings: Settings,
+    retrieval_key: tuple[int, bool, bool],
+    questions: list[str],
+    vector_results: list[list[RetrievalContext]],
+    vector_ms: float,
+    cache: RetrievalCache,
+) -> None:
+    top_k, hybrid, rerank = retrieval_key
+    retriever = Retriever(
+        service.embedder,
+        service.store,
+        settings.model_copy(update={"hybrid_keyword": hybrid, "enable_rerank": rerank}),
+    )
+    for question, hits in zip(questions, vector_results):
+        started = perf_counter()
+        contexts = retriever.retrieve(question=question, top_k=top_k, vector_results=hits)
+        # The vector search ran batched; each question is charged an even share of it.
+        cache.put(retrieval_key, question, contexts, (perf_counter() - started) * 1000 + vector_ms)
+
+
+def _evaluate_config(
+    config: dict[str, str],
+    settings: Settings,
+    retrieval_key: tuple[int, bool, bool],
+    dataset: list[dict[str, Any]],
+    cache: RetrievalCache,
+) -> dict[str, Any]:
+    top_k = retrieval_key[0]
+    answerer = AnswerGenerator(settings)
+    latencies: list[float] = []
+    abstains: list[bool] = []
+    hit_scores: list[float] = []
+    keyword_scores: list[float] = []
+    for row in dataset:
+        question = row["question"]
+        contexts, retrieval_ms = cache.get(retrieval_key, question) or ([], 0.0)
+        started = perf_counter()
+        answer = answerer.generate_answer(question, contexts, mode=settings.mode)
+        latencies.append(retrieval_ms + (perf_counter() - started) * 1000)
+
+        chat_hit = hit_at_k([ctx.chat_id for ctx in contexts[:top_k]], row.get("expected_chat_id"))
+        kw_hit = keyword_hit([ctx.text for ctx in contexts[:top_k]], row.get("expected_keywords", []))
+        hit_scores.append(max(chat_hit, kw_hit))
+        keyword_scores.append(kw_hit)
+        abstains.append(AnswerGenerator.is_abstain(answer.text))
+
+    return {
+        "config": config,
+        "hit_at_k": sum(hit_scores) / len(hit_scores) if hit_scores else 0.0,
+        "keyword_hit": sum(keyword_scores) / len(keyword_scores) if keyword_scores else 0.0,
+        "abstain_rate": abstain_rate(abstains),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+    }
+
+
+def run_sweep(
+    service,
+    settings: Settings,
+    dataset: list[dict[str, Any]],
+    grid: list[dict[str, str]],
+    default_top_k: int,
+    workers: int = 4,
+    cache: RetrievalCache | None = None,
+) -> list[dict[str, Any]]:
+    """Evaluate every configuration in ``grid``; rows come back in grid order.
+
+    Questions are embedded once and vector-searched once per distinct ``top_k``; each distinct retrieval
+    configuration then runs once, and answer-stage variations reuse its cached contexts.
+    """
+    cache = cache or RetrievalCache()
+    questions = [row["question"] for row in dataset]
+    configs = [(config, _config_settings(settings, config)) for config in grid]
+    keys = [_retrieval_key(config, config_settings, default_top_k) for config, config_settings in configs]
+
+    missing = sorted({key for key in keys if not all(cache.has(key, question) for question in questions)})
+    if missing and questions:
+        query_vectors = service.embedder.embed_queries(questions)
+        vector_results: dict[int, tuple[list[list[RetrievalContext]], float]] = {}
+        for top_k in sorted({key[0] for key in missing}):
+            started = perf_counter()
+            hits = service.store.search_batch(query_vectors, [{"top_k": top_k} for _ in questions])
+            vector_results[top_k] = (hits, (perf_counter() - started) * 1000 / len(questions))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(_retrieve_all, service, settings, key, questions, *vector_results[key[0]], cache)
+                for key in missing
+            ]
+            for future in futures:
+                future.result()
+        cache.save()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_evaluate_config, config, config_settings, key, dataset, cache)
+            for (config, config_settings), key in zip(configs, keys)
+        ]
+        return [future.result() for future in futures]
+
+
+def print_sweep(rows: list[dict[str, Any]]) -> None:
+    print("| Config | Hit@k | Keyword Hit | Abstain rate | p50 (ms) | p95 (ms) |")
+    print("|---|---:|---:|---:|---:|---:|")
+    for row in rows:
+        label = " ".join(f"{key}={value}" for key, value in row["config"].items()) or "(settings)"
+        print(
+            f"| {label} | {row['hit_at_k']:.2f} | {row['keyword_hit']:.2f} | {row['abstain_rate']:.2f} "
+            f"| {row['p50_ms']:.1f} | {row['p95_ms']:.1f} |"
+        )
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="Run retrieval evaluation for the RAG Chat Assistant")
     parser.add_argument("--dataset", default="app/eval/dataset.example.json", help="Path to eval dataset JSON")
     parser.add_argument("--top-k", default=5, type=int, help="Top-k retrieval cutoff")
+    parser.add_argument(
+        "--grid",
+        action="append",
+        default=[],
+        help=f"Sweep axis, e.g. --grid top_k=5,10 --grid hybrid_keyword=true,false (one of {', '.join(_SWEEP_KEYS)})",
+    )
+    parser.add_argument("--workers", default=4, type=int, help="Configurations evaluated concurrently")
+    parser.add_argument("--cache", default=None, help="Persist retrieved contexts here between sweep runs")
+    parser.add_argument("--out", default=None, help="Write the sweep rows as JSON")
     args = parser.parse_args()
 
     settings = get_settings()
     setup_logging(settings.log_level)
     _prepare_index()
-    run_eval(Path(args.dataset), top_k=args.top_k)
+    if not args.grid:
+        run_eval(Path(args.dataset), top_k=args.top_k)
+        return
+
+    manifest = load_manifest(settings.manifest_path)
+    cache = RetrievalCache(
+        Path(args.cache) if args.cache else None,
+        generation=manifest["index_generation"] if manifest else None,
+    )
+    dataset = json.loads(Path(args.dataset).read_text(encoding="utf-8"))
+    rows = run_sweep(
+        get_chat_service(),
+        settings,
+        dataset,
+        parse_grid(args.grid),
+        default_top_k=args.top_k,
+        workers=args.workers,
+        cache=cache,
+    )
+    print_sweep(rows)
+    if args.out:
+        Path(args.out).write_text(json.dumps(rows, indent=2) + "\n", encoding="utf-8")
 
 
 if __name__ == "__main__":
@@ -1,15 +1,21 @@
 from __future__ import annotations
 
 import re
-from typing import Sequence
+from dataclasses import dataclass
+from typing import Iterator, Sequence
 
 from app.core.config import Settings
 from app.core.logging import get_logger
+from app.core.metrics import ABSTAINS, LLM_FALLBACKS
+from app.core.tracing import span
+from app.rag.context_packing import PackedContext, pack_contexts
+from app.rag.llm_client import LLMClient, LLMUnavailableError
 from app.rag.prompts import SYSTEM_PROMPT
 from app.rag.schema import RetrievalContext
 
 logger = get_logger(__name__)
 
+_ABSTAIN_PREFIX = "insufficient context"
 _TOKEN_RE = re.compile(r"[a-zA-Z0-9_]{3,}")
 
 
@@ -24,15 +30,37 @@ def _short_snippet(text: str, max_len: int = 220) -> str:
     return clean[: max_len - 3] + "..."
 
 
+@dataclass
+class GeneratedAnswer:
+    text: str
+    confidence: float
+    fallback_reason: str | None = None
+    prompt_tokens: int | None = None
+    prompt_tokens_saved: int | None = None
+
+
+@dataclass
+class AnswerStream:
+    """Answer pieces plus metadata; ``fallback_reason`` is final once ``pieces`` is exhausted."""
+
+    pieces: Iterator[str]
+    confidence: float
+    fallback_reason: str | None = None
+    prompt_tokens: int | None = None
+    prompt_tokens_saved: int | None = None
+
+
 class AnswerGenerator:
     def __init__(self, settings: Settings) -> None:
         self.settings = settings
+        self.llm = LLMClient(settings)
 
     def _insufficient_context(self, contexts: Sequence[RetrievalContext]) -> tuple[str, float]:
+        ABSTAINS.inc()
         snippets = [f"- {_short_snippet(ctx.text)}" for ctx in contexts[:3]]
         details = "\n".join(snippets) if snippets else "- No matching snippets found."
         text = (
-            "insufficient context. I do not have enough grounded evidence in your indexed chats to answer reliably. "
+            f"{_ABSTAIN_PREFIX}. I do not have enough grounded evidence in your indexed chats to answer reliably. "
             "Please narrow the question (topic/date/chat) or provide more details.\n\nClosest snippets:\n"
             f"{details}"
         )
@@ -60,49 +88,137 @@ class AnswerGenerator:
 
         return "\n".join(selected_lines)
 
-    def _llm_answer(self, question: str, contexts: Sequence[RetrievalContext]) -> str:
+    def _fallback(self, question: str, contexts: Sequence[RetrievalContext], reason: str) -> str:
+        LLM_FALLBACKS.inc(reason=reason)
+        return self._extractive_answer(question, contexts)
+
+    def _llm_prompt(
+        self, question: str, contexts: Sequence[RetrievalContext]
+    ) -> tuple[list[dict[str, str]], PackedContext]:
+        with span("context_pack", contexts=min(len(contexts), self.settings.llm_max_contexts)) as counts:
+            packed = pack_contexts(contexts[: self.settings.llm_max_contexts], self.settings.llm_context_token_budget)
+            counts.update(
+                naive_tokens=packed.naive_tokens,
+                packed_tokens=packed.packed_tokens,
+                duplicate_messages=packed.duplicate_messages,
+                dropped_messages=packed.dropped_messages,
+            )
+        logger.info(
+            "Packed LLM context: %s -> %s tokens (%s duplicate, %s over-budget messages dropped)",
+            packed.naive_tokens,
+            packed.packed_tokens,
+            packed.duplicate_messages,
+            packed.dropped_messages,
+        )
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {
+                "role": "user",
+                "content": f"Question: {question}\n\nContext:\n{packed.text}",
+            },
+        ]
+        return messages, packed
+
+    def _llm_answer(self, question: str, contexts: Sequence[RetrievalContext], confidence: float) -> GeneratedAnswer:
         if not self.settings.openai_api_key:
-            return self._extractive_answer(question, contexts)
+            reason = "llm_not_configured"
+            return GeneratedAnswer(self._fallback(question, contexts, reason), confidence, reason)
 
+        messages, packed = self._llm_prompt(question, contexts)
         try:
-            from openai import OpenAI
-
-            client = OpenAI(api_key=self.settings.openai_api_key)
-            context_text = "\n\n".join(
-                f"[C{idx}] score={ctx.score:.3f}\n{ctx.text}" for idx, ctx in enumerate(contexts[:8], start=1)
-            )
-            completion = client.chat.completions.create(
-                model=self.settings.openai_model,
-                temperature=0,
-                messages=[
-                    {"role": "system", "content": SYSTEM_PROMPT},
-                    {
-                        "role": "user",
-                        "content": f"Question: {question}\n\nContext:\n{context_text}",
-                    },
-                ],
-            )
-            answer = completion.choices[0].message.content or "Insufficient context"
-            return answer.strip()
-        except Exception as exc:
+            answer = self.llm.complete(messages)
+        except LLMUnavailableError as exc:
             logger.warning("LLM mode failed, falling back to extractive mode: %s", exc)
-            return self._extractive_answer(question, contexts)
+            return GeneratedAnswer(self._fallback(question, contexts, exc.reason), confidence, exc.reason)
+        return GeneratedAnswer(
+            answer.strip() or "Insufficient context",
+            confidence,
+            prompt_tokens=packed.packed_tokens,
+            prompt_tokens_saved=packed.tokens_saved,
+        )
 
-    def generate(
+    def _llm_stream(self, question: str, contexts: Sequence[RetrievalContext], stream: AnswerStream) -> Iterator[str]:
+        if not self.settings.openai_api_key:
+            stream.fallback_reason = "llm_not_configured"
+            yield self._fallback(question, contexts, "llm_not_configured")
+            return
+
+        messages, packed = self._llm_prompt(question, contexts)
+        emitted = False
+        try:
+            for delta in self.llm.stream(messages):
+                emitted = True
+                yield delta
+        except LLMUnavailableError as exc:
+            if emitted:
+                # Tokens already reached the client; a switch to extractive mode would garble the answer.
+                raise
+            logger.warning("LLM streaming failed, falling back to extractive mode: %s", exc)
+            stream.fallback_reason = exc.reason
+            yield self._fallback(question, contexts, exc.reason)
+            return
+        stream.prompt_tokens = packed.packed_tokens
+        stream.prompt_tokens_saved = packed.tokens_saved
+        if not emitted:
+            yield "Insufficient context"
+
+    def _llm_confidence(self, contexts: Sequence[RetrievalContext], mode: str | None) -> float | None:
+        """Top score when the question should go to the LLM, else ``None``."""
+        if not contexts or (mode or self.settings.mode) != "llm":
+            return None
+        confidence = max(ctx.score for ctx in contexts)
+        return confidence if confidence >= self.settings.confidence_threshold else None
+
+    def generate_answer(
         self,
         question: str,
         contexts: list[RetrievalContext],
         mode: str | None = None,
-    ) -> tuple[str, float]:
+    ) -> GeneratedAnswer:
+        with span("answer", mode=mode or self.settings.mode, contexts=len(contexts)) as counts:
+            confidence = self._llm_confidence(contexts, mode)
+            if confidence is not None:
+                answer = self._llm_answer(question, contexts, confidence)
+                counts["fallback_reason"] = answer.fallback_reason
+                return answer
+            answer = GeneratedAnswer(*self._answer_without_llm(question, contexts))
+            counts["abstained"] = self.is_abstain(answer.text)
+            return answer
+
+    @staticmethod
+    def is_abstain(text: str) -> bool:
+        return text.startswith(_ABSTAIN_PREFIX)
+
+    def _answer_without_llm(self, question: str, contexts: list[RetrievalContext]) -> tuple[str, float]:
         if not contexts:
             return self._insufficient_context(contexts)
 
         confidence = max(ctx.score for ctx in contexts)
         if confidence < self.settings.confidence_threshold:
             return self._insufficient_context(contexts)
+        return self._extractive_answer(question, contexts), confidence
 
-        chosen_mode = mode or self.settings.mode
-        if chosen_mode == "llm":
-            return self._llm_answer(question, contexts), confidence
+    def generate(
+        self,
+        question: str,
+        contexts: list[RetrievalContext],
+        mode: str | None = None,
+    ) -> tuple[str, float]:
+        answer = self.generate_answer(question, contexts, mode=mode)
+        return answer.text, answer.confidence
 
-        return self._extractive_answer(question, contexts), confidence
+    def generate_stream(
+        self,
+        question: str,
+        contexts: list[RetrievalContext],
+        mode: str | None = None,
+    ) -> AnswerStream:
+        """Like ``generate_answer`` but yields the answer in pieces; only llm mode streams token by token."""
+        confidence = self._llm_confidence(contexts, mode)
+        if confidence is not None:
+            stream = AnswerStream(pieces=iter(()), confidence=confidence)
+            stream.pieces = self._llm_stream(question, contexts, stream)
+            return stream
+
+        text, confidence = self._answer_without_llm(question, contexts)
+        return AnswerStream(pieces=iter([text]), confidence=confidence)
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+
+import orjson
+
+from app.core.logging import get_logger
+from app.rag.chunk_store import ChunkStore, open_chunk_store, source_stamp
+from app.rag.jsonl import read_jsonl
+from app.rag.schema import ChunkRecord
+
+logger = get_logger(__name__)
+
+# chunks.jsonl is the compacted base of an append-only log; deletes go to ``chunks.tombstones.jsonl`` next to it,
+# one line per deleted chat:
+#   {"chat_id": ..., "base": {"size": ..., "mtime_ns": ...}, "deleted_at": ...}
+# ``base`` is the stamp of the chunks.jsonl the delete applies to, and readers drop the chunks of every chat with a
+# tombstone for the current file, so a delete costs one appended line instead of a rewrite. Compaction rewrites
+# chunks.jsonl without those chats and swaps it in with os.replace; the new file's stamp retires every tombstone
+# at that same moment, so a reader sees either the old file minus its tombstones or the compacted file.
+
+
+def tombstone_path(chunks_path: Path) -> Path:
+    return chunks_path.with_name(f"{chunks_path.stem}.tombstones.jsonl")
+
+
+def append_tombstone(chunks_path: Path, chat_id: str) -> bool:
+    """Hide ``chat_id`` from readers of ``chunks_path``; ``False`` when there is no chunks file to hide it in."""
+    try:
+        base = source_stamp(chunks_path)
+    except FileNotFoundError:
+        return False
+    deleted_at = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+    line = orjson.dumps({"chat_id": chat_id, "base": base, "deleted_at": deleted_at}) + b"\n"
+    # One O_APPEND write per tombstone, so concurrent readers never see a line from the middle.
+    fd = os.open(tombstone_path(chunks_path), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+    return True
+
+
+def deleted_chats(chunks_path: Path) -> frozenset[str]:
+    """Chats tombstoned against the current ``chunks_path``; tombstones for an earlier file are ignored."""
+    try:
+        data = tombstone_path(chunks_path).read_bytes()
+        base = source_stamp(chunks_path)
+    except FileNotFoundError:
+        return frozenset()
+    deleted: set[str] = set()
+    for line in data.splitlines():
+        if not line.strip():
+            continue
+        try:
+            entry = orjson.loads(line)
+        except orjson.JSONDecodeError:
+            # A write cut short by a crash leaves at most one torn line; the delete it recorded is lost.
+            logger.warning("Skipping unreadable tombstone in %s", tombstone_path(chunks_path))
+            continue
+        if entry.get("base") == base:
+            deleted.add(entry["chat_id"])
+    return frozenset(deleted)
+
+
+def chunk_garbage(chunks_path: Path) -> tuple[int, int]:
+    """Rows of ``chunks_path`` hidden by tombstones, and all of its rows; scans the file, so keep it off hot paths."""
+    deleted = deleted_chats(chunks_path)
+    if not deleted:
+        return 0, 0
+    store = open_chunk_store(chunks_path)
+    if store is None:
+        store = ChunkStore.from_chunks(read_jsonl(chunks_path, ChunkRecord, kind="chunks"))
+    return len(store) - len(store.filter_rows(exclude_chat_ids=deleted)), len(store)
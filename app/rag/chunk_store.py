@@ -0,0 +1,346 @@
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import shutil
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Collection, Iterator, Sequence, overload
+
+import numpy as np
+import orjson
+
+from app.core.logging import get_logger
+from app.rag.jsonl import _trusted
+from app.rag.schema import ChunkRecord
+
+logger = get_logger(__name__)
+
+# Columnar copy of chunks.jsonl in a ``chunks.store`` directory next to it, opened with mmap:
+#   text.bin + text_offsets.npy   chunk texts as one UTF-8 blob, row i is blob[offsets[i]:offsets[i + 1]]
+#   side.bin + side_offsets.npy   the remaining fields of each row (message ids, times, title, metadata) as JSON
+#   chunk_id.npy                  fixed-width ids in row order; id_sorted.npy + id_rows.npy for binary search
+#   chat.npy, topic.npy           int32 codes into the chat / topic tables of store.json
+#   start_ts.npy                  start_at as epoch seconds, NaN when missing or unparseable
+#   store.json                    version, row count, tables, and the size/mtime of the JSONL it mirrors
+# The JSONL stays the canonical, interoperable copy; a store whose recorded size/mtime no longer match it
+# is ignored, so a failed or foreign write of chunks.jsonl can never be served from a stale store.
+STORE_VERSION = 1
+_META = "store.json"
+
+
+def store_dir(chunks_path: Path) -> Path:
+    return chunks_path.with_name(f"{chunks_path.stem}.store")
+
+
+def parse_timestamp(value: str | None) -> float | None:
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def source_stamp(path: Path) -> dict[str, int]:
+    """Size and mtime of the file a sidecar mirrors; a sidecar whose stamp differs is stale."""
+    stat = path.stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+@contextmanager
+def staged_directory(target: Path) -> Iterator[Path]:
+    """Yield an empty staging directory that replaces ``target`` if the block completes."""
+    # Per-process names: two workers rebuilding the same sidecar must not share a staging directory.
+    staging = target.with_name(f".{target.name}.{os.getpid()}.partial")
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+    try:
+        yield staging
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    retired = target.with_name(f".{target.name}.{os.getpid()}.old")
+    shutil.rmtree(retired, ignore_errors=True)
+    if target.exists():
+        os.replace(target, retired)
+    os.replace(staging, target)
+    shutil.rmtree(retired, ignore_errors=True)
+
+
+def _codes(values: list[str]) -> tuple[np.ndarray, list[str]]:
+    table: dict[str, int] = {}
+    codes = np.fromiter((table.setdefault(value, len(table)) for value in values), dtype=np.int32, count=len(values))
+    return codes, list(table)
+
+
+def _columns(chunks: Sequence[ChunkRecord]) -> tuple[dict[str, np.ndarray], list[str], list[str]]:
+    """Fixed-width columns plus the chat and topic tables their codes point into."""
+    chat_codes, chats = _codes([chunk.chat_id for chunk in chunks])
+    topic_codes, topics = _codes([chunk.topic for chunk in chunks])
+    stamps = [parse_timestamp(chunk.start_at) for chunk in chunks]
+    columns = {
+        "chunk_id": np.array([chunk.chunk_id.encode("utf-8") for chunk in chunks], dtype=np.bytes_),
+        "chat": chat_codes,
+        "topic": topic_codes,
+        "start_ts": np.array([np.nan if ts is None else ts for ts in stamps], dtype=np.float64),
+    }
+    return columns, chats, topics
+
+
+def _side_fields(chunk: ChunkRecord) -> dict[str, Any]:
+    return {
+        "chat_title": chunk.chat_title,
+        "message_ids": chunk.message_ids,
+        "start_at": chunk.start_at,
+        "end_at": chunk.end_at,
+        "metadata": chunk.metadata,
+    }
+
+
+def _write_blob(directory: Path, name: str, parts: list[bytes]) -> None:
+    offsets = np.zeros(len(parts) + 1, dtype=np.uint64)
+    np.cumsum([len(part) for part in parts], out=offsets[1:])
+    (directory / f"{name}.bin").write_bytes(b"".join(parts))
+    np.save(directory / f"{name}_offsets.npy", offsets)
+
+
+def write_chunk_store(chunks_path: Path, chunks: Sequence[ChunkRecord]) -> Path:
+    """Write the columnar store for ``chunks_path``; call after the JSONL itself is in place."""
+    target = store_dir(chunks_path)
+    with staged_directory(target) as staging:
+        _write_blob(staging, "text", [chunk.text.encode("utf-8") for chunk in chunks])
+        _write_blob(staging, "side", [orjson.dumps(_side_fields(chunk)) for chunk in chunks])
+        columns, chats, topics = _columns(chunks)
+        order = np.argsort(columns["chunk_id"], kind="stable")
+        columns["id_sorted"] = columns["chunk_id"][order]
+        columns["id_rows"] = order.astype(np.int64)
+        for name, values in columns.items():
+            np.save(staging / f"{name}.npy", values)
+        meta = {
+            "version": STORE_VERSION,
+            "count": len(chunks),
+            "chats": chats,
+            "topics": topics,
+            "source": source_stamp(chunks_path),
+        }
+        (staging / _META).write_text(json.dumps(meta), encoding="utf-8")
+    return target
+
+
+def _map(path: Path) -> mmap.mmap | bytes:
+    with path.open("rb") as f:
+        # mmap refuses empty files; the mapping outlives the file object.
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
+
+
+class ChunkStore:
+    """Read side of the columnar store: row lookup by id, column filters, and per-row materialization.
+
+    ``ChunkStore.from_chunks`` builds the same columns in memory over a list of records (kept in ``records``),
+    for chunk files that have no store next to them; ``records`` is ``None`` for a mapped store.
+    """
+
+    def __init__(
+        self,
+        chunk_ids: np.ndarray,
+        chat_codes: np.ndarray,
+        topic_codes: np.ndarray,
+        start_ts: np.ndarray,
+        chats: list[str],
+        topics: list[str],
+        records: Sequence[ChunkRecord] | None = None,
+        directory: Path | None = None,
+    ) -> None:
+        self.chunk_ids = chunk_ids
+        self.chat_codes = chat_codes
+        self.topic_codes = topic_codes
+        self.start_ts = start_ts
+        self.chats = chats
+        self.topics = topics
+        self.directory = directory
+        self.records = records
+        self._chat_index = {chat_id: code for code, chat_id in enumerate(chats)}
+        self._topic_index = {topic: code for code, topic in enumerate(topics)}
+        self._id_sorted: np.ndarray | None = None
+        self._id_rows: np.ndarray | None = None
+        self._text: mmap.mmap | bytes = b""
+        self._text_offsets: np.ndarray | None = None
+        self._side: mmap.mmap | bytes = b""
+        self._side_offsets: np.ndarray | None = None
+
+    @classmethod
+    def open(cls, directory: Path, meta: dict[str, Any] | None = None) -> ChunkStore:
+        if meta is None:
+            meta = json.loads((directory / _META).read_text(encoding="utf-8"))
+        if meta.get("version") != STORE_VERSION:
+            raise ValueError(f"{directory} has store version {meta.get('version')}, expected {STORE_VERSION}")
+
+        def column(name: str) -> np.ndarray:
+            return np.load(directory / f"{name}.npy", mmap_mode="r")
+
+        store = cls(
+            chunk_ids=column("chunk_id"),
+            chat_codes=column("chat"),
+            topic_codes=column("topic"),
+            start_ts=column("start_ts"),
+            chats=meta["chats"],
+            topics=meta["topics"],
+            directory=directory,
+        )
+        store._id_sorted = column("id_sorted")
+        store._id_rows = column("id_rows")
+        store._text, store._text_offsets = _map(directory / "text.bin"), column("text_offsets")
+        store._side, store._side_offsets = _map(directory / "side.bin"), column("side_offsets")
+        return store
+
+    @classmethod
+    def from_chunks(cls, chunks: Sequence[ChunkRecord]) -> ChunkStore:
+        columns, chats, topics = _columns(chunks)
+        return cls(
+            chunk_ids=columns["chunk_id"],
+            chat_codes=columns["chat"],
+            topic_codes=columns["topic"],
+            start_ts=columns["start_ts"],
+            chats=chats,
+            topics=topics,
+            records=chunks,
+        )
+
+    def __len__(self) -> int:
+        return len(self.chunk_ids)
+
+    def _ensure_id_index(self) -> None:
+        if self._id_sorted is None:
+            order = np.argsort(self.chunk_ids, kind="stable")
+            self._id_sorted, self._id_rows = self.chunk_ids[order], order
+
+    def row_of(self, chunk_id: str) -> int | None:
+        """Row of ``chunk_id`` by binary search over the sorted id column."""
+        self._ensure_id_index()
+        key = chunk_id.encode("utf-8")
+        pos = int(np.searchsorted(self._id_sorted, key))
+        if pos < len(self._id_sorted) and self._id_sorted[pos] == key:
+            return int(self._id_rows[pos])
+        return None
+
+    def get(self, chunk_id: str) -> ChunkRecord | None:
+        row = self.row_of(chunk_id)
+        return None if row is None else self.record(row)
+
+    def text(self, row: int) -> str:
+        if self.records is not None:
+            return self.records[row].text
+        start, end = int(self._text_offsets[row]), int(self._text_offsets[row + 1])
+        return self._text[start:end].decode("utf-8")
+
+    def record(self, row: int) -> ChunkRecord:
+        if self.records is not None:
+            return self.records[row]
+        start, end = int(self._side_offsets[row]), int(self._side_offsets[row + 1])
+        side = orjson.loads(self._side[start:end])
+        # Rows were written from validated records, so they are rebuilt the way trusted JSONL lines are.
+        return _trusted(
+            ChunkRecord,
+            {
+                "chunk_id": self.chunk_ids[row].decode("utf-8"),
+                "chat_id": self.chats[self.chat_codes[row]],
+                "chat_title": side["chat_title"],
+                "message_ids": side["message_ids"],
+                "start_at": side["start_at"],
+                "end_at": side["end_at"],
+                "topic": self.topics[self.topic_codes[row]],
+                "text": self.text(row),
+                "metadata": side["metadata"],
+            },
+        )
+
+    def filter_rows(
+        self,
+        topic: str | None = None,
+        chat_ids: list[str] | None = None,
+        from_ts: float | None = None,
+        to_ts: float | None = None,
+        exclude_chat_ids: Collection[str] | None = None,
+    ) -> np.ndarray:
+        """Rows passing every given filter, in row order; rows without a timestamp pass date filters."""
+        mask = np.ones(len(self), dtype=bool)
+        if topic:
+            code = self._topic_index.get(topic)
+            if code is None:
+                return np.zeros(0, dtype=np.int64)
+            mask &= self.topic_codes == code
+        if chat_ids:
+            codes = [self._chat_index[chat_id] for chat_id in chat_ids if chat_id in self._chat_index]
+            mask &= np.isin(self.chat_codes, codes)
+        if exclude_chat_ids:
+            codes = [self._chat_index[chat_id] for chat_id in exclude_chat_ids if chat_id in self._chat_index]
+            mask &= ~np.isin(self.chat_codes, codes)
+        if from_ts is not None or to_ts is not None:
+            stamps = np.asarray(self.start_ts)
+            undated = np.isnan(stamps)
+            with np.errstate(invalid="ignore"):
+                if from_ts is not None:
+                    mask &= undated | (stamps >= from_ts)
+                if to_ts is not None:
+                    mask &= undated | (stamps <= to_ts)
+        return np.flatnonzero(mask)
+
+
+def open_chunk_store(chunks_path: Path) -> ChunkStore | None:
+    """The mmap'd store for ``chunks_path`` if it exists and still mirrors the JSONL; ``None`` otherwise."""
+    directory = store_dir(chunks_path)
+    try:
+        meta = json.loads((directory / _META).read_text(encoding="utf-8"))
+        if meta.get("source") != source_stamp(chunks_path):
+            return None
+        return ChunkStore.open(directory, meta)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError) as exc:
+        logger.warning("Ignoring unreadable chunk store %s: %s", directory, exc)
+        return None
+
+
+class LazyChunks(Sequence[ChunkRecord]):
+    """The chunk list of a store, or of the given ``rows`` of it; records are materialized only when read."""
+
+    def __init__(self, store: ChunkStore, rows: np.ndarray | None = None) -> None:
+        self.store = store
+        self.rows = rows
+
+    def _row(self, index: int) -> int:
+        return index if self.rows is None else int(self.rows[index])
+
+    def __len__(self) -> int:
+        return len(self.store) if self.rows is None else len(self.rows)
+
+    @overload
+    def __getitem__(self, index: int) -> ChunkRecord: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[ChunkRecord]: ...
+
+    def __getitem__(self, index: int | slice) -> ChunkRecord | list[ChunkRecord]:
+        if isinstance(index, slice):
+            return [self.store.record(self._row(i)) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self.store.record(self._row(index))
+
+    def __iter__(self) -> Iterator[ChunkRecord]:
+        return (self.store.record(self._row(i)) for i in range(len(self)))
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (list, LazyChunks)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    __hash__ = None  # type: ignore[assignment]
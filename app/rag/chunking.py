@@ -1,35 +1,43 @@
 from __future__ import annotations
 
-import json
 from collections import defaultdict
+from functools import lru_cache
 from pathlib import Path
+from typing import TYPE_CHECKING, Sequence
 from uuid import uuid4
 
-import tiktoken
-
+from app.rag.chunk_log import deleted_chats
+from app.rag.chunk_store import LazyChunks, open_chunk_store
 from app.rag.ingest.normalize import count_roles
-from app.rag.schema import ChunkRecord, NormalizedMessage
+from app.rag.jsonl import read_jsonl, write_jsonl
+from app.rag.records import MessageRecord
+from app.rag.schema import ChunkRecord
+
+if TYPE_CHECKING:
+    import tiktoken
 
 
+@lru_cache(maxsize=1)
 def _encoding() -> tiktoken.Encoding | None:
+    # Resolved on first use: get_encoding may try to download the BPE file.
     try:
+        import tiktoken
+
         return tiktoken.get_encoding("cl100k_base")
     except Exception:
         return None
 
 
-_TOKENIZER = _encoding()
-
-
 def approx_token_count(text: str) -> int:
     if not text:
         return 0
-    if _TOKENIZER is None:
+    tokenizer = _encoding()
+    if tokenizer is None:
         return max(1, len(text) // 4)
-    return len(_TOKENIZER.encode(text))
+    return len(tokenizer.encode(text))
 
 
-def _message_to_chunk_line(message: NormalizedMessage) -> str:
+def _message_to_chunk_line(message: MessageRecord) -> str:
     stamp = message.created_at or "unknown_time"
     return f"[{message.role} | {stamp} | {message.message_id}]\n{message.text}".strip()
 
@@ -40,7 +48,7 @@ def _timestamp_sort_key(value: str | None) -> tuple[int, str]:
     return (0, value)
 
 
-def _choose_topic(messages: list[NormalizedMessage]) -> str:
+def _choose_topic(messages: list[MessageRecord]) -> str:
     topics = [m.topic for m in messages if m.topic]
     if not topics:
         return "unknown"
@@ -49,11 +57,11 @@ def _choose_topic(messages: list[NormalizedMessage]) -> str:
 
 
 def build_chunks(
-    messages: list[NormalizedMessage],
+    messages: list[MessageRecord],
     max_tokens: int,
     overlap_messages: int,
 ) -> list[ChunkRecord]:
-    grouped: dict[str, list[NormalizedMessage]] = defaultdict(list)
+    grouped: dict[str, list[MessageRecord]] = defaultdict(list)
     for message in messages:
         grouped[message.chat_id].append(message)
 
@@ -62,10 +70,10 @@ def build_chunks(
     for _, chat_messages in grouped.items():
         chat_messages.sort(key=lambda m: (_timestamp_sort_key(m.created_at), m.message_id))
 
-        current_entries: list[tuple[NormalizedMessage, str, int]] = []
+        current_entries: list[tuple[MessageRecord, str, int]] = []
         current_tokens = 0
 
-        def emit(entries: list[tuple[NormalizedMessage, str, int]]) -> None:
+        def emit(entries: list[tuple[MessageRecord, str, int]]) -> None:
             if not entries:
                 return
 
@@ -127,23 +135,19 @@ def build_chunks(
 
 
 def write_chunks_jsonl(path: Path, chunks: list[ChunkRecord]) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("w", encoding="utf-8") as f:
-        for chunk in chunks:
-            f.write(chunk.model_dump_json())
-            f.write("\n")
-
-
-def load_chunks_jsonl(path: Path) -> list[ChunkRecord]:
-    if not path.exists():
-        return []
-
-    chunks: list[ChunkRecord] = []
-    with path.open("r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            data = json.loads(line)
-            chunks.append(ChunkRecord.model_validate(data))
-    return chunks
+    write_jsonl(path, chunks, kind="chunks")
+
+
+def load_chunks_jsonl(path: Path, validate: bool = False) -> Sequence[ChunkRecord]:
+    """Load chunks; pass ``validate`` for files that did not come from this pipeline.
+
+    When a current columnar store mirrors ``path``, the chunks come from it lazily instead of parsing the file.
+    Chunks of chats tombstoned against the file are left out.
+    """
+    deleted = deleted_chats(path)
+    if not validate:
+        store = open_chunk_store(path)
+        if store is not None:
+            return LazyChunks(store, store.filter_rows(exclude_chat_ids=deleted) if deleted else None)
+    chunks = read_jsonl(path, ChunkRecord, kind="chunks", validate=validate)
+    return [chunk for chunk in chunks if chunk.chat_id not in deleted] if deleted else chunks
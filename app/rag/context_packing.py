@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Sequence
+
+from app.rag.chunking import approx_token_count
+from app.rag.schema import RetrievalContext
+
+# Chunk texts are "\n\n"-joined "[role | created_at | message_id]\n<text>" entries (chunking._message_to_chunk_line).
+_HEADER_RE = re.compile(
+    r"^\[(?:user|assistant|system|tool|unknown) \| (?P<stamp>[^|\n]+) \| (?P<id>[^\]\n]+)\]$",
+    re.M,
+)
+
+
+@dataclass
+class _Segment:
+    key: str
+    stamp: str | None
+    text: str
+    tokens: int
+
+
+@dataclass
+class PackedBlock:
+    """All selected messages of one chat, in chronological order, cited by every chunk label that fed it."""
+
+    chat_id: str
+    chat_title: str | None
+    score: float
+    labels: list[str] = field(default_factory=list)
+    segments: list[_Segment] = field(default_factory=list)
+
+    def header(self) -> str:
+        title = f" {self.chat_title}" if self.chat_title else ""
+        return f"{''.join(f'[{label}]' for label in self.labels)} chat={self.chat_id}{title} score={self.score:.3f}"
+
+    def render(self) -> str:
+        ordered = sorted(self.segments, key=lambda seg: ((0, seg.stamp) if seg.stamp else (1, ""), seg.key))
+        return self.header() + "\n" + "\n\n".join(seg.text for seg in ordered)
+
+
+@dataclass
+class PackedContext:
+    text: str
+    blocks: list[PackedBlock]
+    naive_tokens: int
+    packed_tokens: int
+    duplicate_messages: int
+    dropped_messages: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(self.naive_tokens - self.packed_tokens, 0)
+
+
+def naive_context_text(contexts: Sequence[RetrievalContext]) -> str:
+    """The unpacked prompt context: every chunk verbatim, overlapping messages included."""
+    return "\n\n".join(f"[C{idx}] score={ctx.score:.3f}\n{ctx.text}" for idx, ctx in enumerate(contexts, start=1))
+
+
+def split_messages(ctx: RetrievalContext) -> list[_Segment]:
+    """Split a chunk back into its messages; a chunk without recognizable headers stays one segment."""
+    known_ids = set(ctx.message_ids)
+    headers = [match for match in _HEADER_RE.finditer(ctx.text) if match.group("id") in known_ids]
+    if not headers:
+        text = ctx.text.strip()
+        return [_Segment(key=ctx.chunk_id, stamp=ctx.created_at, text=text, tokens=approx_token_count(text))]
+
+    segments: list[_Segment] = []
+    for position, match in enumerate(headers):
+        end = headers[position + 1].start() if position + 1 < len(headers) else len(ctx.text)
+        text = ctx.text[match.start() : end].strip()
+        stamp = match.group("stamp")
+        segments.append(
+            _Segment(
+                key=match.group("id"),
+                stamp=None if stamp == "unknown_time" else stamp,
+                text=text,
+                tokens=approx_token_count(text),
+            )
+        )
+    return segments
+
+
+def pack_contexts(contexts: Sequence[RetrievalContext], token_budget: int) -> PackedContext:
+    """Merge contexts per chat, drop messages repeated by chunk overlap, and fill ``token_budget`` in score order.
+
+    ``contexts`` keep their ``[C<n>]`` labels (position + 1) so citations still line up with the response.
+    Block headers, labels and separators are charged against the budget along with the messages, so
+    ``packed_tokens`` never exceeds it. Messages that do not fit the remaining budget are skipped;
+    later, smaller ones may still fit.
+    """
+    blocks: dict[str, PackedBlock] = {}
+    seen: set[tuple[str, str]] = set()
+    used = 0
+    duplicates = 0
+    dropped = 0
+    # Token counts are not additive across joins, so every joined piece carries one token of slack.
+    join_tokens = approx_token_count("\n\n") + 1
+
+    ranked = sorted(enumerate(contexts, start=1), key=lambda item: item[1].score, reverse=True)
+    for label_idx, ctx in ranked:
+        label = f"C{label_idx}"
+        label_tokens = approx_token_count(f"[{label}]") + 1
+        for segment in split_messages(ctx):
+            block = blocks.get(ctx.chat_id)
+            cited = block is not None and label in block.labels
+            if (ctx.chat_id, segment.key) in seen:
+                duplicates += 1
+                # The message is already in the prompt; this chunk is cited too if its label still fits.
+                if block is not None and not cited and used + label_tokens <= token_budget:
+                    block.labels.append(label)
+                    used += label_tokens
+                continue
+
+            if block is None:
+                new_block = PackedBlock(ctx.chat_id, ctx.chat_title, ctx.score, labels=[label])
+                cost = approx_token_count(new_block.header()) + 1 + (join_tokens if blocks else 0)
+            else:
+                cost = 0 if cited else label_tokens
+            cost += join_tokens + segment.tokens + 1
+            if used + cost > token_budget:
+                dropped += 1
+                continue
+
+            if block is None:
+                block = blocks[ctx.chat_id] = new_block
+            elif not cited:
+                block.labels.append(label)
+            block.segments.append(segment)
+            seen.add((ctx.chat_id, segment.key))
+            used += cost
+
+    ordered_blocks = list(blocks.values())
+    for block in ordered_blocks:
+        block.labels.sort(key=lambda label: int(label[1:]))
+    text = "\n\n".join(block.render() for block in ordered_blocks)
+    return PackedContext(
+        text=text,
+        blocks=ordered_blocks,
+        naive_tokens=approx_token_count(naive_context_text(contexts)),
+        packed_tokens=approx_token_count(text),
+        duplicate_messages=duplicates,
+        dropped_messages=dropped,
+    )
@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from time import monotonic
+from typing import Callable
+
+import numpy as np
+
+from app.core.concurrency import ModelBusyError
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Wire format (little-endian):
+#   request:  b"EMB1" | u32 count | count x (u32 nbytes | utf-8 bytes)
+#   response: u8 status | status 0: u32 rows | u32 dim | rows*dim float32
+#                         status 1 (busy) / 2 (error): u32 nbytes | utf-8 message
+_MAGIC = b"EMB1"
+_STATUS_OK = 0
+_STATUS_BUSY = 1
+_STATUS_ERROR = 2
+_U32 = struct.Struct("<I")
+_HEADER = struct.Struct("<4sI")
+_OK_HEADER = struct.Struct("<BII")
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:], size - received)
+        if count == 0:
+            raise ConnectionError("Embedding server connection closed")
+        received += count
+    return bytes(buffer)
+
+
+def encode_request(texts: list[str]) -> bytes:
+    parts = [_HEADER.pack(_MAGIC, len(texts))]
+    for text in texts:
+        raw = text.encode("utf-8")
+        parts.append(_U32.pack(len(raw)))
+        parts.append(raw)
+    return b"".join(parts)
+
+
+def read_request(sock: socket.socket) -> list[str]:
+    magic, count = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    if magic != _MAGIC:
+        raise ValueError("Bad embedding request frame")
+    texts: list[str] = []
+    for _ in range(count):
+        (size,) = _U32.unpack(_recv_exact(sock, _U32.size))
+        texts.append(_recv_exact(sock, size).decode("utf-8"))
+    return texts
+
+
+def encode_vectors(vectors: np.ndarray) -> bytes:
+    vectors = np.ascontiguousarray(vectors, dtype="<f4")
+    return _OK_HEADER.pack(_STATUS_OK, vectors.shape[0], vectors.shape[1]) + vectors.tobytes()
+
+
+def encode_failure(status: int, message: str) -> bytes:
+    raw = message.encode("utf-8")
+    return bytes([status]) + _U32.pack(len(raw)) + raw
+
+
+def read_response(sock: socket.socket) -> np.ndarray:
+    status = _recv_exact(sock, 1)[0]
+    if status != _STATUS_OK:
+        (size,) = _U32.unpack(_recv_exact(sock, _U32.size))
+        message = _recv_exact(sock, size).decode("utf-8")
+        if status == _STATUS_BUSY:
+            raise ModelBusyError(message, retry_after_s=1)
+        raise RuntimeError(f"Embedding server error: {message}")
+    rows, dim = struct.unpack("<II", _recv_exact(sock, 8))
+    payload = _recv_exact(sock, rows * dim * 4)
+    return np.frombuffer(payload, dtype="<f4").reshape(rows, dim).astype(np.float32, copy=False)
+
+
+class _MicroBatcher:
+    """Merges concurrent requests from all connections into single encode calls."""
+
+    def __init__(
+        self,
+        encode: Callable[[list[str]], np.ndarray],
+        max_batch: int,
+        max_wait_s: float,
+        max_pending: int,
+    ) -> None:
+        self._encode = encode
+        self._max_batch = max_batch
+        self._max_wait_s = max_wait_s
+        self._queue: queue.Queue[tuple[list[str], Future]] = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._loop, name="embedding-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, texts: list[str]) -> Future:
+        future: Future = Future()
+        try:
+            self._queue.put_nowait((texts, future))
+        except queue.Full as exc:
+            raise ModelBusyError("Embedding server queue is full", retry_after_s=1) from exc
+        return future
+
+    def _loop(self) -> None:
+        while True:
+            pending = [self._queue.get()]
+            size = len(pending[0][0])
+            deadline = monotonic() + self._max_wait_s
+            while size < self._max_batch:
+                remaining = deadline - monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                pending.append(item)
+                size += len(item[0])
+
+            texts = [text for item_texts, _ in pending for text in item_texts]
+            try:
+                vectors = self._encode(texts)
+            except Exception as exc:
+                for _, future in pending:
+                    future.set_exception(exc)
+                continue
+
+            offset = 0
+            for item_texts, future in pending:
+                future.set_result(vectors[offset : offset + len(item_texts)])
+                offset += len(item_texts)
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    server: "EmbeddingServer"
+
+    def handle(self) -> None:
+        sock: socket.socket = self.request
+        while True:
+            try:
+                texts = read_request(sock)
+            except (ConnectionError, ValueError, struct.error):
+                return
+            try:
+                if texts:
+                    response = encode_vectors(self.server.batcher.submit(texts).result())
+                else:
+                    response = encode_vectors(np.zeros((0, 0), dtype=np.float32))
+            except ModelBusyError as exc:
+                response = encode_failure(_STATUS_BUSY, str(exc))
+            except Exception as exc:
+                logger.exception("Embedding request failed")
+                response = encode_failure(_STATUS_ERROR, str(exc))
+            try:
+                sock.sendall(response)
+            except OSError:
+                # The client gave up (timeout) and closed its end.
+                return
+
+
+class EmbeddingServer(socketserver.ThreadingUnixStreamServer):
+    """One process owns the model; workers embed through it over a Unix socket."""
+
+    daemon_threads = True
+    # Every API worker thread keeps its own connection; the default backlog of 5 rejects bursts of them.
+    request_queue_size = 128
+
+    def __init__(
+        self,
+        socket_path: Path,
+        encode: Callable[[list[str]], np.ndarray],
+        max_batch: int = 64,
+        max_wait_ms: float = 5.0,
+        max_pending: int = 1024,
+    ) -> None:
+        if socket_path.exists():
+            socket_path.unlink()
+        socket_path.parent.mkdir(parents=True, exist_ok=True)
+        self.batcher = _MicroBatcher(encode, max_batch, max_wait_ms / 1000, max_pending)
+        super().__init__(str(socket_path), _Handler)
+        os.chmod(socket_path, 0o660)
+
+
+class EmbeddingClient:
+    """Drop-in for a model's ``encode`` that forwards to an ``EmbeddingServer``."""
+
+    def __init__(self, socket_path: Path, timeout_s: float = 30.0) -> None:
+        self.socket_path = socket_path
+        self.timeout_s = timeout_s
+        self._local = threading.local()
+
+    def _connection(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = self._connect()
+            self._local.sock = sock
+        return sock
+
+    def _connect(self) -> socket.socket:
+        deadline = time.monotonic() + self.timeout_s
+        while True:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout_s)
+            try:
+                sock.connect(str(self.socket_path))
+                return sock
+            except BlockingIOError as exc:
+                # A Unix socket with a timeout fails with EAGAIN instead of waiting while the backlog is full.
+                sock.close()
+                if time.monotonic() >= deadline:
+                    raise ConnectionError("Embedding server backlog is full") from exc
+                time.sleep(0.01)
+            except BaseException:
+                sock.close()
+                raise
+
+    def _reset(self) -> None:
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+        self._local.sock = None
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        request = encode_request(texts)
+        for attempt in range(2):
+            try:
+                sock = self._connection()
+                sock.sendall(request)
+                return read_response(sock)
+            except ConnectionError:
+                # A stale per-thread connection is retried once on a fresh socket.
+                self._reset()
+                if attempt:
+                    raise
+            except socket.timeout:
+                # The server may still be encoding these texts, so a retry would encode them twice.
+                # Drop the connection so its late response is never read as another request's answer.
+                self._reset()
+                raise
+        raise AssertionError("unreachable")
+
+    def encode(self, sentences: list[str], **kwargs: object) -> np.ndarray:
+        # Batching and normalization are decided by the server's embedder.
+        return self.embed(sentences)
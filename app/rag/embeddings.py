@@ -1,55 +1,284 @@
 from __future__ import annotations
 
-from typing import Iterable
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from functools import partial
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Callable
 
 import numpy as np
 
+from app.core.concurrency import ModelGovernor, set_intra_op_threads
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
 
+_PROGRESS_LOG_INTERVAL_S = 5.0
+
+
+def _load_sentence_transformer(model_name: str):
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(model_name)
+
+
+def length_sorted_batches(texts: list[str], batch_size: int) -> list[np.ndarray]:
+    """Group text indices into batches of similar length to minimise padding.
+
+    Character length stands in for token length (as sentence-transformers does
+    internally); it orders texts almost identically and costs nothing to compute.
+    """
+    order = np.argsort(np.fromiter((len(t) for t in texts), dtype=np.int64, count=len(texts)), kind="stable")
+    return [order[start : start + batch_size] for start in range(0, len(order), batch_size)]
+
+
+def default_pool_size(cpu_count: int | None = None) -> tuple[int, int]:
+    """Return ``(workers, threads_per_worker)`` for bulk embedding on this host."""
+    cpus = cpu_count or os.cpu_count() or 1
+    threads = 2 if cpus >= 4 else 1
+    # Every worker holds its own model copy, so cap the fan-out.
+    workers = max(1, min(8, cpus // threads))
+    return workers, threads
+
 
 class LocalEmbedder:
-    def __init__(self, model_name: str, batch_size: int = 32, normalize_embeddings: bool = True) -> None:
+    def __init__(
+        self,
+        model_name: str,
+        batch_size: int = 32,
+        normalize_embeddings: bool = True,
+        backend: str = "torch",
+        onnx_dir: Path | None = None,
+        onnx_quantized: bool = False,
+        intra_op_threads: int = 0,
+        governor: ModelGovernor | None = None,
+        server_socket: Path | None = None,
+    ) -> None:
         self.model_name = model_name
         self.batch_size = batch_size
         self.normalize_embeddings = normalize_embeddings
+        self.backend = backend
+        self.onnx_dir = onnx_dir
+        self.onnx_quantized = onnx_quantized
+        self.intra_op_threads = intra_op_threads
+        self.governor = governor
+        self.server_socket = server_socket
         self._model = None
+        # The warm-up thread and the first requests may all reach _load_model at once.
+        self._model_lock = threading.Lock()
+
+    def _model_loader(self, intra_op_threads: int) -> Callable[[str], Any]:
+        if self.backend == "onnx":
+            if self.onnx_dir is None:
+                raise ValueError("EMB_ONNX_DIR must be set for the onnx embedding backend")
+            from app.rag.onnx_embedder import load_onnx_encoder
+
+            return partial(
+                load_onnx_encoder,
+                model_dir=self.onnx_dir,
+                quantized=self.onnx_quantized,
+                intra_op_threads=intra_op_threads,
+            )
+        return _load_sentence_transformer
 
     def _load_model(self):
-        if self._model is None:
-            logger.info("Loading embedding model: %s", self.model_name)
-            from sentence_transformers import SentenceTransformer
+        if self._model is not None:
+            return self._model
+        with self._model_lock:
+            if self._model is None and self.server_socket is not None:
+                from app.rag.embedding_server import EmbeddingClient
 
-            self._model = SentenceTransformer(self.model_name)
-        return self._model
+                logger.info("Using shared embedding server at %s", self.server_socket)
+                self._model = EmbeddingClient(self.server_socket)
+            if self._model is None:
+                logger.info("Loading embedding model: %s (%s backend)", self.model_name, self.backend)
+                if self.backend == "torch":
+                    set_intra_op_threads(self.intra_op_threads)
+                self._model = self._model_loader(self.intra_op_threads)(self.model_name)
+            return self._model
 
-    def embed_texts(self, texts: list[str]) -> np.ndarray:
+    def _slot(self, interactive: bool):
+        if self.governor is None:
+            return nullcontext()
+        return self.governor.slot(bounded=interactive)
+
+    def embed_texts(self, texts: list[str], interactive: bool = False) -> np.ndarray:
+        """Embed ``texts``; ``interactive`` calls are subject to the governor's admission limits."""
         if not texts:
             return np.zeros((0, 0), dtype=np.float32)
 
         model = self._load_model()
-        all_vectors: list[np.ndarray] = []
         total = len(texts)
-        for start in range(0, total, self.batch_size):
-            end = min(start + self.batch_size, total)
-            logger.info("Embedding batch %s-%s/%s", start + 1, end, total)
-            batch = texts[start:end]
+        output: np.ndarray | None = None
+        done = 0
+        last_log = perf_counter()
+        for indices in length_sorted_batches(texts, self.batch_size):
+            with self._slot(interactive):
+                vectors = model.encode(
+                    [texts[i] for i in indices],
+                    batch_size=self.batch_size,
+                    normalize_embeddings=self.normalize_embeddings,
+                    show_progress_bar=False,
+                    convert_to_numpy=True,
+                )
+            if output is None:
+                output = np.empty((total, vectors.shape[1]), dtype=np.float32)
+            output[indices] = vectors
+
+            done += len(indices)
+            logger.debug("Embedded batch of %s (%s/%s)", len(indices), done, total)
+            if total > self.batch_size and perf_counter() - last_log >= _PROGRESS_LOG_INTERVAL_S:
+                logger.info("Embedded %s/%s texts", done, total)
+                last_log = perf_counter()
+
+        assert output is not None
+        return output
+
+    def embed_query(self, text: str) -> np.ndarray:
+        vectors = self.embed_texts([text], interactive=True)
+        return vectors[0]
+
+    def embed_queries(self, texts: list[str]) -> np.ndarray:
+        """Embed a batch of queries under one governor slot with a single ``encode`` call.
+
+        Queries are short, so one call (batched internally by the model) beats admitting each
+        ``batch_size`` slice separately, which could also leave a batch half-admitted.
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        model = self._load_model()
+        with self._slot(interactive=True):
             vectors = model.encode(
-                batch,
+                texts,
                 batch_size=self.batch_size,
                 normalize_embeddings=self.normalize_embeddings,
                 show_progress_bar=False,
                 convert_to_numpy=True,
             )
-            all_vectors.append(vectors)
+        return np.asarray(vectors, dtype=np.float32)
 
-        return np.vstack(all_vectors).astype(np.float32)
-
-    def embed_query(self, text: str) -> np.ndarray:
-        vectors = self.embed_texts([text])
-        return vectors[0]
+    def memory_report(self) -> dict[str, Any]:
+        """What the loaded model holds; onnxruntime's native buffers show up only in the process RSS."""
+        model = self._model
+        report: dict[str, Any] = {
+            "loaded": model is not None,
+            "backend": "server" if self.server_socket is not None else self.backend,
+        }
+        parameters = getattr(model, "parameters", None)
+        if callable(parameters):
+            report["parameter_mb"] = round(sum(p.numel() * p.element_size() for p in parameters()) / 1_048_576, 2)
+        return report
 
     def embedding_dimension(self) -> int:
         probe = self.embed_query("dimension_probe")
         return int(probe.shape[0])
+
+    def bulk_pool(self, workers: int | None = None, threads_per_worker: int | None = None) -> "EmbeddingPool":
+        default_workers, default_threads = default_pool_size()
+        threads = threads_per_worker or default_threads
+        return EmbeddingPool(
+            model_name=self.model_name,
+            workers=workers or default_workers,
+            threads_per_worker=threads,
+            batch_size=self.batch_size,
+            normalize_embeddings=self.normalize_embeddings,
+            model_loader=self._model_loader(threads),
+            backend=self.backend,
+        )
+
+
+# Per-process state of bulk embedding workers.
+_WORKER_MODEL: Any = None
+_WORKER_OPTIONS: dict[str, Any] = {}
+
+
+def _init_worker(
+    model_loader: Callable[[str], Any],
+    model_name: str,
+    threads: int,
+    batch_size: int,
+    normalize_embeddings: bool,
+    backend: str = "torch",
+) -> None:
+    global _WORKER_MODEL, _WORKER_OPTIONS
+
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    os.environ["MKL_NUM_THREADS"] = str(threads)
+    if backend == "torch":
+        # The ONNX loader sizes its own session pool; importing torch there would only slow worker start-up.
+        set_intra_op_threads(threads)
+
+    _WORKER_MODEL = model_loader(model_name)
+    _WORKER_OPTIONS = {"batch_size": batch_size, "normalize_embeddings": normalize_embeddings}
+
+
+def _encode_shard(position: int, texts: list[str]) -> tuple[int, np.ndarray]:
+    vectors = _WORKER_MODEL.encode(
+        texts,
+        batch_size=_WORKER_OPTIONS["batch_size"],
+        normalize_embeddings=_WORKER_OPTIONS["normalize_embeddings"],
+        show_progress_bar=False,
+        convert_to_numpy=True,
+    )
+    return position, np.asarray(vectors, dtype=np.float32)
+
+
+class EmbeddingPool:
+    """Shards bulk embedding across worker processes, each with its own model copy."""
+
+    def __init__(
+        self,
+        model_name: str,
+        workers: int,
+        threads_per_worker: int,
+        batch_size: int = 32,
+        normalize_embeddings: bool = True,
+        model_loader: Callable[[str], Any] = _load_sentence_transformer,
+        backend: str = "torch",
+    ) -> None:
+        self.workers = workers
+        self.batch_size = batch_size
+        logger.info(
+            "Starting embedding pool: %s workers x %s threads (%s)", workers, threads_per_worker, model_name
+        )
+        # Spawn rather than fork: forking a process with an initialized torch runtime can deadlock.
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(model_loader, model_name, threads_per_worker, batch_size, normalize_embeddings, backend),
+        )
+
+    def __enter__(self) -> "EmbeddingPool":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def embed_texts(self, texts: list[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        # A few length-homogeneous shards per worker keeps padding low and
+        # workers busy; the longest shards go first so the tail stays short.
+        shard_size = max(self.batch_size, -(-len(texts) // (self.workers * 4)))
+        shards = length_sorted_batches(texts, shard_size)
+        futures = [
+            self._executor.submit(_encode_shard, position, [texts[i] for i in indices])
+            for position, indices in reversed(list(enumerate(shards)))
+        ]
+        output: np.ndarray | None = None
+        for future in futures:
+            position, vectors = future.result()
+            if output is None:
+                output = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+            output[shards[position]] = vectors
+        assert output is not None
+        return output
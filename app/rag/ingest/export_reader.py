@@ -7,10 +7,12 @@ from pathlib import Path
 from typing import Any
 
 from app.core.logging import get_logger
+from app.core.memory import MemoryTracker
 from app.rag.ingest.normalize import IT_TOPICS, apply_topics
-from app.rag.ingest.parser_chatgpt_html import parse_chatgpt_html_bytes
 from app.rag.ingest.parser_chatgpt_json import parse_chatgpt_json_bytes
 from app.rag.ingest.redaction import RedactionStats, redact_text
+from app.rag.jsonl import read_jsonl, read_jsonl_as, write_jsonl
+from app.rag.records import MessageRecord
 from app.rag.schema import NormalizedMessage
 
 logger = get_logger(__name__)
@@ -19,8 +21,15 @@ logger = get_logger(__name__)
 SUPPORTED_EXTENSIONS = {".zip", ".json", ".html", ".htm"}
 
 
-def _read_zip(path: Path) -> list[NormalizedMessage]:
-    messages: list[NormalizedMessage] = []
+def _parse_html(raw: bytes, file_name: str) -> list[MessageRecord]:
+    # BeautifulSoup is only needed for HTML exports; keep it off the API import path.
+    from app.rag.ingest.parser_chatgpt_html import parse_chatgpt_html_bytes
+
+    return parse_chatgpt_html_bytes(raw, file_name=file_name)
+
+
+def _read_zip(path: Path) -> list[MessageRecord]:
+    messages: list[MessageRecord] = []
     with zipfile.ZipFile(path, "r") as zf:
         for name in zf.namelist():
             lowered = name.lower()
@@ -35,18 +44,18 @@ def _read_zip(path: Path) -> list[NormalizedMessage]:
             elif lowered.endswith(".html") or lowered.endswith(".htm"):
                 with zf.open(name) as fp:
                     raw = fp.read()
-                messages.extend(parse_chatgpt_html_bytes(raw, file_name=name))
+                messages.extend(_parse_html(raw, file_name=name))
     return messages
 
 
-def _read_file(path: Path) -> list[NormalizedMessage]:
+def _read_file(path: Path) -> list[MessageRecord]:
     lowered = path.suffix.lower()
     raw = path.read_bytes()
 
     if lowered == ".json":
         return parse_chatgpt_json_bytes(raw)
     if lowered in {".html", ".htm"}:
-        return parse_chatgpt_html_bytes(raw, file_name=path.name)
+        return _parse_html(raw, file_name=path.name)
     if lowered == ".zip":
         return _read_zip(path)
     raise ValueError(f"Unsupported input type: {path.suffix}")
@@ -72,17 +81,13 @@ def resolve_input_path(raw_data_dir: Path, user_input_path: str | None) -> Path:
     return options[0]
 
 
-def _write_jsonl(path: Path, records: list[NormalizedMessage]) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("w", encoding="utf-8") as f:
-        for record in records:
-            f.write(record.model_dump_json())
-            f.write("\n")
+def _write_jsonl(path: Path, records: list[MessageRecord]) -> None:
+    write_jsonl(path, records, kind="messages")
 
 
-def _apply_privacy(messages: list[NormalizedMessage]) -> tuple[list[NormalizedMessage], RedactionStats]:
+def _apply_privacy(messages: list[MessageRecord]) -> tuple[list[MessageRecord], RedactionStats]:
     total_stats = RedactionStats()
-    cleaned: list[NormalizedMessage] = []
+    cleaned: list[MessageRecord] = []
 
     for message in messages:
         redacted_text, stats = redact_text(message.text)
@@ -104,15 +109,15 @@ def _apply_privacy(messages: list[NormalizedMessage]) -> tuple[list[NormalizedMe
 
 
 def _filter_messages(
-    messages: list[NormalizedMessage],
+    messages: list[MessageRecord],
     allowlist_it_only: bool,
     exclude_title_keywords: list[str],
-) -> list[NormalizedMessage]:
-    grouped: dict[str, list[NormalizedMessage]] = defaultdict(list)
+) -> list[MessageRecord]:
+    grouped: dict[str, list[MessageRecord]] = defaultdict(list)
     for message in messages:
         grouped[message.chat_id].append(message)
 
-    filtered: list[NormalizedMessage] = []
+    filtered: list[MessageRecord] = []
     for chat_id, chat_messages in grouped.items():
         title = (chat_messages[0].chat_title or "").lower()
         if any(keyword in title for keyword in exclude_title_keywords):
@@ -132,20 +137,27 @@ def ingest_export(
     output_messages_path: Path,
     allowlist_it_only: bool,
     exclude_title_keywords: list[str],
+    memory: MemoryTracker | None = None,
 ) -> dict[str, Any]:
+    memory = memory or MemoryTracker()
     logger.info("Reading export from %s", input_path)
-    messages = _read_file(input_path)
+    with memory.stage("read"):
+        messages = _read_file(input_path)
     raw_count = len(messages)
 
-    messages, redaction_stats = _apply_privacy(messages)
-    messages = apply_topics(messages)
-    messages = _filter_messages(
-        messages,
-        allowlist_it_only=allowlist_it_only,
-        exclude_title_keywords=[k.lower() for k in exclude_title_keywords],
-    )
+    with memory.stage("redact"):
+        messages, redaction_stats = _apply_privacy(messages)
+    with memory.stage("topics"):
+        messages = apply_topics(messages)
+    with memory.stage("filter"):
+        messages = _filter_messages(
+            messages,
+            allowlist_it_only=allowlist_it_only,
+            exclude_title_keywords=[k.lower() for k in exclude_title_keywords],
+        )
 
-    _write_jsonl(output_messages_path, messages)
+    with memory.stage("write_messages"):
+        _write_jsonl(output_messages_path, messages)
     logger.info("Wrote %s normalized messages to %s", len(messages), output_messages_path)
 
     unique_chats = {m.chat_id for m in messages}
@@ -159,16 +171,10 @@ def ingest_export(
     }
 
 
-def load_messages_jsonl(path: Path) -> list[NormalizedMessage]:
-    if not path.exists():
-        return []
+def load_messages_jsonl(path: Path, validate: bool = False) -> list[NormalizedMessage]:
+    return read_jsonl(path, NormalizedMessage, kind="messages", validate=validate)
 
-    messages: list[NormalizedMessage] = []
-    with path.open("r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            data = json.loads(line)
-            messages.append(NormalizedMessage.model_validate(data))
-    return messages
+
+def load_message_records(path: Path, validate: bool = False) -> list[MessageRecord]:
+    """messages.jsonl as compact records, for pipeline stages that hold the whole corpus in memory."""
+    return read_jsonl_as(path, NormalizedMessage, "messages", MessageRecord.from_fields, validate=validate)
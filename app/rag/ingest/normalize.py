@@ -4,7 +4,7 @@ from collections import Counter, defaultdict
 from datetime import datetime, timezone
 from typing import Any
 
-from app.rag.schema import NormalizedMessage
+from app.rag.records import MessageRecord
 
 IT_TOPICS = {
     "python",
@@ -77,7 +77,7 @@ def infer_topic(text: str) -> str:
     return "other"
 
 
-def infer_chat_topic(messages: list[NormalizedMessage], chat_title: str | None) -> str:
+def infer_chat_topic(messages: list[MessageRecord], chat_title: str | None) -> str:
     title_topic = infer_topic(chat_title or "")
     if title_topic != "other":
         return title_topic
@@ -86,8 +86,8 @@ def infer_chat_topic(messages: list[NormalizedMessage], chat_title: str | None)
     return infer_topic(sample)
 
 
-def apply_topics(messages: list[NormalizedMessage]) -> list[NormalizedMessage]:
-    grouped: dict[str, list[NormalizedMessage]] = defaultdict(list)
+def apply_topics(messages: list[MessageRecord]) -> list[MessageRecord]:
+    grouped: dict[str, list[MessageRecord]] = defaultdict(list)
     for msg in messages:
         grouped[msg.chat_id].append(msg)
 
@@ -114,6 +114,6 @@ def should_include_chat(
     return False
 
 
-def count_roles(messages: list[NormalizedMessage]) -> dict[str, int]:
+def count_roles(messages: list[MessageRecord]) -> dict[str, int]:
     counts = Counter(msg.role for msg in messages)
     return dict(counts)
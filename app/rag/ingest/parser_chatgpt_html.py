@@ -7,16 +7,16 @@ from uuid import uuid4
 from bs4 import BeautifulSoup
 
 from app.rag.ingest.normalize import normalize_timestamp, role_from_raw
-from app.rag.schema import NormalizedMessage
+from app.rag.records import MessageRecord
 
 
-def parse_chatgpt_html(html_text: str, file_name: str) -> list[NormalizedMessage]:
+def parse_chatgpt_html(html_text: str, file_name: str) -> list[MessageRecord]:
     soup = BeautifulSoup(html_text, "html.parser")
     chat_id = Path(file_name).stem or f"html-chat-{uuid4()}"
     chat_title = soup.title.text.strip() if soup.title and soup.title.text else None
 
     role_nodes = soup.select("[data-message-author-role]")
-    messages: list[NormalizedMessage] = []
+    messages: list[MessageRecord] = []
     previous_id: str | None = None
 
     if role_nodes:
@@ -28,7 +28,7 @@ def parse_chatgpt_html(html_text: str, file_name: str) -> list[NormalizedMessage
             message_id = f"{chat_id}-html-{idx}"
             created_at = normalize_timestamp(node.attrs.get("data-message-created-at"))
             messages.append(
-                NormalizedMessage(
+                MessageRecord(
                     chat_id=chat_id,
                     chat_title=chat_title,
                     message_id=message_id,
@@ -37,7 +37,6 @@ def parse_chatgpt_html(html_text: str, file_name: str) -> list[NormalizedMessage
                     created_at=created_at,
                     text=text,
                     has_code=("```" in text or node.find("code") is not None),
-                    attachments=[],
                     topic="unknown",
                     source="chatgpt_export_html",
                 )
@@ -68,7 +67,7 @@ def parse_chatgpt_html(html_text: str, file_name: str) -> list[NormalizedMessage
 
         message_id = f"{chat_id}-fallback-{idx}"
         messages.append(
-            NormalizedMessage(
+            MessageRecord(
                 chat_id=chat_id,
                 chat_title=chat_title,
                 message_id=message_id,
@@ -77,7 +76,6 @@ def parse_chatgpt_html(html_text: str, file_name: str) -> list[NormalizedMessage
                 created_at=None,
                 text=text,
                 has_code=("```" in text or node.find("code") is not None),
-                attachments=[],
                 topic="unknown",
                 source="chatgpt_export_html",
             )
@@ -87,6 +85,6 @@ def parse_chatgpt_html(html_text: str, file_name: str) -> list[NormalizedMessage
     return messages
 
 
-def parse_chatgpt_html_bytes(raw: bytes, file_name: str) -> list[NormalizedMessage]:
+def parse_chatgpt_html_bytes(raw: bytes, file_name: str) -> list[MessageRecord]:
     text = raw.decode("utf-8", errors="replace")
     return parse_chatgpt_html(text, file_name=file_name)
@@ -5,7 +5,7 @@ from typing import Any
 from uuid import uuid4
 
 from app.rag.ingest.normalize import normalize_timestamp, role_from_raw
-from app.rag.schema import NormalizedMessage
+from app.rag.records import MessageRecord
 
 
 def _extract_conversations(payload: Any) -> list[dict[str, Any]]:
@@ -91,7 +91,7 @@ def _node_to_message(
     node_id: str,
     parent_id: str | None,
     message_id: str | None = None,
-) -> NormalizedMessage | None:
+) -> MessageRecord | None:
     message_obj = source_obj.get("message") if isinstance(source_obj.get("message"), dict) else source_obj
 
     text = _extract_text(message_obj)
@@ -114,7 +114,7 @@ def _node_to_message(
 
     msg_id = str(message_id or message_obj.get("id") or source_obj.get("id") or node_id or uuid4())
 
-    return NormalizedMessage(
+    return MessageRecord(
         chat_id=chat_id,
         chat_title=chat_title,
         message_id=msg_id,
@@ -133,7 +133,7 @@ def _parse_mapping(
     mapping: dict[str, Any],
     chat_id: str,
     chat_title: str | None,
-) -> list[NormalizedMessage]:
+) -> list[MessageRecord]:
     # Map node IDs to actual message IDs first so parent_message_id references
     # stay stable across branching/regenerated paths.
     node_to_message_id: dict[str, str] = {}
@@ -144,7 +144,7 @@ def _parse_mapping(
         resolved_id = message_obj.get("id") or node.get("id") or f"{chat_id}-node-{key}"
         node_to_message_id[str(key)] = str(resolved_id)
 
-    messages: list[NormalizedMessage] = []
+    messages: list[MessageRecord] = []
     for key, node in mapping.items():
         if not isinstance(node, dict):
             continue
@@ -170,8 +170,8 @@ def _parse_messages_list(
     raw_messages: list[Any],
     chat_id: str,
     chat_title: str | None,
-) -> list[NormalizedMessage]:
-    messages: list[NormalizedMessage] = []
+) -> list[MessageRecord]:
+    messages: list[MessageRecord] = []
     previous_id: str | None = None
 
     for idx, item in enumerate(raw_messages):
@@ -187,9 +187,9 @@ def _parse_messages_list(
     return messages
 
 
-def parse_chatgpt_json(payload: Any) -> list[NormalizedMessage]:
+def parse_chatgpt_json(payload: Any) -> list[MessageRecord]:
     conversations = _extract_conversations(payload)
-    output: list[NormalizedMessage] = []
+    output: list[MessageRecord] = []
 
     for idx, convo in enumerate(conversations):
         chat_id = str(convo.get("id") or convo.get("conversation_id") or f"chat-{idx}-{uuid4()}")
@@ -212,6 +212,6 @@ def parse_chatgpt_json(payload: Any) -> list[NormalizedMessage]:
     return output
 
 
-def parse_chatgpt_json_bytes(raw: bytes) -> list[NormalizedMessage]:
+def parse_chatgpt_json_bytes(raw: bytes) -> list[MessageRecord]:
     payload = json.loads(raw.decode("utf-8", errors="replace"))
     return parse_chatgpt_json(payload)
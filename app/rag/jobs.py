@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from functools import lru_cache
+from time import perf_counter
+from typing import Any, Callable, Iterator
+from uuid import uuid4
+
+from app.core.config import get_settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+_TERMINAL_STATUSES = {"succeeded", "failed", "cancelled"}
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobConflictError(RuntimeError):
+    pass
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+@dataclass
+class Job:
+    job_id: str
+    kind: str
+    mutates_index: bool
+    status: str = "queued"
+    stage: str | None = None
+    processed: int = 0
+    total: int | None = None
+    created_at: str = field(default_factory=_now_iso)
+    started_at: str | None = None
+    finished_at: str | None = None
+    error: str | None = None
+    result: dict[str, Any] | None = None
+    stage_started: float = field(default_factory=perf_counter)
+    cancel_event: threading.Event = field(default_factory=threading.Event)
+
+    @property
+    def done(self) -> bool:
+        return self.status in _TERMINAL_STATUSES
+
+    def to_dict(self) -> dict[str, Any]:
+        elapsed = perf_counter() - self.stage_started
+        throughput = self.processed / elapsed if self.processed and elapsed > 0 else None
+        eta_s = None
+        if throughput and self.total is not None and not self.done:
+            eta_s = round(max(self.total - self.processed, 0) / throughput, 1)
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "status": self.status,
+            "stage": self.stage,
+            "processed": self.processed,
+            "total": self.total,
+            "throughput_per_s": round(throughput, 2) if throughput else None,
+            "eta_s": eta_s,
+            "cancel_requested": self.cancel_event.is_set(),
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+            "result": self.result,
+        }
+
+
+class JobProgress:
+    """Progress sink handed to pipeline functions; also the cancellation checkpoint."""
+
+    def __init__(self, job: Job) -> None:
+        self._job = job
+
+    def stage(self, name: str, total: int | None = None) -> None:
+        self.check_cancelled()
+        self._job.stage = name
+        self._job.total = total
+        self._job.processed = 0
+        self._job.stage_started = perf_counter()
+
+    def advance(self, count: int = 1) -> None:
+        self._job.processed += count
+        self.check_cancelled()
+
+    def check_cancelled(self) -> None:
+        if self._job.cancel_event.is_set():
+            raise JobCancelled(f"Job {self._job.job_id} was cancelled")
+
+
+class JobManager:
+    def __init__(self, max_workers: int = 2, max_history: int = 50) -> None:
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="rag-job")
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        self._lock = threading.Lock()
+        self._mutating_owner: str | None = None
+        self._max_history = max_history
+
+    def _claim_mutation(self, owner: str) -> None:
+        if self._mutating_owner is not None:
+            raise JobConflictError(f"Another index-mutating job is active: {self._mutating_owner}")
+        self._mutating_owner = owner
+
+    def _release_mutation(self, owner: str) -> None:
+        if self._mutating_owner == owner:
+            self._mutating_owner = None
+
+    @contextmanager
+    def exclusive(self, kind: str) -> Iterator[None]:
+        """Hold the index-mutation slot for synchronous admin calls."""
+        owner = f"sync-{kind}-{uuid4().hex[:8]}"
+        with self._lock:
+            self._claim_mutation(owner)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._release_mutation(owner)
+
+    def submit(
+        self,
+        kind: str,
+        fn: Callable[[JobProgress], dict[str, Any]],
+        mutates_index: bool = True,
+    ) -> Job:
+        job = Job(job_id=uuid4().hex, kind=kind, mutates_index=mutates_index)
+        with self._lock:
+            if mutates_index:
+                self._claim_mutation(job.job_id)
+            self._jobs[job.job_id] = job
+            self._trim_history()
+        self._executor.submit(self._run, job, fn)
+        return job
+
+    def _run(self, job: Job, fn: Callable[[JobProgress], dict[str, Any]]) -> None:
+        progress = JobProgress(job)
+        job.status = "running"
+        job.started_at = _now_iso()
+        status = "succeeded"
+        try:
+            progress.check_cancelled()
+            job.result = fn(progress)
+        except JobCancelled:
+            status = "cancelled"
+            logger.info("Job %s (%s) cancelled at stage %s", job.job_id, job.kind, job.stage)
+        except Exception as exc:
+            status = "failed"
+            job.error = str(exc)
+            logger.exception("Job %s (%s) failed", job.job_id, job.kind)
+        finally:
+            # Free the mutation slot before publishing the terminal status so a
+            # poller that sees "succeeded" can submit the next job immediately.
+            if job.mutates_index:
+                with self._lock:
+                    self._release_mutation(job.job_id)
+            job.finished_at = _now_iso()
+            job.status = status
+
+    def _trim_history(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        while len(self._jobs) > self._max_history and finished:
+            self._jobs.pop(finished.pop(0), None)
+
+    def get(self, job_id: str) -> Job | None:
+        return self._jobs.get(job_id)
+
+    def list_jobs(self) -> list[Job]:
+        return list(reversed(self._jobs.values()))
+
+    def cancel(self, job_id: str) -> Job | None:
+        job = self._jobs.get(job_id)
+        if job is not None and not job.done:
+            job.cancel_event.set()
+        return job
+
+
+@lru_cache(maxsize=1)
+def get_job_manager() -> JobManager:
+    return JobManager(max_workers=get_settings().job_workers)
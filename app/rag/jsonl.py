@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import gc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, TypeVar
+
+import orjson
+from pydantic import BaseModel
+
+# messages.jsonl / chunks.jsonl start with a header line naming the record kind and schema version.
+# Files carrying the current header were written by write_jsonl from validated models, so their
+# records are rebuilt without validation; anything else (older files, hand-made chunk files) is
+# validated line by line. Bump SCHEMA_VERSION whenever a record model changes shape.
+SCHEMA_VERSION = 1
+_HEADER_KEY = "__schema__"
+_WRITE_BLOCK_RECORDS = 4096
+_READ_BLOCK_BYTES = 8 << 20
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+RecordT = TypeVar("RecordT")
+
+
+@contextmanager
+def _gc_paused() -> Iterator[None]:
+    # Bulk loads allocate millions of acyclic objects; generational GC passes over them are pure overhead.
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _encode(record: object) -> bytes:
+    if not isinstance(record, BaseModel):
+        # Slotted dataclasses (MessageRecord) encode natively, fields in declaration order.
+        return orjson.dumps(record)
+    try:
+        # Record fields are plain JSON types, so the instance dict encodes directly (about 2x model_dump_json).
+        return orjson.dumps(record.__dict__)
+    except TypeError:
+        return record.model_dump_json().encode("utf-8")
+
+
+def write_jsonl(path: Path, records: Iterable[object], kind: str) -> None:
+    """Write the schema header, then one JSON record per line, in blocks of ``_WRITE_BLOCK_RECORDS``.
+
+    Records are pydantic models or dataclasses with the same fields.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("wb") as f:
+        f.write(orjson.dumps({_HEADER_KEY: kind, "version": SCHEMA_VERSION}) + b"\n")
+        block: list[bytes] = []
+        for record in records:
+            block.append(_encode(record))
+            if len(block) >= _WRITE_BLOCK_RECORDS:
+                f.write(b"\n".join(block) + b"\n")
+                block.clear()
+        if block:
+            f.write(b"\n".join(block) + b"\n")
+
+
+def _iter_lines(f) -> Iterator[bytes]:
+    tail = b""
+    while block := f.read(_READ_BLOCK_BYTES):
+        lines = (tail + block).split(b"\n")
+        tail = lines.pop()
+        yield from lines
+    if tail:
+        yield tail
+
+
+def _trusted(model: type[ModelT], data: dict[str, Any]) -> ModelT:
+    """Rebuild a record written by ``write_jsonl``; every field is present, so validation is skipped.
+
+    Same result as ``model_construct``, which is slower than validating in pydantic 2.11 because it
+    resolves defaults field by field in Python.
+    """
+    record = model.__new__(model)
+    object.__setattr__(record, "__dict__", data)
+    object.__setattr__(record, "__pydantic_fields_set__", set(data))
+    object.__setattr__(record, "__pydantic_extra__", None)
+    object.__setattr__(record, "__pydantic_private__", None)
+    return record
+
+
+def _iter_fields(path: Path, kind: str, validate: bool) -> Iterator[tuple[dict[str, Any], bool]]:
+    """Decoded records of ``path`` with whether each one can skip validation."""
+    trusted = False
+    first = True
+    with path.open("rb") as f:
+        for line in _iter_lines(f):
+            line = line.strip()
+            if not line:
+                continue
+            data = orjson.loads(line)
+            if first:
+                first = False
+                if _HEADER_KEY in data:
+                    if data[_HEADER_KEY] != kind:
+                        raise ValueError(f"{path} holds {data[_HEADER_KEY]} records, not {kind}")
+                    trusted = data.get("version") == SCHEMA_VERSION and not validate
+                    continue
+            yield data, trusted
+
+
+def read_jsonl(path: Path, model: type[ModelT], kind: str, validate: bool = False) -> list[ModelT]:
+    """Load every record; ``validate`` forces full validation even for files carrying the current header."""
+    if not path.exists():
+        return []
+    with _gc_paused():
+        return [
+            _trusted(model, data) if trusted else model.model_validate(data)
+            for data, trusted in _iter_fields(path, kind, validate)
+        ]
+
+
+def read_jsonl_as(
+    path: Path,
+    model: type[BaseModel],
+    kind: str,
+    build: Callable[[dict[str, Any]], RecordT],
+    validate: bool = False,
+) -> list[RecordT]:
+    """Load every record as ``build(fields)``; records that need validation go through ``model`` first."""
+    if not path.exists():
+        return []
+    with _gc_paused():
+        return [
+            build(data if trusted else model.model_validate(data).__dict__)
+            for data, trusted in _iter_fields(path, kind, validate)
+        ]
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, TypeVar
+
+from app.core.config import Settings
+from app.core.logging import get_logger
+from app.core.tracing import span
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+
+class LLMUnavailableError(RuntimeError):
+    """The LLM call did not complete; ``reason`` is reported as the answer's ``fallback_reason``."""
+
+    def __init__(self, reason: str, message: str) -> None:
+        super().__init__(message)
+        self.reason = reason
+
+
+def _is_retryable(exc: Exception) -> bool:
+    import openai
+
+    if isinstance(exc, openai.APITimeoutError):
+        # A read timeout already cost the full budget; retrying would only delay the fallback.
+        return False
+    if isinstance(exc, (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)):
+        return True
+    return False
+
+
+def _unavailable(exc: Exception) -> LLMUnavailableError:
+    import openai
+
+    if isinstance(exc, openai.APITimeoutError):
+        return LLMUnavailableError("llm_timeout", f"LLM request timed out: {exc}")
+    return LLMUnavailableError("llm_error", f"LLM request failed: {exc}")
+
+
+class LLMClient:
+    """One pooled OpenAI client shared by every request of an ``AnswerGenerator``.
+
+    Connections are reused across requests, each call is bounded by connect/read
+    timeouts, at most ``openai_max_concurrency`` calls are in flight, and
+    connection errors, 429s and 5xx responses are retried with full jitter.
+    """
+
+    def __init__(self, settings: Settings) -> None:
+        self.settings = settings
+        self._lock = threading.Lock()
+        self._sync_client: Any = None
+        self._semaphore = threading.BoundedSemaphore(max(1, settings.openai_max_concurrency))
+
+    def _client_kwargs(self) -> dict[str, Any]:
+        import httpx
+
+        return {
+            "api_key": self.settings.openai_api_key,
+            "base_url": self.settings.openai_base_url,
+            "timeout": httpx.Timeout(
+                self.settings.openai_read_timeout_s,
+                connect=self.settings.openai_connect_timeout_s,
+            ),
+            # Retries are handled here, with jitter and without retrying timeouts.
+            "max_retries": 0,
+        }
+
+    @property
+    def sync_client(self):
+        with self._lock:
+            if self._sync_client is None:
+                from openai import OpenAI
+
+                self._sync_client = OpenAI(**self._client_kwargs())
+            return self._sync_client
+
+    def _backoff_s(self, attempt: int) -> float:
+        return random.uniform(0, self.settings.openai_retry_base_s * 2**attempt)
+
+    @contextmanager
+    def _slot(self) -> Iterator[None]:
+        if not self._semaphore.acquire(timeout=self.settings.openai_queue_timeout_s):
+            raise LLMUnavailableError("llm_busy", "Too many concurrent LLM requests")
+        try:
+            yield
+        finally:
+            self._semaphore.release()
+
+    def _retrying(self, fn: Callable[[], T]) -> T:
+        with span("llm_call", model=self.settings.openai_model) as counts:
+            for attempt in range(self.settings.openai_max_retries + 1):
+                counts["round_trips"] = attempt + 1
+                try:
+                    return fn()
+                except Exception as exc:
+                    if attempt == self.settings.openai_max_retries or not _is_retryable(exc):
+                        counts["error"] = type(exc).__name__
+                        raise _unavailable(exc) from exc
+                    delay = self._backoff_s(attempt)
+                    logger.info("LLM call failed (%s), retrying in %.2fs", type(exc).__name__, delay)
+                    time.sleep(delay)
+            raise AssertionError("unreachable")
+
+    def complete(self, messages: list[dict[str, str]]) -> str:
+        with self._slot():
+            completion = self._retrying(
+                lambda: self.sync_client.chat.completions.create(
+                    model=self.settings.openai_model,
+                    temperature=0,
+                    messages=messages,
+                )
+            )
+        return completion.choices[0].message.content or ""
+
+    def stream(self, messages: list[dict[str, str]]) -> Iterator[str]:
+        """Yield answer tokens; the concurrency slot is held until the stream is exhausted or closed.
+
+        Only opening the stream is retried; a stream that breaks midway raises ``LLMUnavailableError``.
+        """
+        with self._slot():
+            response = self._retrying(
+                lambda: self.sync_client.chat.completions.create(
+                    model=self.settings.openai_model,
+                    temperature=0,
+                    messages=messages,
+                    stream=True,
+                )
+            )
+            try:
+                for chunk in response:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        yield delta
+            except Exception as exc:
+                raise _unavailable(exc) from exc
+            finally:
+                response.close()
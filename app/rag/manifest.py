@@ -0,0 +1,268 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+from app.core.logging import get_logger
+from app.rag.records import MessageRecord
+from app.rag.schema import ChunkRecord
+
+logger = get_logger(__name__)
+
+MANIFEST_VERSION = 2
+
+_MANIFEST_LOCK = threading.Lock()
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def empty_manifest() -> dict[str, Any]:
+    return {
+        "version": MANIFEST_VERSION,
+        "index_generation": 0,
+        "updated_at": None,
+        "messages_count": 0,
+        "chunks_count": 0,
+        "indexed_chunks_count": 0,
+        # Chunk rows still in chunks.jsonl but hidden by delete tombstones, until the next compaction or ingest.
+        "garbage_chunks": 0,
+        "chats": {},
+        "topics": {},
+        "date_range": {"start": None, "end": None},
+        "bytes": {},
+        "last_ingest": None,
+        "last_reindex": None,
+        "retired_collections": {},
+    }
+
+
+def load_manifest(path: Path) -> dict[str, Any] | None:
+    if not path.exists():
+        return None
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        logger.warning("Ignoring unreadable manifest at %s", path)
+        return None
+    if not isinstance(data, dict) or data.get("version") != MANIFEST_VERSION:
+        return None
+    return data
+
+
+def write_manifest(path: Path, manifest: dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    manifest["updated_at"] = _now_iso()
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    tmp_path.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def _file_size(path: Path) -> int:
+    try:
+        return path.stat().st_size
+    except OSError:
+        return 0
+
+
+def _recount(manifest: dict[str, Any]) -> None:
+    # messages/chunks count the processed JSONL files; indexed_chunks counts what Qdrant serves.
+    topics: dict[str, dict[str, int]] = defaultdict(
+        lambda: {"chats": 0, "messages": 0, "chunks": 0, "indexed_chunks": 0}
+    )
+    start: str | None = None
+    end: str | None = None
+    for chat in manifest["chats"].values():
+        bucket = topics[chat.get("topic") or "unknown"]
+        bucket["chats"] += 1
+        bucket["messages"] += chat.get("messages", 0)
+        bucket["chunks"] += chat.get("chunks", 0)
+        bucket["indexed_chunks"] += chat.get("indexed_chunks", 0)
+        if chat.get("start_at") and (start is None or chat["start_at"] < start):
+            start = chat["start_at"]
+        if chat.get("end_at") and (end is None or chat["end_at"] > end):
+            end = chat["end_at"]
+
+    manifest["topics"] = dict(topics)
+    manifest["date_range"] = {"start": start, "end": end}
+    manifest["messages_count"] = sum(c.get("messages", 0) for c in manifest["chats"].values())
+    manifest["chunks_count"] = sum(c.get("chunks", 0) for c in manifest["chats"].values())
+    manifest["indexed_chunks_count"] = sum(c.get("indexed_chunks", 0) for c in manifest["chats"].values())
+
+
+def summarize_corpus(
+    messages: Iterable[MessageRecord],
+    chunks: Iterable[ChunkRecord],
+) -> dict[str, dict[str, Any]]:
+    chats: dict[str, dict[str, Any]] = {}
+
+    def entry(chat_id: str, title: str | None, topic: str) -> dict[str, Any]:
+        if chat_id not in chats:
+            chats[chat_id] = {
+                "title": title,
+                "topic": topic,
+                "messages": 0,
+                "chunks": 0,
+                "indexed_chunks": 0,
+                "start_at": None,
+                "end_at": None,
+            }
+        return chats[chat_id]
+
+    for message in messages:
+        chat = entry(message.chat_id, message.chat_title, message.topic)
+        chat["messages"] += 1
+        stamp = message.created_at
+        if stamp:
+            if chat["start_at"] is None or stamp < chat["start_at"]:
+                chat["start_at"] = stamp
+            if chat["end_at"] is None or stamp > chat["end_at"]:
+                chat["end_at"] = stamp
+
+    for chunk in chunks:
+        entry(chunk.chat_id, chunk.chat_title, chunk.topic)["chunks"] += 1
+
+    for chat in chats.values():
+        chat["indexed_chunks"] = chat["chunks"]
+    return chats
+
+
+def record_ingest(
+    manifest: dict[str, Any],
+    messages: list[MessageRecord],
+    chunks: list[ChunkRecord],
+    messages_path: Path,
+    chunks_path: Path,
+    input_path: Path,
+    timings_ms: dict[str, float],
+) -> dict[str, Any]:
+    manifest["chats"] = summarize_corpus(messages, chunks)
+    _recount(manifest)
+    manifest["garbage_chunks"] = 0
+    manifest["bytes"] = {
+        "messages_jsonl": _file_size(messages_path),
+        "chunks_jsonl": _file_size(chunks_path),
+    }
+    manifest["index_generation"] += 1
+    manifest["last_ingest"] = {
+        "input_path": str(input_path),
+        "input_bytes": _file_size(input_path),
+        "finished_at": _now_iso(),
+        "timings_ms": timings_ms,
+    }
+    return manifest
+
+
+def record_reindex(
+    manifest: dict[str, Any],
+    chunks: list[ChunkRecord],
+    chunks_path: Path,
+    timings_ms: dict[str, float],
+) -> dict[str, Any]:
+    # Message counts are only known from ingest; keep them and refresh chunk counts.
+    indexed = summarize_corpus([], chunks)
+    for chat in manifest["chats"].values():
+        chat["chunks"] = 0
+        chat["indexed_chunks"] = 0
+    for chat_id, summary in indexed.items():
+        existing = manifest["chats"].setdefault(chat_id, summary)
+        existing["chunks"] = summary["chunks"]
+        existing["indexed_chunks"] = summary["indexed_chunks"]
+    _recount(manifest)
+    manifest["bytes"]["chunks_jsonl"] = _file_size(chunks_path)
+    manifest["index_generation"] += 1
+    manifest["last_reindex"] = {
+        "chunks_path": str(chunks_path),
+        "indexed_chunks": len(chunks),
+        "finished_at": _now_iso(),
+        "timings_ms": timings_ms,
+    }
+    return manifest
+
+
+def record_chat_deleted(manifest: dict[str, Any], chat_id: str) -> dict[str, Any]:
+    # The chat's chunks are tombstoned in the chunk log, so it leaves every count, not just the indexed ones;
+    # its rows count as garbage until compaction drops them.
+    chat = manifest["chats"].pop(chat_id, None)
+    if chat is not None:
+        manifest["garbage_chunks"] = manifest.get("garbage_chunks", 0) + chat.get("chunks", 0)
+    _recount(manifest)
+    manifest["index_generation"] += 1
+    return manifest
+
+
+def record_chunks_compacted(manifest: dict[str, Any], messages_path: Path, chunks_path: Path) -> dict[str, Any]:
+    # Compaction only drops rows the tombstones already hid, so the counts stand; the files shrank.
+    manifest["garbage_chunks"] = 0
+    manifest["bytes"]["messages_jsonl"] = _file_size(messages_path)
+    manifest["bytes"]["chunks_jsonl"] = _file_size(chunks_path)
+    return manifest
+
+
+def record_collection_reset(manifest: dict[str, Any]) -> dict[str, Any]:
+    for chat in manifest["chats"].values():
+        chat["indexed_chunks"] = 0
+    _recount(manifest)
+    manifest["index_generation"] += 1
+    return manifest
+
+
+def record_retired_collection(manifest: dict[str, Any], collection_name: str, retired_at: float) -> dict[str, Any]:
+    manifest.setdefault("retired_collections", {})[collection_name] = retired_at
+    return manifest
+
+
+def rebuild_manifest(messages_path: Path, chunks_path: Path) -> dict[str, Any]:
+    """Build a manifest from the processed files; only used when none exists yet.
+
+    Indexed counts are assumed to match the files, as they do after an ingest or reindex.
+    """
+    from app.rag.chunk_log import chunk_garbage, deleted_chats
+    from app.rag.chunking import load_chunks_jsonl
+    from app.rag.ingest.export_reader import load_message_records
+
+    logger.info("Building manifest from %s and %s", messages_path, chunks_path)
+    manifest = empty_manifest()
+    deleted = deleted_chats(chunks_path)
+    messages = [message for message in load_message_records(messages_path) if message.chat_id not in deleted]
+    manifest["chats"] = summarize_corpus(messages, load_chunks_jsonl(chunks_path))
+    _recount(manifest)
+    manifest["garbage_chunks"] = chunk_garbage(chunks_path)[0]
+    manifest["bytes"] = {
+        "messages_jsonl": _file_size(messages_path),
+        "chunks_jsonl": _file_size(chunks_path),
+    }
+    return manifest
+
+
+def read_manifest(path: Path, messages_path: Path, chunks_path: Path) -> dict[str, Any]:
+    manifest = load_manifest(path)
+    if manifest is not None:
+        return manifest
+    with _MANIFEST_LOCK:
+        manifest = load_manifest(path)
+        if manifest is None:
+            manifest = rebuild_manifest(messages_path, chunks_path)
+            write_manifest(path, manifest)
+        return manifest
+
+
+def update_manifest(
+    path: Path,
+    messages_path: Path,
+    chunks_path: Path,
+    update: Callable[[dict[str, Any]], dict[str, Any]],
+) -> dict[str, Any]:
+    with _MANIFEST_LOCK:
+        manifest = load_manifest(path)
+        if manifest is None:
+            manifest = rebuild_manifest(messages_path, chunks_path)
+        manifest = update(manifest)
+        write_manifest(path, manifest)
+        return manifest
@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import json
+import os
+import weakref
+from pathlib import Path
+from typing import Any, Collection, Sequence
+
+import numpy as np
+import orjson
+
+from app.core.logging import get_logger
+from app.rag.chunk_store import parse_timestamp, source_stamp, staged_directory
+from app.rag.records import MessageRecord
+from app.rag.schema import NormalizedMessage
+
+logger = get_logger(__name__)
+
+# Byte-offset index over messages.jsonl in a ``messages.index`` directory next to it:
+#   offsets.npy                 start of each record line (row order = file order), plus the end of the last
+#   id_sorted.npy, id_rows.npy  message ids sorted for binary search, and the row each one belongs to
+#   chat.npy                    int32 code per row into the chat table of index.json
+#   chat_rows.npy, chat_starts.npy
+#                               rows grouped by chat and ordered like build_chunks orders them (created_at,
+#                               then message_id; undated last); chat c owns chat_rows[chat_starts[c]:chat_starts[c + 1]]
+#   index.json                  version, row count, chat table, and the size/mtime of the messages.jsonl it covers
+# Lookups seek to the recorded offsets and parse only those lines. An index whose stamp no longer matches
+# the file is rebuilt from the file on first use.
+INDEX_VERSION = 1
+_META = "index.json"
+_SCAN_BLOCK_BYTES = 16 << 20
+
+
+def index_dir(messages_path: Path) -> Path:
+    return messages_path.with_name(f"{messages_path.stem}.index")
+
+
+def _line_spans(path: Path) -> tuple[np.ndarray, np.ndarray]:
+    """Start and end offsets of every non-empty line except a schema header, scanning in blocks."""
+    newlines: list[np.ndarray] = []
+    size = 0
+    with path.open("rb") as f:
+        first_line = f.readline()
+        f.seek(0)
+        while block := f.read(_SCAN_BLOCK_BYTES):
+            newlines.append(np.flatnonzero(np.frombuffer(block, dtype=np.uint8) == ord("\n")) + size)
+            size += len(block)
+    breaks = np.concatenate(newlines) if newlines else np.zeros(0, dtype=np.int64)
+    starts = np.concatenate(([0], breaks + 1)).astype(np.int64)
+    ends = np.concatenate((breaks, [size])).astype(np.int64)
+    keep = ends > starts
+    starts, ends = starts[keep], ends[keep]
+    if len(starts) and starts[0] == 0 and first_line.startswith(b'{"__schema__"'):
+        starts, ends = starts[1:], ends[1:]
+    return starts, ends
+
+
+def _fields_from_file(path: Path, starts: np.ndarray, ends: np.ndarray) -> list[tuple[str, str, str | None]]:
+    fields: list[tuple[str, str, str | None]] = []
+    with path.open("rb") as f:
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            f.seek(start)
+            data = orjson.loads(f.read(end - start))
+            fields.append((data["message_id"], data["chat_id"], data.get("created_at")))
+    return fields
+
+
+def build_message_index(messages_path: Path, messages: Sequence[MessageRecord] | None = None) -> Path:
+    """Index ``messages_path``; pass the records it was written from to skip re-parsing the lines."""
+    starts, ends = _line_spans(messages_path)
+    if messages is not None and len(messages) == len(starts):
+        fields = [(m.message_id, m.chat_id, m.created_at) for m in messages]
+    else:
+        fields = _fields_from_file(messages_path, starts, ends)
+
+    chat_table: dict[str, int] = {}
+    chat = np.fromiter((chat_table.setdefault(c, len(chat_table)) for _, c, _ in fields), np.int32, len(fields))
+    ids = np.array([message_id.encode("utf-8") for message_id, _, _ in fields], dtype=np.bytes_)
+    parsed = (parse_timestamp(created_at) for _, _, created_at in fields)
+    stamps = np.fromiter((np.nan if ts is None else ts for ts in parsed), np.float64, len(fields))
+    id_rows = np.argsort(ids, kind="stable")
+    # np.lexsort sorts by the last key first; NaN timestamps sort after every real one.
+    chat_rows = np.lexsort((ids, stamps, chat))
+    chat_starts = np.searchsorted(chat[chat_rows], np.arange(len(chat_table) + 1))
+
+    target = index_dir(messages_path)
+    with staged_directory(target) as staging:
+        columns = {
+            "offsets": np.append(starts, ends[-1] if len(ends) else 0),
+            "id_sorted": ids[id_rows],
+            "id_rows": id_rows.astype(np.int64),
+            "chat": chat,
+            "chat_rows": chat_rows.astype(np.int64),
+            "chat_starts": chat_starts.astype(np.int64),
+        }
+        for name, values in columns.items():
+            np.save(staging / f"{name}.npy", values)
+        meta = {
+            "version": INDEX_VERSION,
+            "count": len(fields),
+            "chats": list(chat_table),
+            "source": source_stamp(messages_path),
+        }
+        (staging / _META).write_text(json.dumps(meta), encoding="utf-8")
+    return target
+
+
+class MessageIndex:
+    """Seek-and-read access to single messages and chat windows of messages.jsonl.
+
+    The file is opened once, so reads keep hitting the version the offsets were built for even after an
+    ingest replaces messages.jsonl; callers drop the index when the file's stamp changes.
+    """
+
+    def __init__(self, messages_path: Path, directory: Path, meta: dict[str, Any]) -> None:
+        self.messages_path = messages_path
+        self.source = meta["source"]
+        self._fd = os.open(messages_path, os.O_RDONLY)
+        weakref.finalize(self, os.close, self._fd)
+
+        def column(name: str) -> np.ndarray:
+            return np.load(directory / f"{name}.npy", mmap_mode="r")
+
+        self._offsets = column("offsets")
+        self._id_sorted = column("id_sorted")
+        self._id_rows = column("id_rows")
+        self._chat = column("chat")
+        self._chat_rows = column("chat_rows")
+        self._chat_starts = column("chat_starts")
+        self._chats = {chat_id: code for code, chat_id in enumerate(meta["chats"])}
+
+    def __len__(self) -> int:
+        return len(self._id_rows)
+
+    def rows_of(self, message_id: str) -> list[int]:
+        """Rows carrying ``message_id`` (ids are only unique within a chat), in file order."""
+        key = message_id.encode("utf-8")
+        left = int(np.searchsorted(self._id_sorted, key, side="left"))
+        right = int(np.searchsorted(self._id_sorted, key, side="right"))
+        return sorted(int(row) for row in self._id_rows[left:right])
+
+    def read(self, rows: Sequence[int]) -> list[NormalizedMessage]:
+        messages: list[NormalizedMessage] = []
+        for row in rows:
+            start, end = int(self._offsets[row]), int(self._offsets[row + 1])
+            line = os.pread(self._fd, end - start, start)
+            messages.append(NormalizedMessage.model_validate(orjson.loads(line)))
+        return messages
+
+    def message(self, message_id: str, exclude_chat_ids: Collection[str] = ()) -> NormalizedMessage | None:
+        excluded = {self._chats[chat_id] for chat_id in exclude_chat_ids if chat_id in self._chats}
+        rows = [row for row in self.rows_of(message_id) if int(self._chat[row]) not in excluded]
+        return self.read(rows[:1])[0] if rows else None
+
+    def chat_window(self, chat_id: str, around: str | None, window: int) -> tuple[list[NormalizedMessage], int] | None:
+        """Up to ``window`` messages either side of ``around`` (or the first ``2 * window + 1``) and the chat size.
+
+        ``None`` when the chat is unknown; ``around`` must be a message of that chat.
+        """
+        code = self._chats.get(chat_id)
+        if code is None:
+            return None
+        rows = self._chat_rows[int(self._chat_starts[code]) : int(self._chat_starts[code + 1])]
+        if around is None:
+            start, end = 0, 2 * window + 1
+        else:
+            row = next((row for row in self.rows_of(around) if int(self._chat[row]) == code), None)
+            if row is None:
+                return None
+            center = int(np.flatnonzero(rows == row)[0])
+            start, end = max(center - window, 0), center + window + 1
+        return self.read(rows[start:end].tolist()), len(rows)
+
+
+def open_message_index(messages_path: Path) -> MessageIndex | None:
+    """The index for ``messages_path``, rebuilt first when missing or stale; ``None`` without a messages file."""
+    if not messages_path.exists():
+        return None
+    directory = index_dir(messages_path)
+    try:
+        meta = json.loads((directory / _META).read_text(encoding="utf-8"))
+        if meta.get("version") == INDEX_VERSION and meta.get("source") == source_stamp(messages_path):
+            return MessageIndex(messages_path, directory, meta)
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError, KeyError) as exc:
+        logger.warning("Rebuilding unreadable message index %s: %s", directory, exc)
+    logger.info("Building message index for %s", messages_path)
+    build_message_index(messages_path)
+    meta = json.loads((directory / _META).read_text(encoding="utf-8"))
+    return MessageIndex(messages_path, directory, meta)
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_QUANTIZED_MODEL_FILE = "model_quantized.onnx"
+DEFAULT_MAX_SEQ_LENGTH = 256
+
+
+def mean_pool(token_embeddings: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+    """Mean over non-padding tokens, matching sentence-transformers' Pooling(mean)."""
+    mask = attention_mask[..., None].astype(np.float32)
+    summed = (token_embeddings * mask).sum(axis=1)
+    counts = np.clip(mask.sum(axis=1), 1e-9, None)
+    return summed / counts
+
+
+def l2_normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.clip(norms, 1e-12, None)
+
+
+def _max_seq_length(model_dir: Path) -> int:
+    config_path = model_dir / "sentence_bert_config.json"
+    if config_path.exists():
+        config = json.loads(config_path.read_text(encoding="utf-8"))
+        return int(config.get("max_seq_length") or DEFAULT_MAX_SEQ_LENGTH)
+    return DEFAULT_MAX_SEQ_LENGTH
+
+
+class OnnxSentenceEncoder:
+    """CPU onnxruntime replacement for ``SentenceTransformer.encode`` on exported models.
+
+    Expects a directory produced by ``scripts/export_onnx.py``: ``model.onnx``
+    (and optionally ``model_quantized.onnx``), ``tokenizer.json`` and
+    ``sentence_bert_config.json``.
+    """
+
+    def __init__(self, model_dir: Path, quantized: bool = False, intra_op_threads: int = 0) -> None:
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_file = model_dir / (ONNX_QUANTIZED_MODEL_FILE if quantized else ONNX_MODEL_FILE)
+        if not model_file.exists():
+            raise FileNotFoundError(f"ONNX model not found: {model_file}. Run scripts/export_onnx.py first.")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads > 0:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(
+            str(model_file),
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+        self._input_names = {item.name for item in self.session.get_inputs()}
+
+        self.max_seq_length = _max_seq_length(model_dir)
+        self.tokenizer = Tokenizer.from_file(str(model_dir / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=self.max_seq_length)
+        self.tokenizer.enable_padding()
+        logger.info("Loaded ONNX embedding model %s", model_file)
+
+    def _encode_batch(self, texts: list[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds: dict[str, Any] = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+        token_embeddings = self.session.run(None, feeds)[0]
+        return mean_pool(token_embeddings, attention_mask)
+
+    def encode(
+        self,
+        sentences: list[str],
+        batch_size: int = 32,
+        normalize_embeddings: bool = True,
+        show_progress_bar: bool = False,
+        convert_to_numpy: bool = True,
+    ) -> np.ndarray:
+        parts = [
+            self._encode_batch(sentences[start : start + batch_size])
+            for start in range(0, len(sentences), batch_size)
+        ]
+        vectors = np.vstack(parts).astype(np.float32, copy=False)
+        if normalize_embeddings:
+            vectors = l2_normalize(vectors)
+        return vectors
+
+
+def load_onnx_encoder(
+    model_name: str,
+    model_dir: Path,
+    quantized: bool = False,
+    intra_op_threads: int = 0,
+) -> OnnxSentenceEncoder:
+    # ``model_name`` keeps the loader signature shared with the torch backend;
+    # the exported directory already pins the model.
+    return OnnxSentenceEncoder(model_dir, quantized=quantized, intra_op_threads=intra_op_threads)
+
+
+def export_onnx(model_name: str, output_dir: Path, quantize: bool = True, opset: int = 17) -> None:
+    """Export a sentence-transformers model into the layout OnnxSentenceEncoder loads."""
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    model = SentenceTransformer(model_name, device="cpu")
+    transformer = model[0].auto_model.eval()
+    tokenizer = model.tokenizer
+
+    sample = tokenizer(["dimension probe", "a second, longer probe sentence"], padding=True, return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(sample[name] for name in input_names),
+            str(output_dir / ONNX_MODEL_FILE),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+        )
+
+    tokenizer.save_pretrained(str(output_dir))
+    (output_dir / "sentence_bert_config.json").write_text(
+        json.dumps({"max_seq_length": model.max_seq_length, "source_model": model_name}),
+        encoding="utf-8",
+    )
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(
+            str(output_dir / ONNX_MODEL_FILE),
+            str(output_dir / ONNX_QUANTIZED_MODEL_FILE),
+            weight_type=QuantType.QInt8,
+        )
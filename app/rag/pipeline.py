@@ -0,0 +1,417 @@
+from __future__ import annotations
+
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Callable, Iterator
+
+from app.core.config import Settings
+from app.core.logging import get_logger
+from app.core.memory import MemoryTracker, remember_report
+from app.core.metrics import INDEX_POINTS, INDEX_RUN_DURATION, INDEX_THROUGHPUT, INDEXED_ITEMS, QDRANT_ERRORS
+from app.rag.chunk_log import chunk_garbage, deleted_chats, tombstone_path
+from app.rag.chunk_store import write_chunk_store
+from app.rag.chunking import build_chunks, load_chunks_jsonl, write_chunks_jsonl
+from app.rag.ingest.export_reader import ingest_export, load_message_records
+from app.rag.jsonl import write_jsonl
+from app.rag.manifest import (
+    load_manifest,
+    record_chunks_compacted,
+    record_collection_reset,
+    record_ingest,
+    record_reindex,
+    record_retired_collection,
+    update_manifest,
+)
+from app.rag.message_index import build_message_index
+from app.rag.schema import ChunkRecord
+
+logger = get_logger(__name__)
+
+
+class PipelineProgress:
+    """No-op progress sink; background jobs pass a reporting/cancellable one."""
+
+    def stage(self, name: str, total: int | None = None) -> None:
+        pass
+
+    def advance(self, count: int = 1) -> None:
+        pass
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((perf_counter() - started) * 1000, 1)
+
+
+@contextmanager
+def _bulk_embedder(
+    service,
+    settings: Settings,
+    embed_workers: int | None,
+    embed_threads: int | None,
+) -> Iterator[Any]:
+    workers = embed_workers if embed_workers is not None else settings.emb_pool_workers
+    threads = embed_threads or settings.emb_pool_threads or None
+    if workers <= 1:
+        yield service.embedder
+        return
+    with service.embedder.bulk_pool(workers=workers, threads_per_worker=threads) as pool:
+        yield pool
+
+
+def _index_chunks(
+    service,
+    embedder,
+    chunks: list[ChunkRecord],
+    batch_size: int,
+    timings_ms: dict[str, float],
+    progress: PipelineProgress,
+    collection_name: str | None = None,
+) -> None:
+    # Embed and upsert in slices so progress is visible and cancellation can
+    # take effect between slices instead of after the whole corpus.
+    progress.stage("index", total=len(chunks))
+    # Callers create the collection first; an explicit target keeps upsert_chunks from re-checking it per slice.
+    collection_name = collection_name or service.store.collection_name
+    embed_ms = 0.0
+    upsert_ms = 0.0
+    for start in range(0, len(chunks), batch_size):
+        batch = chunks[start : start + batch_size]
+
+        started = perf_counter()
+        vectors = embedder.embed_texts([chunk.text for chunk in batch])
+        embed_ms += perf_counter() - started
+
+        started = perf_counter()
+        service.store.upsert_chunks(batch, vectors, collection_name=collection_name)
+        upsert_ms += perf_counter() - started
+
+        progress.advance(len(batch))
+
+    timings_ms["embed"] = round(embed_ms * 1000, 1)
+    timings_ms["upsert"] = round(upsert_ms * 1000, 1)
+
+
+def _write_sidecar(name: str, write: Callable[[], object]) -> None:
+    # The JSONL files are already in place and canonical; readers fall back to them (or rebuild the sidecar).
+    try:
+        write()
+    except OSError as exc:
+        logger.warning("Could not write the %s: %s", name, exc)
+
+
+@contextmanager
+def _staged_outputs(*paths: Path) -> Iterator[list[Path]]:
+    """Yield temp paths next to ``paths``; they replace the originals only if the block completes.
+
+    A failed or cancelled run therefore leaves the processed files matching the manifest.
+    """
+    staged = [path.with_name(f".{path.name}.partial") for path in paths]
+    try:
+        yield staged
+    except BaseException:
+        for path in staged:
+            path.unlink(missing_ok=True)
+        raise
+    for staged_path, path in zip(staged, paths):
+        os.replace(staged_path, path)
+
+
+def record_index_points(store) -> None:
+    """Refresh the index-size gauge after a write; /metrics never queries Qdrant itself."""
+    try:
+        INDEX_POINTS.set(store.stats()["points_count"])
+    except Exception as exc:
+        QDRANT_ERRORS.inc(operation="stats")
+        logger.warning("Could not read Qdrant stats for the index-size gauge: %s", exc)
+
+
+def _record_index_metrics(service, kind: str, run_started: float, chunks: int, messages: int | None = None) -> None:
+    record_index_points(service.store)
+    elapsed_s = perf_counter() - run_started
+    INDEX_RUN_DURATION.observe(elapsed_s, kind=kind)
+    INDEXED_ITEMS.inc(chunks, kind=kind, item="chunks")
+    if messages is not None:
+        INDEXED_ITEMS.inc(messages, kind=kind, item="messages")
+    if elapsed_s > 0:
+        INDEX_THROUGHPUT.set(chunks / elapsed_s, kind=kind)
+
+
+def run_ingest(
+    service,
+    settings: Settings,
+    input_path: Path,
+    allowlist_it_only: bool,
+    exclude_title_keywords: list[str],
+    progress: PipelineProgress | None = None,
+    embed_workers: int | None = None,
+    embed_threads: int | None = None,
+) -> dict[str, Any]:
+    progress = progress or PipelineProgress()
+    timings_ms: dict[str, float] = {}
+    run_started = perf_counter()
+
+    memory = MemoryTracker(trace=settings.memory_trace_ingest, top_n=settings.memory_top_n).start()
+    try:
+        with _staged_outputs(settings.messages_jsonl_path, settings.chunks_jsonl_path) as (messages_path, chunks_path):
+            progress.stage("parse")
+            started = perf_counter()
+            summary = ingest_export(
+                input_path=input_path,
+                output_messages_path=messages_path,
+                allowlist_it_only=allowlist_it_only,
+                exclude_title_keywords=exclude_title_keywords,
+                memory=memory,
+            )
+            timings_ms["parse"] = _elapsed_ms(started)
+
+            progress.stage("chunk", total=summary["processed_message_count"])
+            started = perf_counter()
+            with memory.stage("load_messages"):
+                messages = load_message_records(messages_path)
+            with memory.stage("chunk"):
+                chunks = build_chunks(
+                    messages,
+                    max_tokens=settings.max_chunk_tokens,
+                    overlap_messages=settings.overlap_messages,
+                )
+                write_chunks_jsonl(chunks_path, chunks)
+            timings_ms["chunk"] = _elapsed_ms(started)
+            progress.advance(len(messages))
+
+            service.store.create_collection(reset=False)
+            if chunks:
+                with memory.stage("index"):
+                    with _bulk_embedder(service, settings, embed_workers, embed_threads) as embedder:
+                        _index_chunks(service, embedder, chunks, settings.index_batch_size, timings_ms, progress)
+
+        # The new chunks.jsonl already retired every tombstone for the old one.
+        tombstone_path(settings.chunks_jsonl_path).unlink(missing_ok=True)
+        started = perf_counter()
+        with memory.stage("chunk_store"):
+            _write_sidecar("chunk store", lambda: write_chunk_store(settings.chunks_jsonl_path, chunks))
+        timings_ms["chunk_store"] = _elapsed_ms(started)
+        started = perf_counter()
+        with memory.stage("message_index"):
+            _write_sidecar("message index", lambda: build_message_index(settings.messages_jsonl_path, messages))
+        timings_ms["message_index"] = _elapsed_ms(started)
+    finally:
+        memory.stop()
+
+    update_manifest(
+        settings.manifest_path,
+        settings.messages_jsonl_path,
+        settings.chunks_jsonl_path,
+        lambda manifest: record_ingest(
+            manifest,
+            messages=messages,
+            chunks=chunks,
+            messages_path=settings.messages_jsonl_path,
+            chunks_path=settings.chunks_jsonl_path,
+            input_path=input_path,
+            timings_ms=timings_ms,
+        ),
+    )
+
+    _record_index_metrics(service, "ingest", run_started, chunks=len(chunks), messages=len(messages))
+    summary["chunk_count"] = len(chunks)
+    summary["output_messages_path"] = str(settings.messages_jsonl_path)
+    summary["output_chunks_path"] = str(settings.chunks_jsonl_path)
+    summary["timings_ms"] = timings_ms
+    summary["memory"] = memory.report()
+    remember_report("ingest", summary["memory"])
+    return summary
+
+
+def collection_gc_due(settings: Settings, now: float | None = None) -> bool:
+    """Whether a retired blue/green version is past its grace period; reads the manifest, never rebuilds it."""
+    now = time.time() if now is None else now
+    manifest = load_manifest(settings.manifest_path)
+    retired_times = (manifest or {}).get("retired_collections", {}).values()
+    return any(now - retired_at >= settings.collection_gc_grace_s for retired_at in retired_times)
+
+
+def collect_retired_collections(service, settings: Settings) -> list[str]:
+    """Drop blue/green versions whose grace period has expired."""
+    now = time.time()
+    dropped: list[str] = []
+    # Most calls find nothing due; skip the manifest rewrite then.
+    if not collection_gc_due(settings, now):
+        return dropped
+
+    def collect(manifest: dict[str, Any]) -> dict[str, Any]:
+        retired = manifest.setdefault("retired_collections", {})
+        for name, retired_at in list(retired.items()):
+            if now - retired_at < settings.collection_gc_grace_s:
+                continue
+            try:
+                service.store.drop_collection(name)
+            except Exception as exc:
+                logger.warning("Could not drop retired collection %s: %s", name, exc)
+                continue
+            retired.pop(name)
+            dropped.append(name)
+        return manifest
+
+    update_manifest(settings.manifest_path, settings.messages_jsonl_path, settings.chunks_jsonl_path, collect)
+    return dropped
+
+
+def compact_chunk_log(
+    settings: Settings,
+    min_garbage_ratio: float = 0.0,
+    progress: PipelineProgress | None = None,
+) -> dict[str, Any]:
+    """Rewrite chunks.jsonl and messages.jsonl without tombstoned chats once they hide ``min_garbage_ratio`` of the
+    chunk rows, then their sidecars.
+
+    Callers hold the index-mutation slot, so no delete appends a tombstone while the new files are written.
+    """
+    progress = progress or PipelineProgress()
+    chunks_path = settings.chunks_jsonl_path
+    messages_path = settings.messages_jsonl_path
+    progress.stage("scan")
+    garbage, total = chunk_garbage(chunks_path)
+    result: dict[str, Any] = {"compacted": False, "garbage_chunks": garbage, "chunks": total}
+    if total and garbage / total < min_garbage_ratio:
+        return result
+    if not garbage:
+        # Tombstones for chats without chunks (or for an older file) hide nothing; only the log goes.
+        tombstone_path(chunks_path).unlink(missing_ok=True)
+        return result
+
+    progress.stage("compact", total=total - garbage)
+    started = perf_counter()
+    deleted = deleted_chats(chunks_path)
+    chunks = list(load_chunks_jsonl(chunks_path))
+    messages = [message for message in load_message_records(messages_path) if message.chat_id not in deleted]
+    # messages.jsonl is swapped first: until chunks.jsonl follows, the tombstones still hide the chats in both.
+    with _staged_outputs(messages_path, chunks_path) as (staged_messages, staged_chunks):
+        write_jsonl(staged_messages, messages, kind="messages")
+        write_chunks_jsonl(staged_chunks, chunks)
+    tombstone_path(chunks_path).unlink(missing_ok=True)
+    _write_sidecar("chunk store", lambda: write_chunk_store(chunks_path, chunks))
+    _write_sidecar("message index", lambda: build_message_index(messages_path, messages))
+    progress.advance(len(chunks))
+    update_manifest(
+        settings.manifest_path,
+        messages_path,
+        chunks_path,
+        lambda manifest: record_chunks_compacted(manifest, messages_path, chunks_path),
+    )
+    result.update(
+        {
+            "compacted": True,
+            "chunks": len(chunks),
+            "messages": len(messages),
+            "timings_ms": {"compact": _elapsed_ms(started)},
+        }
+    )
+    return result
+
+
+def _blue_green_index(
+    service,
+    settings: Settings,
+    chunks: list[ChunkRecord],
+    timings_ms: dict[str, float],
+    progress: PipelineProgress,
+    embedder,
+) -> tuple[str, str | None]:
+    collect_retired_collections(service, settings)
+    target = service.store.create_versioned_collection()
+    try:
+        _index_chunks(
+            service,
+            embedder,
+            chunks,
+            settings.index_batch_size,
+            timings_ms,
+            progress,
+            collection_name=target,
+        )
+    except BaseException:
+        # Queries never saw the half-built version, so it can go right away.
+        service.store.drop_collection(target)
+        raise
+
+    progress.stage("switch")
+    previous = service.store.switch_alias(target)
+    if previous is not None:
+        update_manifest(
+            settings.manifest_path,
+            settings.messages_jsonl_path,
+            settings.chunks_jsonl_path,
+            lambda manifest: record_retired_collection(manifest, previous, time.time()),
+        )
+    collect_retired_collections(service, settings)
+    return target, previous
+
+
+def run_reindex(
+    service,
+    settings: Settings,
+    chunks_path: Path,
+    reset_collection: bool,
+    blue_green: bool = False,
+    progress: PipelineProgress | None = None,
+    embed_workers: int | None = None,
+    embed_threads: int | None = None,
+) -> dict[str, Any]:
+    progress = progress or PipelineProgress()
+    timings_ms: dict[str, float] = {}
+    run_started = perf_counter()
+
+    memory = MemoryTracker(trace=settings.memory_trace_ingest, top_n=settings.memory_top_n).start()
+    try:
+        progress.stage("load")
+        started = perf_counter()
+        with memory.stage("load_chunks"):
+            # Chunk files from elsewhere are validated record by record; our own are trusted.
+            external = chunks_path.resolve().parent != settings.processed_data_dir.resolve()
+            chunks = load_chunks_jsonl(chunks_path, validate=external)
+        timings_ms["load"] = _elapsed_ms(started)
+
+        if not chunks:
+            if not blue_green:
+                service.store.create_collection(reset=reset_collection)
+                if reset_collection:
+                    update_manifest(
+                        settings.manifest_path,
+                        settings.messages_jsonl_path,
+                        settings.chunks_jsonl_path,
+                        record_collection_reset,
+                    )
+                    record_index_points(service.store)
+            return {
+                "collection_name": settings.collection_name,
+                "indexed_chunks": 0,
+                "message": f"No chunks found at {chunks_path}",
+            }
+
+        result: dict[str, Any] = {"collection_name": settings.collection_name}
+        with memory.stage("index"), _bulk_embedder(service, settings, embed_workers, embed_threads) as embedder:
+            if blue_green:
+                # Build the new version next to the live one; reset is implied.
+                target, previous = _blue_green_index(service, settings, chunks, timings_ms, progress, embedder)
+                result.update({"serving_collection": target, "previous_collection": previous})
+            else:
+                service.store.create_collection(reset=reset_collection)
+                _index_chunks(service, embedder, chunks, settings.index_batch_size, timings_ms, progress)
+    finally:
+        memory.stop()
+
+    update_manifest(
+        settings.manifest_path,
+        settings.messages_jsonl_path,
+        settings.chunks_jsonl_path,
+        lambda manifest: record_reindex(manifest, chunks=chunks, chunks_path=chunks_path, timings_ms=timings_ms),
+    )
+
+    _record_index_metrics(service, "reindex", run_started, chunks=len(chunks))
+    result.update({"indexed_chunks": len(chunks), "chunks_path": str(chunks_path), "timings_ms": timings_ms})
+    result["memory"] = memory.report()
+    remember_report("reindex", result["memory"])
+    return result
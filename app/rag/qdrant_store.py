@@ -1,29 +1,109 @@
 from __future__ import annotations
 
+import importlib
+import re
+from contextlib import contextmanager
 from datetime import datetime, timezone
-from typing import Any
+from types import ModuleType
+from typing import Any, Iterator
 
 import numpy as np
-from qdrant_client import QdrantClient
-from qdrant_client.http import models as qm
 
 from app.core.logging import get_logger
+from app.core.metrics import QDRANT_ERRORS
+from app.core.tracing import span
 from app.rag.schema import ChunkRecord, RetrievalContext
 
 logger = get_logger(__name__)
 
 
+@contextmanager
+def _count_errors(operation: str) -> Iterator[None]:
+    try:
+        yield
+    except Exception:
+        QDRANT_ERRORS.inc(operation=operation)
+        raise
+
+
+def _is_missing_collection(exc: Exception) -> bool:
+    # The HTTP client raises UnexpectedResponse(404); the local/in-memory client raises ValueError.
+    if getattr(exc, "status_code", None) == 404:
+        return True
+    return isinstance(exc, ValueError) and "not found" in str(exc)
+
+
+class _LazyModule:
+    """Defers importing qdrant_client (~0.8 s) until the store is first used."""
+
+    def __init__(self, name: str) -> None:
+        self._name = name
+        self._module: ModuleType | None = None
+
+    def __getattr__(self, attr: str) -> Any:
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+qm = _LazyModule("qdrant_client.http.models")
+
+
 class QdrantStore:
     def __init__(self, url: str, collection_name: str, vector_size: int, timeout_s: float = 10.0) -> None:
         self.collection_name = collection_name
         self.vector_size = vector_size
-        self.client = QdrantClient(url=url, timeout=timeout_s)
+        self.url = url
+        self.timeout_s = timeout_s
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            from qdrant_client import QdrantClient
+
+            self._client = QdrantClient(url=self.url, timeout=self.timeout_s)
+        return self._client
+
+    @client.setter
+    def client(self, value) -> None:
+        self._client = value
+
+    def _alias_target(self) -> str | None:
+        for alias in self.client.get_aliases().aliases:
+            if alias.alias_name == self.collection_name:
+                return alias.collection_name
+        return None
 
     def collection_exists(self) -> bool:
         collections = self.client.get_collections().collections
-        return any(c.name == self.collection_name for c in collections)
+        if any(c.name == self.collection_name for c in collections):
+            return True
+        return self._alias_target() is not None
+
+    def _create_concrete(self, collection_name: str) -> None:
+        logger.info("Creating collection %s", collection_name)
+        self.client.create_collection(
+            collection_name=collection_name,
+            vectors_config=qm.VectorParams(size=self.vector_size, distance=qm.Distance.COSINE),
+        )
+        self._ensure_payload_indexes(collection_name)
 
     def create_collection(self, reset: bool = False) -> None:
+        alias_target = self._alias_target()
+        if alias_target is not None:
+            if not reset:
+                self._ensure_payload_indexes(self.collection_name)
+                return
+            # Resetting a blue/green deployment drops the alias and its live version.
+            logger.info("Deleting alias %s and collection %s", self.collection_name, alias_target)
+            self.client.update_collection_aliases(
+                change_aliases_operations=[
+                    qm.DeleteAliasOperation(delete_alias=qm.DeleteAlias(alias_name=self.collection_name))
+                ]
+            )
+            self.client.delete_collection(alias_target)
+
         exists = self.collection_exists()
         if exists and reset:
             logger.info("Deleting existing collection %s", self.collection_name)
@@ -31,15 +111,54 @@ class QdrantStore:
             exists = False
 
         if not exists:
-            logger.info("Creating collection %s", self.collection_name)
-            self.client.create_collection(
-                collection_name=self.collection_name,
-                vectors_config=qm.VectorParams(size=self.vector_size, distance=qm.Distance.COSINE),
+            self._create_concrete(self.collection_name)
+        else:
+            self._ensure_payload_indexes(self.collection_name)
+
+    def versioned_collections(self) -> list[str]:
+        pattern = re.compile(rf"^{re.escape(self.collection_name)}_v(\d+)$")
+        versions: list[tuple[int, str]] = []
+        for collection in self.client.get_collections().collections:
+            match = pattern.match(collection.name)
+            if match:
+                versions.append((int(match.group(1)), collection.name))
+        return [name for _, name in sorted(versions)]
+
+    def create_versioned_collection(self) -> str:
+        existing = self.versioned_collections()
+        next_version = int(existing[-1].rsplit("_v", 1)[1]) + 1 if existing else 1
+        name = f"{self.collection_name}_v{next_version}"
+        self._create_concrete(name)
+        return name
+
+    def switch_alias(self, target: str) -> str | None:
+        """Point the serving alias at ``target``; returns the previously served collection."""
+        previous = self._alias_target()
+        operations: list[Any] = []
+        if previous is not None:
+            operations.append(qm.DeleteAliasOperation(delete_alias=qm.DeleteAlias(alias_name=self.collection_name)))
+        elif self.collection_exists():
+            # A concrete collection still owns the name (pre blue/green layout).
+            # It has to go before the alias can be created; this is the only
+            # switch that is not atomic.
+            logger.warning("Replacing concrete collection %s with an alias", self.collection_name)
+            self.client.delete_collection(self.collection_name)
+        operations.append(
+            qm.CreateAliasOperation(
+                create_alias=qm.CreateAlias(collection_name=target, alias_name=self.collection_name)
             )
+        )
+        self.client.update_collection_aliases(change_aliases_operations=operations)
+        logger.info("Alias %s now serves %s (was %s)", self.collection_name, target, previous)
+        return previous
 
-        self._ensure_payload_indexes()
+    def drop_collection(self, collection_name: str) -> None:
+        if collection_name == self._alias_target():
+            raise ValueError(f"Refusing to drop live collection {collection_name}")
+        logger.info("Dropping collection %s", collection_name)
+        self.client.delete_collection(collection_name)
 
-    def _ensure_payload_indexes(self) -> None:
+    def _ensure_payload_indexes(self, collection_name: str) -> None:
         for field_name, schema_type in (
             ("topic", qm.PayloadSchemaType.KEYWORD),
             ("chat_id", qm.PayloadSchemaType.KEYWORD),
@@ -47,7 +166,7 @@ class QdrantStore:
         ):
             try:
                 self.client.create_payload_index(
-                    collection_name=self.collection_name,
+                    collection_name=collection_name,
                     field_name=field_name,
                     field_schema=schema_type,
                 )
@@ -81,13 +200,21 @@ class QdrantStore:
             "metadata": chunk.metadata,
         }
 
-    def upsert_chunks(self, chunks: list[ChunkRecord], vectors: np.ndarray, batch_size: int = 64) -> None:
+    def upsert_chunks(
+        self,
+        chunks: list[ChunkRecord],
+        vectors: np.ndarray,
+        batch_size: int = 64,
+        collection_name: str | None = None,
+    ) -> None:
         if len(chunks) != len(vectors):
             raise ValueError("Chunks count must match vectors count")
         if not chunks:
             return
 
-        self.create_collection(reset=False)
+        if collection_name is None:
+            collection_name = self.collection_name
+            self.create_collection(reset=False)
 
         for start in range(0, len(chunks), batch_size):
             end = min(start + batch_size, len(chunks))
@@ -103,7 +230,8 @@ class QdrantStore:
                 for idx, chunk in enumerate(batch_chunks)
             ]
 
-            self.client.upsert(collection_name=self.collection_name, points=points, wait=True)
+            with _count_errors("upsert"):
+                self.client.upsert(collection_name=collection_name, points=points, wait=True)
 
     def _build_filter(
         self,
@@ -153,35 +281,75 @@ class QdrantStore:
         date_to: str | None = None,
         chat_ids: list[str] | None = None,
     ) -> list[RetrievalContext]:
-        if not self.collection_exists():
-            return []
+        with span("vector_search", top_k=top_k) as counts:
+            # No existence pre-check: a missing collection is reported by the search itself.
+            query_filter = self._build_filter(topic, date_from, date_to, chat_ids)
+            try:
+                hits = self.client.search(
+                    collection_name=self.collection_name,
+                    query_vector=query_vector.tolist(),
+                    query_filter=query_filter,
+                    limit=top_k,
+                    with_payload=True,
+                )
+            except Exception as exc:
+                if not _is_missing_collection(exc):
+                    QDRANT_ERRORS.inc(operation="search")
+                    raise
+                hits = []
+            counts.update(round_trips=1, filtered=query_filter is not None, hits=len(hits))
+            return [self._hit_to_context(hit) for hit in hits]
 
-        query_filter = self._build_filter(topic, date_from, date_to, chat_ids)
-        hits = self.client.search(
-            collection_name=self.collection_name,
-            query_vector=query_vector.tolist(),
-            query_filter=query_filter,
-            limit=top_k,
-            with_payload=True,
-        )
+    def search_batch(self, query_vectors: np.ndarray, searches: list[dict[str, Any]]) -> list[list[RetrievalContext]]:
+        """Run several filtered searches in one Qdrant round trip.
 
-        contexts: list[RetrievalContext] = []
-        for hit in hits:
-            payload = hit.payload or {}
-            contexts.append(
-                RetrievalContext(
-                    chunk_id=str(payload.get("chunk_id") or hit.id),
-                    chat_id=str(payload.get("chat_id", "unknown")),
-                    chat_title=payload.get("chat_title"),
-                    message_ids=[str(mid) for mid in payload.get("message_ids", [])],
-                    topic=str(payload.get("topic", "unknown")),
-                    text=str(payload.get("text", "")),
-                    score=float(hit.score),
-                    created_at=payload.get("created_at_start"),
-                )
+        ``searches[i]`` holds ``top_k`` and the optional ``topic``/``date_from``/``date_to``/``chat_ids``
+        filters for ``query_vectors[i]``; results come back in the same order.
+        """
+        if not searches:
+            return []
+        with span("vector_search_batch", queries=len(searches)) as counts:
+            try:
+                batches = self._search_batch(query_vectors, searches)
+            except Exception as exc:
+                if not _is_missing_collection(exc):
+                    QDRANT_ERRORS.inc(operation="search_batch")
+                    raise
+                batches = [[] for _ in searches]
+            counts.update(round_trips=1, hits=sum(len(hits) for hits in batches))
+            return batches
+
+    def _search_batch(self, query_vectors: np.ndarray, searches: list[dict[str, Any]]) -> list[list[RetrievalContext]]:
+        requests = [
+            qm.SearchRequest(
+                vector=vector.tolist(),
+                filter=self._build_filter(
+                    search.get("topic"),
+                    search.get("date_from"),
+                    search.get("date_to"),
+                    search.get("chat_ids"),
+                ),
+                limit=search["top_k"],
+                with_payload=True,
             )
+            for vector, search in zip(query_vectors, searches)
+        ]
+        batches = self.client.search_batch(collection_name=self.collection_name, requests=requests)
+        return [[self._hit_to_context(hit) for hit in hits] for hits in batches]
 
-        return contexts
+    @staticmethod
+    def _hit_to_context(hit: Any) -> RetrievalContext:
+        payload = hit.payload or {}
+        return RetrievalContext(
+            chunk_id=str(payload.get("chunk_id") or hit.id),
+            chat_id=str(payload.get("chat_id", "unknown")),
+            chat_title=payload.get("chat_title"),
+            message_ids=[str(mid) for mid in payload.get("message_ids", [])],
+            topic=str(payload.get("topic", "unknown")),
+            text=str(payload.get("text", "")),
+            score=float(hit.score),
+            created_at=payload.get("created_at_start"),
+        )
 
     def stats(self) -> dict[str, Any]:
         if not self.collection_exists():
@@ -194,6 +362,7 @@ class QdrantStore:
         info = self.client.get_collection(self.collection_name)
         return {
             "collection_name": self.collection_name,
+            "serving_collection": self._alias_target() or self.collection_name,
             "points_count": int(info.points_count or 0),
             "indexed_vectors_count": int(info.indexed_vectors_count or 0),
         }
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import sys
+from dataclasses import dataclass, fields
+from typing import Any, Sequence
+
+from app.rag.schema import NormalizedMessage
+
+# Ingest keeps every message of an export in memory between the parsers, redaction, topic assignment,
+# filtering and chunking. MessageRecord is the compact form used there: slotted (no per-instance dict or
+# pydantic bookkeeping), with chat ids, titles, roles, topics and sources interned so a conversation
+# shares one copy of each, and one shared empty tuple for messages without attachments.
+# NormalizedMessage stays the model at API and file boundaries.
+
+_NO_ATTACHMENTS: tuple[dict[str, Any], ...] = ()
+
+
+def _intern(value: str | None) -> str | None:
+    return sys.intern(value) if type(value) is str else value
+
+
+@dataclass(slots=True)
+class MessageRecord:
+    chat_id: str
+    chat_title: str | None
+    message_id: str
+    parent_message_id: str | None
+    role: str
+    created_at: str | None
+    text: str
+    has_code: bool = False
+    attachments: Sequence[dict[str, Any]] = _NO_ATTACHMENTS
+    topic: str = "unknown"
+    source: str = "chatgpt_export_json"
+
+    def __post_init__(self) -> None:
+        self.chat_id = _intern(self.chat_id)
+        self.chat_title = _intern(self.chat_title)
+        self.role = _intern(self.role)
+        self.topic = _intern(self.topic)
+        self.source = _intern(self.source)
+        if not self.attachments:
+            self.attachments = _NO_ATTACHMENTS
+
+    @classmethod
+    def from_fields(cls, data: dict[str, Any]) -> MessageRecord:
+        return cls(**data)
+
+    @classmethod
+    def from_model(cls, message: NormalizedMessage) -> MessageRecord:
+        return cls(**message.__dict__)
+
+    def to_model(self) -> NormalizedMessage:
+        data = {name: getattr(self, name) for name in _FIELD_NAMES}
+        data["attachments"] = list(self.attachments)
+        return NormalizedMessage.model_validate(data)
+
+
+_FIELD_NAMES = tuple(field.name for field in fields(MessageRecord))
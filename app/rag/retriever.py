@@ -1,14 +1,21 @@
 from __future__ import annotations
 
 import re
-from datetime import datetime, timezone
+import threading
+from dataclasses import dataclass, field, replace
 from pathlib import Path
+from typing import Any
 
 from app.core.config import Settings
+from app.core.memory import approx_deep_size
+from app.core.metrics import CACHE_REQUESTS
+from app.core.tracing import span
+from app.rag.chunk_log import deleted_chats, tombstone_path
+from app.rag.chunk_store import ChunkStore, LazyChunks, parse_timestamp
 from app.rag.chunking import load_chunks_jsonl
 from app.rag.qdrant_store import QdrantStore
 from app.rag.reranker import LexicalReranker
-from app.rag.schema import RetrievalContext
+from app.rag.schema import ChunkRecord, RetrievalContext
 
 _TOKEN_RE = re.compile(r"[a-zA-Z0-9_]{3,}")
 
@@ -17,23 +24,92 @@ def _tokens(text: str) -> set[str]:
     return {tok.lower() for tok in _TOKEN_RE.findall(text)}
 
 
+@dataclass
+class _KeywordCorpus:
+    """Chunk columns for filtering plus the token set of every row; records are built only for hits.
+
+    ``deleted`` holds the tombstoned chats, refreshed on its own when only the tombstone log (``tombstones``,
+    its mtime/size) changes, so a delete never re-tokenizes the corpus.
+    """
+
+    store: ChunkStore
+    terms: list[set[str]]
+    deleted: frozenset[str] = frozenset()
+    tombstones: tuple[int, int] | None = field(default=None, compare=False)
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+
 class Retriever:
     def __init__(self, embedder, store: QdrantStore, settings: Settings) -> None:
         self.embedder = embedder
         self.store = store
         self.settings = settings
         self._reranker = LexicalReranker()
+        self._corpus_lock = threading.Lock()
+        self._corpus: tuple[tuple[str, int, int], _KeywordCorpus] | None = None
 
     def _to_timestamp(self, value: str | None) -> float | None:
-        if not value:
-            return None
+        return parse_timestamp(value)
+
+    def _keyword_corpus(self) -> tuple[_KeywordCorpus, bool]:
+        """Chunk columns with pre-tokenized text, reloaded only when the JSONL file changes.
+
+        Uses the mmap'd chunk store when one mirrors the file, otherwise columns built over the parsed JSONL.
+        """
+        chunks_path = Path(self.settings.chunks_jsonl_path)
+        try:
+            stat = chunks_path.stat()
+        except FileNotFoundError:
+            return _KeywordCorpus(store=ChunkStore.from_chunks([]), terms=[]), False
+        key = (str(chunks_path), stat.st_mtime_ns, stat.st_size)
         try:
-            dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
-            if dt.tzinfo is None:
-                dt = dt.replace(tzinfo=timezone.utc)
-            return dt.timestamp()
-        except ValueError:
-            return None
+            tombstone_stat = tombstone_path(chunks_path).stat()
+            tombstones: tuple[int, int] | None = (tombstone_stat.st_mtime_ns, tombstone_stat.st_size)
+        except FileNotFoundError:
+            tombstones = None
+        with self._corpus_lock:
+            cached = self._corpus[1] if self._corpus is not None and self._corpus[0] == key else None
+        if cached is not None:
+            CACHE_REQUESTS.inc(cache="keyword_corpus", result="hit")
+            if cached.tombstones != tombstones:
+                cached = replace(cached, deleted=deleted_chats(chunks_path), tombstones=tombstones)
+                with self._corpus_lock:
+                    self._corpus = (key, cached)
+            return cached, True
+        CACHE_REQUESTS.inc(cache="keyword_corpus", result="miss")
+
+        chunks = load_chunks_jsonl(chunks_path)
+        # A mapped store keeps every row; tombstoned chats are masked per query through ``deleted``.
+        store = chunks.store if isinstance(chunks, LazyChunks) else ChunkStore.from_chunks(chunks)
+        corpus = _KeywordCorpus(
+            store=store,
+            terms=[_tokens(store.text(row)) for row in range(len(store))],
+            deleted=deleted_chats(chunks_path),
+            tombstones=tombstones,
+        )
+        with self._corpus_lock:
+            self._corpus = (key, corpus)
+        return corpus, False
+
+    def memory_report(self) -> dict[str, Any]:
+        """Size of the cached keyword corpus (token sets estimated from a sample, plus in-memory columns/records).
+
+        A mmap'd store's columns and texts live in the page cache and are reported separately as ``mapped``.
+        """
+        with self._corpus_lock:
+            corpus = self._corpus[1] if self._corpus is not None else None
+        if corpus is None:
+            return {"chunks": 0, "approx_mb": 0.0, "mapped": False}
+        size = approx_deep_size(corpus.terms, len(corpus))
+        if corpus.store.records is not None:
+            size += approx_deep_size(corpus.store.records, len(corpus))
+        return {
+            "chunks": len(corpus),
+            "approx_mb": round(size / 1_048_576, 2),
+            "mapped": corpus.store.records is None,
+        }
 
     def _keyword_search(
         self,
@@ -44,56 +120,48 @@ class Retriever:
         date_to: str | None,
         chat_ids: list[str] | None,
     ) -> list[RetrievalContext]:
-        chunks_path = Path(self.settings.chunks_jsonl_path)
-        chunks = load_chunks_jsonl(chunks_path)
-        if not chunks:
-            return []
+        with span("keyword_search") as counts:
+            corpus, cache_hit = self._keyword_corpus()
+            counts.update(corpus_chunks=len(corpus), cache_hit=cache_hit, candidates_scanned=0, matches=0)
+            if not corpus:
+                return []
 
-        query_terms = _tokens(question)
-        if not query_terms:
-            return []
+            query_terms = _tokens(question)
+            if not query_terms:
+                return []
 
-        from_ts = self._to_timestamp(date_from)
-        to_ts = self._to_timestamp(date_to)
-
-        scored: list[tuple[float, RetrievalContext]] = []
-        for chunk in chunks:
-            if topic and chunk.topic != topic:
-                continue
-            if chat_ids and chunk.chat_id not in chat_ids:
-                continue
-
-            chunk_ts = self._to_timestamp(chunk.start_at)
-            if from_ts is not None and chunk_ts is not None and chunk_ts < from_ts:
-                continue
-            if to_ts is not None and chunk_ts is not None and chunk_ts > to_ts:
-                continue
-
-            doc_terms = _tokens(chunk.text)
-            if not doc_terms:
-                continue
-            overlap = len(query_terms & doc_terms)
-            if overlap == 0:
-                continue
-            score = overlap / max(len(query_terms), 1)
-            scored.append(
-                (
-                    score,
-                    RetrievalContext(
-                        chunk_id=chunk.chunk_id,
-                        chat_id=chunk.chat_id,
-                        chat_title=chunk.chat_title,
-                        message_ids=chunk.message_ids,
-                        topic=chunk.topic,
-                        text=chunk.text,
-                        score=float(score),
-                        created_at=chunk.start_at,
-                    ),
-                )
-            )
+            from_ts = self._to_timestamp(date_from)
+            to_ts = self._to_timestamp(date_to)
 
-        scored.sort(key=lambda item: item[0], reverse=True)
-        return [ctx for _, ctx in scored[:top_k]]
+            rows = corpus.store.filter_rows(
+                topic=topic, chat_ids=chat_ids, from_ts=from_ts, to_ts=to_ts, exclude_chat_ids=corpus.deleted
+            )
+            scored: list[tuple[float, int]] = []
+            for row in rows.tolist():
+                doc_terms = corpus.terms[row]
+                if not doc_terms:
+                    continue
+                overlap = len(query_terms & doc_terms)
+                if overlap == 0:
+                    continue
+                scored.append((overlap / max(len(query_terms), 1), row))
+
+            counts.update(candidates_scanned=len(rows), matches=len(scored))
+            scored.sort(key=lambda item: item[0], reverse=True)
+            return [self._keyword_context(corpus.store.record(row), score) for score, row in scored[:top_k]]
+
+    @staticmethod
+    def _keyword_context(chunk: ChunkRecord, score: float) -> RetrievalContext:
+        return RetrievalContext(
+            chunk_id=chunk.chunk_id,
+            chat_id=chunk.chat_id,
+            chat_title=chunk.chat_title,
+            message_ids=chunk.message_ids,
+            topic=chunk.topic,
+            text=chunk.text,
+            score=float(score),
+            created_at=chunk.start_at,
+        )
 
     def _merge_results(
         self,
@@ -119,32 +187,49 @@ class Retriever:
         date_from: str | None = None,
         date_to: str | None = None,
         chat_ids: list[str] | None = None,
+        vector_results: list[RetrievalContext] | None = None,
     ) -> list[RetrievalContext]:
-        query_vector = self.embedder.embed_query(question)
-        vector_results = self.store.search(
-            query_vector=query_vector,
-            top_k=top_k,
-            topic=topic,
-            date_from=date_from,
-            date_to=date_to,
-            chat_ids=chat_ids,
-        )
+        """Hybrid retrieval; pass ``vector_results`` when the vector search already ran (``vector_search_batch``)."""
+        with span("retrieve"):
+            if vector_results is None:
+                with span("embed", texts=1):
+                    query_vector = self.embedder.embed_query(question)
+                vector_results = self.store.search(
+                    query_vector=query_vector,
+                    top_k=top_k,
+                    topic=topic,
+                    date_from=date_from,
+                    date_to=date_to,
+                    chat_ids=chat_ids,
+                )
 
-        merged = vector_results
-        if self.settings.hybrid_keyword:
-            keyword_results = self._keyword_search(
-                question=question,
-                top_k=top_k,
-                topic=topic,
-                date_from=date_from,
-                date_to=date_to,
-                chat_ids=chat_ids,
-            )
-            merged = self._merge_results(vector_results, keyword_results, top_k=top_k * 2)
+            merged = vector_results
+            if self.settings.hybrid_keyword:
+                keyword_results = self._keyword_search(
+                    question=question,
+                    top_k=top_k,
+                    topic=topic,
+                    date_from=date_from,
+                    date_to=date_to,
+                    chat_ids=chat_ids,
+                )
+                with span("merge", vector=len(vector_results), keyword=len(keyword_results)) as counts:
+                    merged = self._merge_results(vector_results, keyword_results, top_k=top_k * 2)
+                    counts["merged"] = len(merged)
+
+            if self.settings.enable_rerank:
+                with span("rerank", candidates=len(merged)):
+                    merged = self._reranker.rerank(question, merged, top_k=top_k)
+            else:
+                merged = merged[:top_k]
 
-        if self.settings.enable_rerank:
-            merged = self._reranker.rerank(question, merged, top_k=top_k)
-        else:
-            merged = merged[:top_k]
+            return merged
 
-        return merged
+    def vector_search_batch(self, queries: list[dict[str, Any]]) -> list[list[RetrievalContext]]:
+        """Embed all ``queries[i]["question"]`` in one call and search them in one Qdrant round trip."""
+        if not queries:
+            return []
+        with span("embed", texts=len(queries)):
+            query_vectors = self.embedder.embed_queries([query["question"] for query in queries])
+        searches = [{key: value for key, value in query.items() if key != "question"} for query in queries]
+        return self.store.search_batch(query_vectors, searches)
@@ -53,6 +53,14 @@ class AskRequest(BaseModel):
     date_to: str | None = None
     chat_ids: list[str] | None = None
     mode: Literal["extractive", "llm"] | None = None
+    trace: bool = False
+
+
+class TimingSpan(BaseModel):
+    name: str
+    parent: str | None = None
+    duration_ms: float
+    counts: dict[str, Any] = Field(default_factory=dict)
 
 
 class Citation(BaseModel):
@@ -68,6 +76,35 @@ class AskResponse(BaseModel):
     citations: list[Citation]
     confidence: float
     latency_ms: float
+    fallback_reason: str | None = None
+    prompt_tokens: int | None = None
+    prompt_tokens_saved: int | None = None
+    timings: list[TimingSpan] | None = None
+
+
+class ChatMessagesResponse(BaseModel):
+    chat_id: str
+    around: str | None = None
+    total: int
+    messages: list[NormalizedMessage]
+
+
+class AskBatchRequest(BaseModel):
+    items: list[AskRequest] = Field(min_length=1, max_length=256)
+
+
+class AskBatchItem(BaseModel):
+    index: int
+    response: AskResponse | None = None
+    error: str | None = None
+    latency_ms: float
+
+
+class AskBatchResponse(BaseModel):
+    results: list[AskBatchItem]
+    succeeded: int
+    failed: int
+    latency_ms: float
 
 
 class IngestRequest(BaseModel):
@@ -79,11 +116,40 @@ class IngestRequest(BaseModel):
 class ReindexRequest(BaseModel):
     reset_collection: bool = False
     chunks_path: str | None = None
+    blue_green: bool | None = None
+
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    kind: str
+    status: Literal["queued", "running", "succeeded", "failed", "cancelled"]
+    stage: str | None = None
+    processed: int = 0
+    total: int | None = None
+    throughput_per_s: float | None = None
+    eta_s: float | None = None
+    cancel_requested: bool = False
+    created_at: str
+    started_at: str | None = None
+    finished_at: str | None = None
+    error: str | None = None
+    result: dict[str, Any] | None = None
 
 
 class AdminStatsResponse(BaseModel):
     collection_name: str
+    serving_collection: str | None = None
     points_count: int
     indexed_vectors_count: int
     messages_count: int
     chunks_count: int
+    indexed_chunks_count: int = 0
+    chat_count: int = 0
+    index_generation: int = 0
+    date_from: str | None = None
+    date_to: str | None = None
+    topics: dict[str, dict[str, int]] = Field(default_factory=dict)
+    bytes: dict[str, int] = Field(default_factory=dict)
+    last_ingest: dict[str, Any] | None = None
+    last_reindex: dict[str, Any] | None = None
+    chats: dict[str, dict[str, Any]] | None = None
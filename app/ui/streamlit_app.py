@@ -1,8 +1,11 @@
 from __future__ import annotations
 
+import json
 import os
+import time
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator
+from urllib.parse import quote
 
 import requests
 import streamlit as st
@@ -37,6 +40,76 @@ def api_post(path: str, payload: dict[str, Any]) -> dict[str, Any]:
     return response.json()
 
 
+def stream_ask(payload: dict[str, Any]) -> Iterator[tuple[str, dict[str, Any]]]:
+    """Yield ``(event, data)`` pairs from the ``/ask/stream`` Server-Sent Events response."""
+    with requests.post(f"{API_BASE_URL}/ask/stream", json=payload, stream=True, timeout=(10, 120)) as response:
+        response.raise_for_status()
+        event = "message"
+        for line in response.iter_lines(decode_unicode=True):
+            if line.startswith("event: "):
+                event = line[len("event: ") :]
+            elif line.startswith("data: "):
+                yield event, json.loads(line[len("data: ") :])
+                event = "message"
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def fetch_chat_window(chat_id: str, around: str, window: int) -> dict[str, Any]:
+    return api_get(f"/chats/{quote(chat_id, safe='')}/messages?around={quote(around, safe='')}&window={window}")
+
+
+def render_full_context(citation: dict[str, Any], key: str) -> None:
+    """Load the cited messages and their neighbours from the API, only when asked for."""
+    message_ids = citation["message_ids"]
+    if not message_ids or not st.toggle("Show full messages", key=key):
+        return
+    window = len(message_ids) + 2
+    try:
+        payload = fetch_chat_window(citation["chat_id"], message_ids[0], window)
+    except Exception as exc:
+        st.error(f"Could not load messages: {exc}")
+        return
+    cited = set(message_ids)
+    for message in payload["messages"]:
+        marker = "▶ " if message["message_id"] in cited else ""
+        st.markdown(f"**{marker}{message['role']}** · {message.get('created_at') or 'unknown time'}")
+        st.text(message["text"])
+    st.caption(f"{len(payload['messages'])} of {payload['total']} messages in this chat")
+
+
+def render_citations(citations: list[dict[str, Any]]) -> None:
+    st.markdown("### Citations")
+    for idx, citation in enumerate(citations, start=1):
+        with st.expander(f"C{idx} | chat={citation['chat_id']} | score={citation['score']:.3f}"):
+            st.write(citation["snippet"])
+            st.code(
+                f"message_ids={citation['message_ids']}\ncreated_at={citation.get('created_at')}",
+                language="text",
+            )
+            render_full_context(citation, key=f"full-context-{idx}")
+
+
+def run_job(path: str, payload: dict[str, Any]) -> dict[str, Any]:
+    """Submit a background admin job and poll it until it finishes."""
+    job = api_post(path, payload)
+    status_line = st.empty()
+    progress_bar = st.progress(0.0)
+    while job["status"] in {"queued", "running"}:
+        total = job.get("total")
+        if total:
+            progress_bar.progress(min(job["processed"] / total, 1.0))
+        eta = f" | ETA {job['eta_s']:.0f}s" if job.get("eta_s") is not None else ""
+        stage = job.get("stage") or "starting"
+        status_line.caption(f"{job['status']}: {stage} ({job['processed']}/{total or '?'}){eta}")
+        time.sleep(1.0)
+        job = api_get(f"/admin/jobs/{job['job_id']}")
+    progress_bar.progress(1.0)
+    status_line.empty()
+    if job["status"] != "succeeded":
+        raise RuntimeError(job.get("error") or f"job {job['status']}")
+    return job["result"] or {}
+
+
 st.set_page_config(page_title="RAG Chat Assistant", layout="wide")
 st.title("RAG Chat Assistant")
 st.caption("Local-first retrieval over your ChatGPT exports with citation-grounded answers")
@@ -52,7 +125,7 @@ with col_a:
         file_path = DATA_RAW_DIR / uploaded.name
         file_path.write_bytes(uploaded.getvalue())
         try:
-            result = api_post("/admin/ingest", {"input_path": str(file_path)})
+            result = run_job("/admin/jobs/ingest", {"input_path": str(file_path)})
             st.success(f"Ingested {result.get('processed_message_count', 0)} messages")
             st.json(result)
         except Exception as exc:
@@ -61,7 +134,7 @@ with col_a:
     path_hint = st.text_input("Or ingest file already on disk", value="data/raw/sample_export_stub.json")
     if st.button("Ingest From Path"):
         try:
-            result = api_post("/admin/ingest", {"input_path": path_hint})
+            result = run_job("/admin/jobs/ingest", {"input_path": path_hint})
             st.success(f"Ingested {result.get('processed_message_count', 0)} messages")
             st.json(result)
         except Exception as exc:
@@ -108,20 +181,40 @@ with col_b:
                 "mode": mode,
             }
             try:
-                result = api_post("/ask", payload)
                 st.markdown("### Answer")
-                st.write(result["answer"])
-                st.caption(
-                    f"Confidence: {result['confidence']:.3f} | Latency: {result['latency_ms']:.1f} ms"
-                )
-
-                st.markdown("### Citations")
-                for idx, citation in enumerate(result.get("citations", []), start=1):
-                    with st.expander(f"C{idx} | chat={citation['chat_id']} | score={citation['score']:.3f}"):
-                        st.write(citation["snippet"])
-                        st.code(
-                            f"message_ids={citation['message_ids']}\ncreated_at={citation.get('created_at')}",
-                            language="text",
+                answer_box = st.empty()
+                caption_box = st.empty()
+                citations_box = st.container()
+                answer = ""
+                last: dict[str, Any] = {"answer": "", "caption": "", "citations": []}
+                for event, data in stream_ask(payload):
+                    if event == "citations":
+                        last["citations"] = data["citations"]
+                        with citations_box:
+                            render_citations(data["citations"])
+                    elif event == "token":
+                        answer += data["text"]
+                        answer_box.markdown(answer + " ▌")
+                    elif event == "done":
+                        answer_box.markdown(answer)
+                        timings = data["timings_ms"]
+                        last["caption"] = (
+                            f"Confidence: {data['confidence']:.3f} | Latency: {data['latency_ms']:.1f} ms"
+                            f" | Retrieval: {timings['retrieval']:.1f} ms"
                         )
+                        caption_box.caption(last["caption"])
+                    elif event == "error":
+                        answer_box.markdown(answer)
+                        st.error(f"Answer stream failed: {data['detail']}")
+                last["answer"] = answer
+                # Widgets in the citations (full-message toggles) rerun the script; keep the answer for that.
+                st.session_state["last_answer"] = last
             except Exception as exc:
                 st.error(f"Ask failed: {exc}")
+    elif "last_answer" in st.session_state:
+        last = st.session_state["last_answer"]
+        st.markdown("### Answer")
+        st.markdown(last["answer"])
+        if last["caption"]:
+            st.caption(last["caption"])
+        render_citations(last["citations"])
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+from app.core.config import get_settings
+from app.core.logging import setup_logging
+from app.rag.embedding_server import EmbeddingServer
+from app.rag.embeddings import LocalEmbedder
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve the embedding model to local API workers over a Unix socket")
+    parser.add_argument("--socket", default=None, help="Socket path (default: EMB_SERVER_SOCKET)")
+    args = parser.parse_args()
+
+    settings = get_settings()
+    setup_logging(settings.log_level)
+    socket_path = Path(args.socket) if args.socket else settings.emb_server_socket
+    if socket_path is None:
+        parser.error("Set EMB_SERVER_SOCKET or pass --socket")
+
+    embedder = LocalEmbedder(
+        model_name=settings.emb_model_name,
+        batch_size=settings.emb_batch_size,
+        normalize_embeddings=settings.emb_normalize,
+        backend=settings.emb_backend,
+        onnx_dir=settings.emb_onnx_dir,
+        onnx_quantized=settings.emb_onnx_quantized,
+        intra_op_threads=settings.emb_intra_op_threads,
+    )
+    embedder.embed_texts(["warmup"])
+
+    server = EmbeddingServer(
+        socket_path,
+        embedder.embed_texts,
+        max_batch=settings.emb_server_max_batch,
+        max_wait_ms=settings.emb_server_max_wait_ms,
+        max_pending=settings.emb_server_max_pending,
+    )
+    print(f"Embedding server listening on {socket_path}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        socket_path.unlink(missing_ok=True)
+
+
+if __name__ == "__main__":
+    main()
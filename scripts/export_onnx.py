@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+from app.core.config import get_settings
+from app.core.logging import setup_logging
+from app.rag.onnx_embedder import export_onnx
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export the embedding model to ONNX (optionally int8-quantized)")
+    parser.add_argument("--model", default=None, help="Sentence-transformers model name (default: EMB_MODEL_NAME)")
+    parser.add_argument("--output", default=None, help="Output directory (default: EMB_ONNX_DIR)")
+    parser.add_argument("--no-quantize", action="store_true", help="Skip the dynamic int8 quantized variant")
+    args = parser.parse_args()
+
+    settings = get_settings()
+    setup_logging(settings.log_level)
+    output_dir = Path(args.output) if args.output else settings.emb_onnx_dir
+    export_onnx(args.model or settings.emb_model_name, output_dir, quantize=not args.no_quantize)
+    print(f"Exported ONNX model to {output_dir}")
+
+
+if __name__ == "__main__":
+    main()
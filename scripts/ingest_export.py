@@ -1,12 +1,16 @@
 from __future__ import annotations
 
 import argparse
+from contextlib import nullcontext
 
 from app.api.routes_chat import get_chat_service
 from app.core.config import get_settings
 from app.core.logging import setup_logging
-from app.rag.chunking import build_chunks, write_chunks_jsonl
-from app.rag.ingest.export_reader import ingest_export, load_messages_jsonl, resolve_input_path
+from app.core.metrics import enable_snapshots
+from app.core.profiling import profiled
+from app.rag.embeddings import default_pool_size
+from app.rag.ingest.export_reader import resolve_input_path
+from app.rag.pipeline import run_ingest
 
 
 def main() -> None:
@@ -18,34 +22,56 @@ def main() -> None:
         default="",
         help="Comma-separated title keywords to exclude",
     )
+    parser.add_argument(
+        "--bulk-embed",
+        action="store_true",
+        help="Embed with a multi-process pool sized from the CPU count",
+    )
+    parser.add_argument(
+        "--embed-workers",
+        type=int,
+        default=None,
+        help="Embedding worker processes (0/1 = in-process)",
+    )
+    parser.add_argument("--embed-threads", type=int, default=None, help="Torch threads per embedding worker")
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Write cProfile stats and collapsed stacks for this run under PROFILE_DIR",
+    )
     args = parser.parse_args()
 
     settings = get_settings()
     setup_logging(settings.log_level)
+    if settings.metrics_dir is not None:
+        enable_snapshots(settings.metrics_dir, "ingest")
     service = get_chat_service()
 
+    embed_workers = args.embed_workers
+    if embed_workers is None and args.bulk_embed:
+        embed_workers = default_pool_size()[0]
+
     input_path = resolve_input_path(settings.raw_data_dir, args.input_path)
     exclude_keywords = [k.strip() for k in args.exclude_title_keywords.split(",") if k.strip()]
 
-    summary = ingest_export(
-        input_path=input_path,
-        output_messages_path=settings.messages_jsonl_path,
-        allowlist_it_only=args.allowlist_it_only or settings.allowlist_it_only,
-        exclude_title_keywords=exclude_keywords or settings.exclude_title_keywords_list,
+    profile = (
+        profiled("ingest", settings.profile_dir, settings.profile_interval_ms, settings.profile_keep)
+        if args.profile
+        else nullcontext()
     )
-
-    messages = load_messages_jsonl(settings.messages_jsonl_path)
-    chunks = build_chunks(messages, max_tokens=settings.max_chunk_tokens, overlap_messages=settings.overlap_messages)
-    write_chunks_jsonl(settings.chunks_jsonl_path, chunks)
-
-    service.store.create_collection(reset=False)
-    if chunks:
-        vectors = service.embedder.embed_texts([chunk.text for chunk in chunks])
-        service.store.upsert_chunks(chunks, vectors)
+    with profile:
+        summary = run_ingest(
+            service,
+            settings,
+            input_path=input_path,
+            allowlist_it_only=args.allowlist_it_only or settings.allowlist_it_only,
+            exclude_title_keywords=exclude_keywords or settings.exclude_title_keywords_list,
+            embed_workers=embed_workers,
+            embed_threads=args.embed_threads,
+        )
 
     print("Ingestion complete")
     print(summary)
-    print({"chunk_count": len(chunks), "chunks_path": str(settings.chunks_jsonl_path)})
 
 
 if __name__ == "__main__":
@@ -1,35 +1,77 @@
 from __future__ import annotations
 
 import argparse
+from contextlib import nullcontext
 from pathlib import Path
 
 from app.api.routes_chat import get_chat_service
 from app.core.config import get_settings
 from app.core.logging import setup_logging
-from app.rag.chunking import load_chunks_jsonl
+from app.core.metrics import enable_snapshots
+from app.core.profiling import profiled
+from app.rag.embeddings import default_pool_size
+from app.rag.pipeline import run_reindex
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Reindex existing chunks into Qdrant")
     parser.add_argument("--chunks", default=None, help="Optional custom chunks JSONL path")
     parser.add_argument("--reset", action="store_true", help="Reset collection before indexing")
+    parser.add_argument(
+        "--blue-green",
+        action="store_true",
+        help="Build a fresh versioned collection and switch the alias when done",
+    )
+    parser.add_argument(
+        "--bulk-embed",
+        action="store_true",
+        help="Embed with a multi-process pool sized from the CPU count",
+    )
+    parser.add_argument(
+        "--embed-workers",
+        type=int,
+        default=None,
+        help="Embedding worker processes (0/1 = in-process)",
+    )
+    parser.add_argument("--embed-threads", type=int, default=None, help="Torch threads per embedding worker")
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Write cProfile stats and collapsed stacks for this run under PROFILE_DIR",
+    )
     args = parser.parse_args()
 
     settings = get_settings()
     setup_logging(settings.log_level)
+    if settings.metrics_dir is not None:
+        enable_snapshots(settings.metrics_dir, "reindex")
     service = get_chat_service()
 
-    chunks_path = Path(args.chunks) if args.chunks else settings.chunks_jsonl_path
-    chunks = load_chunks_jsonl(chunks_path)
+    embed_workers = args.embed_workers
+    if embed_workers is None and args.bulk_embed:
+        embed_workers = default_pool_size()[0]
 
-    service.store.create_collection(reset=args.reset)
-    if not chunks:
-        print(f"No chunks found at {chunks_path}")
+    chunks_path = Path(args.chunks) if args.chunks else settings.chunks_jsonl_path
+    profile = (
+        profiled("reindex", settings.profile_dir, settings.profile_interval_ms, settings.profile_keep)
+        if args.profile
+        else nullcontext()
+    )
+    with profile:
+        result = run_reindex(
+            service,
+            settings,
+            chunks_path=chunks_path,
+            reset_collection=args.reset,
+            blue_green=args.blue_green or settings.blue_green_reindex,
+            embed_workers=embed_workers,
+            embed_threads=args.embed_threads,
+        )
+    if not result["indexed_chunks"]:
+        print(result["message"])
         return
 
-    vectors = service.embedder.embed_texts([chunk.text for chunk in chunks])
-    service.store.upsert_chunks(chunks, vectors)
-    print({"indexed_chunks": len(chunks), "chunks_path": str(chunks_path)})
+    print(result)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,198 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import routes_chat
+from app.api.main import app
+from app.api.routes_chat import ChatService
+from app.core.config import Settings
+from app.rag.schema import RetrievalContext
+
+TOKENS = ["Use ", "docker ", "compose ", "up [C1]"]
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    """Minimal OpenAI-compatible /chat/completions with and without ``stream``."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_POST(self) -> None:
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append(body)
+        self.server.client_ports.add(self.client_address[1])
+        question = body["messages"][-1]["content"]
+        if "slow" in question:
+            time.sleep(1.0)
+        if "flaky" in question and len(self.server.requests) == 1:
+            raw = b'{"error": {"message": "overloaded"}}'
+            self.send_response(503)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+            return
+        base = {"id": "chatcmpl-1", "created": 0, "model": body["model"]}
+        if not body.get("stream"):
+            payload = {
+                **base,
+                "object": "chat.completion",
+                "choices": [
+                    {
+                        "index": 0,
+                        "finish_reason": "stop",
+                        "message": {"role": "assistant", "content": "".join(TOKENS)},
+                    }
+                ],
+            }
+            raw = json.dumps(payload).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for token in TOKENS:
+            chunk = {
+                **base,
+                "object": "chat.completion.chunk",
+                "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+
+
+@pytest.fixture
+def openai_server() -> Iterator[ThreadingHTTPServer]:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOpenAIHandler)
+    server.requests = []
+    server.client_ports = set()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class FakeRetriever:
+    def retrieve(self, **kwargs) -> list[RetrievalContext]:
+        return [
+            RetrievalContext(
+                chunk_id="c1",
+                chat_id="chat-1",
+                message_ids=["m1"],
+                topic="devops",
+                text="Run docker compose up to start the stack.",
+                score=0.9,
+            )
+        ]
+
+
+def _service(base_url: str) -> ChatService:
+    settings = Settings(
+        openai_api_key="test-key",
+        openai_base_url=base_url,
+        mode="llm",
+        openai_read_timeout_s=0.3,
+        openai_retry_base_s=0.01,
+    )
+    service = ChatService(settings)
+    service.retriever = FakeRetriever()
+    return service
+
+
+def _events(body: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_ask_stream_emits_citations_tokens_then_done(openai_server, monkeypatch) -> None:
+    base_url = f"http://127.0.0.1:{openai_server.server_address[1]}/v1"
+    monkeypatch.setattr(routes_chat, "get_chat_service", lambda: _service(base_url))
+
+    response = TestClient(app).post("/ask/stream", json={"question": "how to start docker?", "trace": True})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _events(response.text)
+    assert events[0][0] == "citations"
+    assert events[0][1]["citations"][0]["chat_id"] == "chat-1"
+    assert [data["text"] for name, data in events if name == "token"] == TOKENS
+    name, done = events[-1]
+    assert name == "done"
+    assert done["confidence"] == pytest.approx(0.9)
+    assert set(done["timings_ms"]) == {"retrieval", "first_token", "generation"}
+    assert "llm_call" in {item["name"] for item in done["timings"]}
+    assert openai_server.requests[0]["stream"] is True
+
+
+def test_ask_stream_falls_back_to_extractive_when_upstream_is_down(monkeypatch) -> None:
+    service = _service("http://127.0.0.1:9/v1")
+    monkeypatch.setattr(routes_chat, "get_chat_service", lambda: service)
+
+    events = _events(TestClient(app).post("/ask/stream", json={"question": "docker"}).text)
+
+    tokens = [data["text"] for name, data in events if name == "token"]
+    assert tokens == ["Run docker compose up to start the stack. [C1]"]
+    assert events[-1][0] == "done"
+    assert events[-1][1]["fallback_reason"] == "llm_error"
+
+
+def _base_url(server: ThreadingHTTPServer) -> str:
+    return f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def test_ask_reuses_one_pooled_connection(openai_server, monkeypatch) -> None:
+    service = _service(_base_url(openai_server))
+    monkeypatch.setattr(routes_chat, "get_chat_service", lambda: service)
+    client = TestClient(app)
+
+    for _ in range(3):
+        payload = client.post("/ask", json={"question": "docker"}).json()
+        assert payload["answer"] == "".join(TOKENS)
+        assert payload["fallback_reason"] is None
+        assert payload["prompt_tokens"] > 0
+
+    assert len(openai_server.requests) == 3
+    assert len(openai_server.client_ports) == 1
+
+
+def test_ask_falls_back_quickly_on_read_timeout(openai_server, monkeypatch) -> None:
+    service = _service(_base_url(openai_server))
+    monkeypatch.setattr(routes_chat, "get_chat_service", lambda: service)
+
+    started = time.perf_counter()
+    payload = TestClient(app).post("/ask", json={"question": "slow question"}).json()
+
+    assert time.perf_counter() - started < 1.0
+    assert payload["fallback_reason"] == "llm_timeout"
+    assert payload["answer"] == "Run docker compose up to start the stack. [C1]"
+    # Timeouts are not retried.
+    assert len(openai_server.requests) == 1
+
+
+def test_llm_client_retries_server_errors(openai_server) -> None:
+    service = _service(_base_url(openai_server))
+    contexts = FakeRetriever().retrieve()
+
+    answer = service.answerer.generate_answer("flaky question", contexts)
+
+    assert answer.fallback_reason is None
+    assert answer.text == "".join(TOKENS)
+    assert len(openai_server.requests) == 2
@@ -0,0 +1,103 @@
+from pathlib import Path
+
+import numpy as np
+from fastapi.testclient import TestClient
+from qdrant_client import QdrantClient
+
+from app.api import routes_chat
+from app.api.main import app
+from app.api.routes_chat import ChatService
+from app.core.config import Settings
+from app.rag.schema import AskBatchRequest, AskRequest, ChunkRecord
+
+_VECTORS = {
+    "docker": np.array([1.0, 0.0, 0.0], dtype=np.float32),
+    "qdrant": np.array([0.0, 1.0, 0.0], dtype=np.float32),
+}
+
+
+class FakeEmbedder:
+    def __init__(self) -> None:
+        self.batch_calls = 0
+
+    def embed_query(self, text: str) -> np.ndarray:
+        return next((vec for word, vec in _VECTORS.items() if word in text), np.array([0.0, 0.0, 1.0], np.float32))
+
+    def embed_queries(self, texts: list[str]) -> np.ndarray:
+        self.batch_calls += 1
+        return np.vstack([self.embed_query(text) for text in texts])
+
+
+def _service(tmp_path: Path) -> ChatService:
+    settings = Settings(processed_data_dir=tmp_path, emb_vector_size=3, hybrid_keyword=False, enable_rerank=False)
+    service = ChatService(settings)
+    service.embedder = FakeEmbedder()
+    service.retriever.embedder = service.embedder
+    service.store.client = QdrantClient(location=":memory:")
+    service.store.create_collection(reset=False)
+    chunks = [
+        ChunkRecord(
+            chunk_id="00000000-0000-0000-0000-000000000001",
+            chat_id="chat-docker",
+            message_ids=["m1"],
+            topic="docker",
+            text="Use docker compose up to start the stack.",
+        ),
+        ChunkRecord(
+            chunk_id="00000000-0000-0000-0000-000000000002",
+            chat_id="chat-qdrant",
+            message_ids=["m2"],
+            topic="qdrant",
+            text="Qdrant filters payload fields with a must clause.",
+        ),
+    ]
+    service.store.upsert_chunks(chunks, np.vstack([_VECTORS["docker"], _VECTORS["qdrant"]]))
+    return service
+
+
+def test_ask_batch_embeds_once_and_applies_per_item_filters(tmp_path: Path) -> None:
+    service = _service(tmp_path)
+    batch = AskBatchRequest(
+        items=[
+            AskRequest(question="how do I start docker?", top_k=1),
+            AskRequest(question="qdrant filter syntax", top_k=1),
+            AskRequest(question="qdrant filter syntax", top_k=2, topic="docker"),
+        ]
+    )
+
+    response = service.ask_batch(batch)
+
+    assert service.embedder.batch_calls == 1
+    assert response.succeeded == 3 and response.failed == 0
+    chats = [[c.chat_id for c in item.response.citations] for item in response.results]
+    assert chats == [["chat-docker"], ["chat-qdrant"], ["chat-docker"]]
+    assert all(item.latency_ms <= response.latency_ms for item in response.results)
+
+
+def test_ask_batch_reports_item_errors_without_failing_batch(tmp_path: Path, monkeypatch) -> None:
+    service = _service(tmp_path)
+    original = service.answerer.generate_answer
+
+    def flaky_generate(question, contexts, mode=None):
+        if "boom" in question:
+            raise RuntimeError("generation failed")
+        return original(question, contexts, mode)
+
+    def broken_search_batch(query_vectors, searches):
+        raise ConnectionError("batch search unavailable")
+
+    monkeypatch.setattr(service.answerer, "generate_answer", flaky_generate)
+    monkeypatch.setattr(service.store, "search_batch", broken_search_batch)
+    monkeypatch.setattr(routes_chat, "get_chat_service", lambda: service)
+
+    response = TestClient(app).post(
+        "/ask/batch",
+        json={"items": [{"question": "start docker", "top_k": 1}, {"question": "boom", "top_k": 1}]},
+    )
+
+    assert response.status_code == 200
+    payload = response.json()
+    assert payload["succeeded"] == 1 and payload["failed"] == 1
+    assert payload["results"][0]["response"]["citations"][0]["chat_id"] == "chat-docker"
+    assert payload["results"][1]["error"] == "generation failed"
+    assert payload["results"][1]["response"] is None
@@ -0,0 +1,113 @@
+from pathlib import Path
+
+import numpy as np
+from qdrant_client import QdrantClient
+
+from app.core.config import Settings
+from app.rag.chunking import write_chunks_jsonl
+from app.rag.pipeline import collection_gc_due, run_reindex
+from app.rag.qdrant_store import QdrantStore
+from app.rag.schema import ChunkRecord
+
+
+class FakeEmbedder:
+    def embed_texts(self, texts: list[str]) -> np.ndarray:
+        return np.tile(np.array([0.1, 0.2, 0.3], dtype=np.float32), (len(texts), 1))
+
+
+class FakeService:
+    def __init__(self, store: QdrantStore) -> None:
+        self.store = store
+        self.embedder = FakeEmbedder()
+
+
+def _store() -> QdrantStore:
+    store = QdrantStore(url="http://localhost:6333", collection_name="chat_chunks", vector_size=3)
+    store.client = QdrantClient(location=":memory:")
+    return store
+
+
+def test_blue_green_reindex_switches_alias_and_collects_old_versions(tmp_path: Path) -> None:
+    settings = Settings(processed_data_dir=tmp_path, collection_gc_grace_s=0)
+    chunks = [
+        ChunkRecord(chunk_id="00000000-0000-0000-0000-000000000001", chat_id="chat-1", message_ids=["m1"], text="a"),
+        ChunkRecord(chunk_id="00000000-0000-0000-0000-000000000002", chat_id="chat-2", message_ids=["m2"], text="b"),
+    ]
+    write_chunks_jsonl(settings.chunks_jsonl_path, chunks)
+    store = _store()
+    service = FakeService(store)
+
+    # A pre-existing concrete collection is replaced by the alias on first switch.
+    store.create_collection(reset=False)
+
+    first = run_reindex(service, settings, settings.chunks_jsonl_path, reset_collection=False, blue_green=True)
+    assert first["serving_collection"] == "chat_chunks_v1"
+    assert store.stats()["points_count"] == 2
+
+    second = run_reindex(service, settings, settings.chunks_jsonl_path, reset_collection=False, blue_green=True)
+    assert second["serving_collection"] == "chat_chunks_v2"
+    assert second["previous_collection"] == "chat_chunks_v1"
+    assert store.versioned_collections() == ["chat_chunks_v2"]
+
+    hits = store.search(np.array([0.1, 0.2, 0.3], dtype=np.float32), top_k=5)
+    assert {hit.chat_id for hit in hits} == {"chat-1", "chat-2"}
+
+
+def test_collection_gc_job_drops_versions_past_their_grace_period(tmp_path: Path, monkeypatch) -> None:
+    from fastapi.testclient import TestClient
+
+    from app.api import routes_admin
+    from app.api.main import app
+    from app.rag.jobs import JobManager
+
+    settings = Settings(processed_data_dir=tmp_path, collection_gc_grace_s=3600)
+    chunks = [ChunkRecord(chunk_id="00000000-0000-0000-0000-000000000001", chat_id="c", message_ids=["m"], text="a")]
+    write_chunks_jsonl(settings.chunks_jsonl_path, chunks)
+    service = FakeService(_store())
+    run_reindex(service, settings, settings.chunks_jsonl_path, reset_collection=False, blue_green=True)
+    run_reindex(service, settings, settings.chunks_jsonl_path, reset_collection=False, blue_green=True)
+    assert service.store.versioned_collections() == ["chat_chunks_v1", "chat_chunks_v2"]
+    # The periodic timer only queues a job once something is past its grace period.
+    assert not collection_gc_due(settings)
+    assert collection_gc_due(settings.model_copy(update={"collection_gc_grace_s": 0}))
+    assert not collection_gc_due(Settings(processed_data_dir=tmp_path / "empty"))
+
+    manager = JobManager(max_workers=1)
+    monkeypatch.setattr(routes_admin, "_service", lambda: service)
+    monkeypatch.setattr(routes_admin, "_settings", lambda: settings.model_copy(update={"collection_gc_grace_s": 0}))
+    monkeypatch.setattr(routes_admin, "_jobs", lambda: manager)
+
+    response = TestClient(app).post("/admin/jobs/collection-gc")
+    assert response.status_code == 202
+    manager._executor.shutdown(wait=True)
+
+    job = manager.get(response.json()["job_id"])
+    assert job.status == "succeeded"
+    assert job.result == {"dropped": ["chat_chunks_v1"]}
+    assert service.store.versioned_collections() == ["chat_chunks_v2"]
+
+
+def test_search_on_a_missing_collection_returns_no_hits() -> None:
+    store = _store()
+    vector = np.array([0.1, 0.2, 0.3], dtype=np.float32)
+
+    assert store.search(vector, top_k=3) == []
+    assert store.search_batch(np.array([vector]), [{"top_k": 3}]) == [[]]
+
+
+def test_in_place_reindex_creates_the_collection_once_not_per_batch(tmp_path: Path, monkeypatch) -> None:
+    settings = Settings(processed_data_dir=tmp_path, index_batch_size=1)
+    chunks = [
+        ChunkRecord(chunk_id=f"00000000-0000-0000-0000-00000000000{idx}", chat_id="c", message_ids=["m"], text="a")
+        for idx in range(1, 5)
+    ]
+    write_chunks_jsonl(settings.chunks_jsonl_path, chunks)
+    store = _store()
+    calls: list[bool] = []
+    create_collection = store.create_collection
+    monkeypatch.setattr(store, "create_collection", lambda reset=False: calls.append(reset) or create_collection(reset))
+
+    run_reindex(FakeService(store), settings, settings.chunks_jsonl_path, reset_collection=True)
+
+    assert calls == [True]
+    assert store.stats()["points_count"] == 4
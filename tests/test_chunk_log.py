@@ -0,0 +1,138 @@
+import os
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from app.api import routes_admin, routes_chat
+from app.api.main import app
+from app.bench.load_test import build_service
+from app.core.config import Settings
+from app.rag.chunk_log import append_tombstone, deleted_chats, tombstone_path
+from app.rag.chunk_store import LazyChunks, open_chunk_store, write_chunk_store
+from app.rag.chunking import load_chunks_jsonl, write_chunks_jsonl
+from app.rag.ingest.export_reader import _write_jsonl, load_message_records
+from app.rag.jobs import JobManager
+from app.rag.manifest import read_manifest
+from app.rag.pipeline import compact_chunk_log
+from app.rag.records import MessageRecord
+from app.rag.schema import ChunkRecord
+
+
+def _chunks() -> list[ChunkRecord]:
+    return [
+        ChunkRecord(
+            chunk_id=f"00000000-0000-0000-0000-{idx:012d}",
+            chat_id=f"chat-{idx % 4}",
+            chat_title=f"title {idx % 4}",
+            message_ids=[f"m{idx}"],
+            start_at=f"2024-01-{idx + 1:02d}T10:00:00Z",
+            topic="python",
+            text=f"shared keyword text {idx}",
+        )
+        for idx in range(20)
+    ]
+
+
+def _write(path: Path, chunks: list[ChunkRecord]) -> None:
+    write_chunks_jsonl(path, chunks)
+    write_chunk_store(path, chunks)
+
+
+def test_tombstones_hide_chats_until_the_chunk_file_is_replaced(tmp_path: Path) -> None:
+    chunks = _chunks()
+    path = tmp_path / "chunks.jsonl"
+    _write(path, chunks)
+    assert append_tombstone(path, "chat-1")
+    assert not append_tombstone(tmp_path / "missing.jsonl", "chat-1")
+
+    live = [chunk for chunk in chunks if chunk.chat_id != "chat-1"]
+    loaded = load_chunks_jsonl(path)
+    assert isinstance(loaded, LazyChunks) and len(loaded.store) == 20
+    assert loaded == live and loaded[-1] == live[-1] and loaded[1:3] == live[1:3]
+    assert load_chunks_jsonl(path, validate=True) == live
+
+    # A torn trailing line from a crashed append is skipped.
+    with tombstone_path(path).open("ab") as f:
+        f.write(b'{"chat_id": "chat-')
+    assert deleted_chats(path) == {"chat-1"}
+
+    write_chunks_jsonl(tmp_path / "next.jsonl", chunks[:4])
+    os.replace(tmp_path / "next.jsonl", path)
+    assert deleted_chats(path) == frozenset()
+    assert load_chunks_jsonl(path) == chunks[:4]
+
+
+def test_compaction_rewrites_the_base_once_garbage_passes_the_threshold(tmp_path: Path) -> None:
+    settings = Settings(processed_data_dir=tmp_path)
+    path = settings.chunks_jsonl_path
+    chunks = _chunks()
+    _write(path, chunks)
+    _write_jsonl(settings.messages_jsonl_path, [])
+    append_tombstone(path, "chat-1")
+
+    assert compact_chunk_log(settings, min_garbage_ratio=0.5) == {"compacted": False, "garbage_chunks": 5, "chunks": 20}
+    assert tombstone_path(path).exists()
+
+    result = compact_chunk_log(settings, min_garbage_ratio=0.2)
+    assert result["compacted"] and result["chunks"] == 15
+    assert not tombstone_path(path).exists()
+    loaded = load_chunks_jsonl(path)
+    assert isinstance(loaded, LazyChunks) and loaded.rows is None
+    assert loaded == [chunk for chunk in chunks if chunk.chat_id != "chat-1"]
+    assert open_chunk_store(path).chats == ["chat-0", "chat-2", "chat-3"]
+
+    # Tombstones that hide nothing are dropped without rewriting the file.
+    stamp = path.stat().st_mtime_ns
+    append_tombstone(path, "chat-9")
+    assert compact_chunk_log(settings)["compacted"] is False
+    assert not tombstone_path(path).exists() and path.stat().st_mtime_ns == stamp
+
+
+def test_deletes_hide_chats_from_keyword_search_and_stats_then_compact(tmp_path: Path, monkeypatch) -> None:
+    settings = Settings(processed_data_dir=tmp_path, emb_vector_size=8, chunk_compaction_garbage_ratio=0.5)
+    service = build_service(settings, stub_embedder=True, qdrant=":memory:")
+    service.store.create_collection(reset=True)
+    chunks = _chunks()
+    _write(settings.chunks_jsonl_path, chunks)
+    messages = [
+        MessageRecord(chunk.chat_id, chunk.chat_title, chunk.message_ids[0], None, "user", chunk.start_at, chunk.text)
+        for chunk in chunks
+    ]
+    _write_jsonl(settings.messages_jsonl_path, messages)
+    manager = JobManager(max_workers=1)
+    monkeypatch.setattr(routes_admin, "_service", lambda: service)
+    monkeypatch.setattr(routes_admin, "_settings", lambda: settings)
+    monkeypatch.setattr(routes_admin, "_jobs", lambda: manager)
+    monkeypatch.setattr(routes_chat, "get_chat_service", lambda: service)
+    client = TestClient(app)
+
+    def keyword_chats() -> set[str]:
+        contexts = service.retriever._keyword_search("shared keyword", 50, None, None, None, None)
+        return {context.chat_id for context in contexts}
+
+    assert keyword_chats() == {"chat-0", "chat-1", "chat-2", "chat-3"}
+    assert client.get("/messages/m1").status_code == 200
+    assert client.get("/chats/chat-1/messages").status_code == 200
+    first = client.delete("/admin/chats/chat-1").json()
+    assert first["compaction_job_id"] is None
+    assert keyword_chats() == {"chat-0", "chat-2", "chat-3"}
+    assert client.get("/messages/m1").status_code == 404
+    assert client.get("/chats/chat-1/messages").status_code == 404
+    manifest = read_manifest(settings.manifest_path, settings.messages_jsonl_path, settings.chunks_jsonl_path)
+    assert "chat-1" not in manifest["chats"] and manifest["chunks_count"] == 15
+    assert manifest["garbage_chunks"] == 5
+
+    second = client.delete("/admin/chats/chat-2").json()
+    assert second["compaction_job_id"] is not None
+    manager._executor.shutdown(wait=True)
+    assert manager.get(second["compaction_job_id"]).result["compacted"]
+
+    assert len(load_chunks_jsonl(settings.chunks_jsonl_path)) == 10
+    assert not tombstone_path(settings.chunks_jsonl_path).exists()
+    assert keyword_chats() == {"chat-0", "chat-3"}
+    assert client.get("/admin/stats").json()["chunks_count"] == 10
+    # Compaction retired the tombstones, so the messages had to go with the chunks.
+    assert {message.chat_id for message in load_message_records(settings.messages_jsonl_path)} == {"chat-0", "chat-3"}
+    assert client.get("/messages/m1").status_code == 404
+    assert client.get("/chats/chat-2/messages").status_code == 404
+    assert client.get("/chats/chat-3/messages").json()["total"] == 5
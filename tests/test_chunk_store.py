@@ -0,0 +1,85 @@
+import os
+from pathlib import Path
+
+from app.rag.chunk_store import ChunkStore, LazyChunks, open_chunk_store, parse_timestamp, store_dir, write_chunk_store
+from app.rag.chunking import load_chunks_jsonl, write_chunks_jsonl
+from app.rag.schema import ChunkRecord
+
+
+def _chunks() -> list[ChunkRecord]:
+    return [
+        ChunkRecord(
+            chunk_id=f"c{idx:02d}",
+            chat_id=f"chat-{idx % 4}",
+            chat_title=f"title {idx % 4}",
+            message_ids=[f"m{idx}", f"m{idx + 1}"],
+            start_at=f"2024-01-{idx + 1:02d}T10:00:00Z" if idx % 5 else None,
+            end_at=f"2024-01-{idx + 1:02d}T11:00:00Z",
+            topic=["docker", "python", "sql"][idx % 3],
+            text=f"naïve text {idx} ✓",
+            metadata={"message_count": 2, "has_code": idx % 2 == 0},
+        )
+        for idx in reversed(range(20))
+    ]
+
+
+def _write(tmp_path: Path, chunks: list[ChunkRecord]) -> Path:
+    path = tmp_path / "chunks.jsonl"
+    write_chunks_jsonl(path, chunks)
+    write_chunk_store(path, chunks)
+    return path
+
+
+def test_store_materializes_lazily_and_fetches_by_id(tmp_path: Path) -> None:
+    chunks = _chunks()
+    path = _write(tmp_path, chunks)
+
+    loaded = load_chunks_jsonl(path)
+    assert isinstance(loaded, LazyChunks)
+    assert loaded == chunks
+    assert loaded[-1] == chunks[-1] and loaded[2:5] == chunks[2:5]
+    assert loaded[3].model_dump_json() == chunks[3].model_dump_json()
+
+    store = loaded.store
+    assert store.get("c07") == next(chunk for chunk in chunks if chunk.chunk_id == "c07")
+    assert store.get("missing") is None
+    assert load_chunks_jsonl(path, validate=True) == chunks
+
+
+def test_column_filters_match_a_row_by_row_scan(tmp_path: Path) -> None:
+    chunks = _chunks()
+    mapped = open_chunk_store(_write(tmp_path, chunks))
+    from_ts = parse_timestamp("2024-01-05T00:00:00Z")
+    to_ts = parse_timestamp("2024-01-15T00:00:00Z")
+
+    def expected(topic: str | None, chat_ids: list[str] | None) -> list[int]:
+        rows = []
+        for row, chunk in enumerate(chunks):
+            ts = parse_timestamp(chunk.start_at)
+            if topic and chunk.topic != topic or chat_ids and chunk.chat_id not in chat_ids:
+                continue
+            if ts is not None and not from_ts <= ts <= to_ts:
+                continue
+            rows.append(row)
+        return rows
+
+    for store in (mapped, ChunkStore.from_chunks(chunks)):
+        for topic, chat_ids in [(None, None), ("sql", None), (None, ["chat-1", "nope"]), ("docker", ["chat-2"])]:
+            rows = store.filter_rows(topic=topic, chat_ids=chat_ids, from_ts=from_ts, to_ts=to_ts)
+            assert rows.tolist() == expected(topic, chat_ids)
+        assert store.filter_rows(topic="unknown-topic").size == 0
+
+
+def test_store_is_ignored_once_the_jsonl_changes(tmp_path: Path) -> None:
+    chunks = _chunks()
+    path = _write(tmp_path, chunks)
+    write_chunks_jsonl(path, chunks[:3])
+    os.utime(path, ns=(1, 1))
+
+    assert open_chunk_store(path) is None
+    assert load_chunks_jsonl(path) == chunks[:3]
+    assert store_dir(path).exists()
+
+    write_chunk_store(path, chunks[:3])
+    assert isinstance(load_chunks_jsonl(path), LazyChunks)
+    assert not any(p.name.startswith(".chunks.store") for p in tmp_path.iterdir())
@@ -0,0 +1,66 @@
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import routes_chat
+from app.api.main import app
+from app.core.concurrency import ModelBusyError, ModelGovernor
+
+
+def test_governor_rejects_when_queue_is_full() -> None:
+    governor = ModelGovernor(max_concurrency=1, queue_size=0, admission_timeout_s=5.0, retry_after_s=3)
+
+    with governor.slot():
+        with pytest.raises(ModelBusyError) as excinfo:
+            with governor.slot():
+                pass
+    assert excinfo.value.retry_after_s == 3
+    assert governor.stats()["rejected"] == 1
+
+    with governor.slot():
+        assert governor.stats()["in_flight"] == 1
+
+
+def test_governor_times_out_waiting_callers_but_not_bulk_ones() -> None:
+    governor = ModelGovernor(max_concurrency=1, queue_size=4, admission_timeout_s=0.05)
+    release = threading.Event()
+    bulk_done = threading.Event()
+
+    def hold() -> None:
+        with governor.slot():
+            release.wait(2)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    while governor.stats()["in_flight"] == 0:
+        threading.Event().wait(0.001)
+
+    with pytest.raises(ModelBusyError):
+        with governor.slot():
+            pass
+
+    def bulk() -> None:
+        with governor.slot(bounded=False):
+            bulk_done.set()
+
+    waiter = threading.Thread(target=bulk)
+    waiter.start()
+    release.set()
+    holder.join()
+    waiter.join()
+    assert bulk_done.is_set()
+
+
+class BusyChatService:
+    def ask(self, request):
+        raise ModelBusyError("Model queue is full", retry_after_s=2)
+
+
+def test_ask_returns_503_with_retry_after_when_busy(monkeypatch) -> None:
+    monkeypatch.setattr(routes_chat, "get_chat_service", lambda: BusyChatService())
+    client = TestClient(app)
+
+    response = client.post("/ask", json={"question": "hello"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "2"
@@ -0,0 +1,85 @@
+from app.rag.chunking import approx_token_count, build_chunks
+from app.rag.context_packing import pack_contexts, split_messages
+from app.rag.schema import NormalizedMessage, RetrievalContext
+
+
+def _messages(chat_id: str, count: int) -> list[NormalizedMessage]:
+    return [
+        NormalizedMessage(
+            chat_id=chat_id,
+            chat_title=f"{chat_id} title",
+            message_id=f"{chat_id}-m{idx}",
+            role="user" if idx % 2 == 0 else "assistant",
+            created_at=f"2024-01-01T00:{idx:02d}:00Z",
+            text=f"message {idx} about docker networking " + "detail " * 30,
+            source="chatgpt_export_json",
+        )
+        for idx in range(count)
+    ]
+
+
+def _contexts(chat_id: str, count: int, max_tokens: int, base_score: float) -> list[RetrievalContext]:
+    chunks = build_chunks(_messages(chat_id, count), max_tokens=max_tokens, overlap_messages=2)
+    return [
+        RetrievalContext(
+            chunk_id=chunk.chunk_id,
+            chat_id=chunk.chat_id,
+            chat_title=chunk.chat_title,
+            message_ids=chunk.message_ids,
+            topic=chunk.topic,
+            text=chunk.text,
+            score=base_score - idx * 0.01,
+            created_at=chunk.start_at,
+        )
+        for idx, chunk in enumerate(chunks)
+    ]
+
+
+def test_split_messages_recovers_chunk_messages() -> None:
+    ctx = _contexts("chat-a", 3, max_tokens=10_000, base_score=0.9)[0]
+    segments = split_messages(ctx)
+    assert [seg.key for seg in segments] == ctx.message_ids
+    assert segments[0].text.startswith("[user | 2024-01-01T00:00:00Z | chat-a-m0]")
+
+
+def test_pack_contexts_deduplicates_overlapping_messages() -> None:
+    contexts = _contexts("chat-a", 8, max_tokens=300, base_score=0.9)
+    assert len(contexts) > 2
+
+    packed = pack_contexts(contexts, token_budget=100_000)
+
+    assert len(packed.blocks) == 1
+    block_text = packed.blocks[0].render()
+    for idx in range(8):
+        assert block_text.count(f"| chat-a-m{idx}]") == 1
+    # Chronological order is restored after merging.
+    positions = [block_text.index(f"| chat-a-m{idx}]") for idx in range(8)]
+    assert positions == sorted(positions)
+    assert packed.duplicate_messages > 0
+    assert packed.packed_tokens < packed.naive_tokens
+    assert packed.tokens_saved == packed.naive_tokens - packed.packed_tokens
+    assert packed.blocks[0].labels == [f"C{idx}" for idx in range(1, len(contexts) + 1)]
+
+
+def test_pack_contexts_fills_budget_in_score_order() -> None:
+    weak = _contexts("chat-weak", 2, max_tokens=10_000, base_score=0.4)
+    strong = _contexts("chat-strong", 2, max_tokens=10_000, base_score=0.9)
+    # Room for the strong chunk's messages plus its block header and separators, not for a weak message.
+    budget = sum(seg.tokens for seg in split_messages(strong[0])) + 40
+
+    packed = pack_contexts(weak + strong, token_budget=budget)
+
+    assert [block.chat_id for block in packed.blocks] == ["chat-strong"]
+    assert packed.blocks[0].labels == ["C2"]
+    assert packed.dropped_messages == 2
+    assert approx_token_count(packed.text) == packed.packed_tokens
+
+
+def test_packed_context_never_exceeds_the_budget() -> None:
+    contexts = _contexts("chat-a", 12, max_tokens=300, base_score=0.9) + _contexts(
+        "chat-b", 6, max_tokens=200, base_score=0.85
+    )
+
+    for budget in range(0, 1500, 37):
+        packed = pack_contexts(contexts, token_budget=budget)
+        assert packed.packed_tokens <= budget
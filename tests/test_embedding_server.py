@@ -0,0 +1,86 @@
+import threading
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.rag.embedding_server import EmbeddingClient, EmbeddingServer
+from app.rag.embeddings import LocalEmbedder
+
+
+class CountingEncoder:
+    def __init__(self) -> None:
+        self.calls: list[int] = []
+
+    def __call__(self, texts: list[str]) -> np.ndarray:
+        self.calls.append(len(texts))
+        return np.array([[len(text), 0.5] for text in texts], dtype=np.float32)
+
+
+def _serve(tmp_path: Path, encoder: CountingEncoder, max_wait_ms: float) -> EmbeddingServer:
+    server = EmbeddingServer(tmp_path / "emb.sock", encoder, max_batch=64, max_wait_ms=max_wait_ms)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def test_client_round_trip_and_local_embedder_client_mode(tmp_path: Path) -> None:
+    encoder = CountingEncoder()
+    server = _serve(tmp_path, encoder, max_wait_ms=1)
+    try:
+        vectors = EmbeddingClient(tmp_path / "emb.sock").embed(["a", "héllo", ""])
+        assert vectors.dtype == np.float32
+        assert vectors.tolist() == [[1.0, 0.5], [5.0, 0.5], [0.0, 0.5]]
+
+        embedder = LocalEmbedder("unused", server_socket=tmp_path / "emb.sock")
+        assert embedder.embed_query("four").tolist() == [4.0, 0.5]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_concurrent_clients_are_micro_batched(tmp_path: Path) -> None:
+    encoder = CountingEncoder()
+    server = _serve(tmp_path, encoder, max_wait_ms=250)
+    client = EmbeddingClient(tmp_path / "emb.sock")
+    results: dict[int, list[float]] = {}
+    start = threading.Barrier(8, timeout=10)
+
+    def ask(idx: int) -> None:
+        client._connection()
+        start.wait()
+        results[idx] = client.embed(["x" * idx])[0].tolist()
+
+    try:
+        threads = [threading.Thread(target=ask, args=(idx,)) for idx in range(1, 9)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=10)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert results == {idx: [float(idx), 0.5] for idx in range(1, 9)}
+    assert sum(encoder.calls) == 8
+    assert len(encoder.calls) < 8
+
+
+def test_client_timeout_is_not_retried(tmp_path: Path) -> None:
+    release = threading.Event()
+
+    class SlowEncoder(CountingEncoder):
+        def __call__(self, texts: list[str]) -> np.ndarray:
+            release.wait(5)
+            return super().__call__(texts)
+
+    encoder = SlowEncoder()
+    server = _serve(tmp_path, encoder, max_wait_ms=1)
+    try:
+        with pytest.raises(TimeoutError):
+            EmbeddingClient(tmp_path / "emb.sock", timeout_s=0.2).embed(["slow"])
+        release.set()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert encoder.calls == [1]
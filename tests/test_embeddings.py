@@ -0,0 +1,111 @@
+import numpy as np
+
+from app.rag.embeddings import EmbeddingPool, LocalEmbedder, default_pool_size
+
+
+class LengthModel:
+    def encode(self, texts, **kwargs):
+        return np.array([[len(text), 1.0] for text in texts], dtype=np.float64)
+
+
+def load_length_model(model_name: str) -> LengthModel:
+    return LengthModel()
+
+
+def test_default_pool_size_scales_with_cpus() -> None:
+    assert default_pool_size(1) == (1, 1)
+    assert default_pool_size(8) == (4, 2)
+    assert default_pool_size(64) == (8, 2)
+
+
+def test_pool_reassembles_shards_in_input_order() -> None:
+    texts = ["x" * n for n in range(1, 101)]
+    with EmbeddingPool("fake", workers=2, threads_per_worker=1, batch_size=8, model_loader=load_length_model) as pool:
+        vectors = pool.embed_texts(texts)
+
+    assert vectors.dtype == np.float32
+    assert vectors.shape == (100, 2)
+    assert vectors[:, 0].tolist() == [float(n) for n in range(1, 101)]
+
+
+class RecordingModel(LengthModel):
+    def __init__(self) -> None:
+        self.batches: list[list[int]] = []
+
+    def encode(self, texts, **kwargs):
+        self.batches.append([len(text) for text in texts])
+        return super().encode(texts, **kwargs)
+
+
+def test_embed_texts_buckets_by_length_and_keeps_input_order() -> None:
+    embedder = LocalEmbedder("fake", batch_size=4)
+    model = RecordingModel()
+    embedder._model = model
+    texts = ["x" * n for n in (50, 1, 40, 2, 30, 3, 20, 4)]
+
+    vectors = embedder.embed_texts(texts)
+
+    assert model.batches == [[1, 2, 3, 4], [20, 30, 40, 50]]
+    assert vectors.dtype == np.float32
+    assert vectors[:, 0].tolist() == [50.0, 1.0, 40.0, 2.0, 30.0, 3.0, 20.0, 4.0]
+
+
+def test_onnx_pool_workers_do_not_touch_torch(monkeypatch) -> None:
+    from app.rag import embeddings
+
+    # _init_worker writes these; register them so monkeypatch restores them afterwards.
+    monkeypatch.setenv("OMP_NUM_THREADS", "1")
+    monkeypatch.setenv("MKL_NUM_THREADS", "1")
+    pinned: list[int] = []
+    monkeypatch.setattr(embeddings, "set_intra_op_threads", pinned.append)
+
+    embeddings._init_worker(load_length_model, "fake", 2, 8, True, backend="onnx")
+    assert pinned == []
+    embeddings._init_worker(load_length_model, "fake", 2, 8, True, backend="torch")
+    assert pinned == [2]
+
+
+def test_concurrent_first_calls_load_the_model_once() -> None:
+    import threading
+    import time
+
+    loads: list[str] = []
+
+    def slow_loader(model_name: str) -> LengthModel:
+        loads.append(model_name)
+        time.sleep(0.05)
+        return LengthModel()
+
+    embedder = LocalEmbedder("fake")
+    embedder._model_loader = lambda threads: slow_loader
+    threads = [threading.Thread(target=embedder.embed_query, args=("hello",)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert loads == ["fake"]
+
+
+def test_embed_queries_takes_one_slot_and_one_encode_call() -> None:
+    from contextlib import contextmanager
+
+    class CountingGovernor:
+        def __init__(self) -> None:
+            self.slots = 0
+
+        @contextmanager
+        def slot(self, bounded: bool):
+            self.slots += 1
+            yield
+
+    governor = CountingGovernor()
+    embedder = LocalEmbedder("unused", batch_size=4, governor=governor)
+    model = embedder._model = RecordingModel()
+
+    vectors = embedder.embed_queries(["x" * n for n in range(1, 11)])
+
+    assert vectors.shape == (10, 2)
+    assert vectors[:, 0].tolist() == [float(n) for n in range(1, 11)]
+    assert governor.slots == 1
+    assert len(model.batches) == 1
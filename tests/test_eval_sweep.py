@@ -0,0 +1,99 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+from qdrant_client import QdrantClient
+
+from app.core.config import Settings
+from app.eval.run_eval import RetrievalCache, parse_grid, run_sweep
+from app.rag.chunking import write_chunks_jsonl
+from app.rag.pipeline import run_reindex
+from app.rag.qdrant_store import QdrantStore
+from app.rag.schema import ChunkRecord
+
+
+class CountingEmbedder:
+    def __init__(self) -> None:
+        self.query_calls = 0
+
+    def embed_texts(self, texts: list[str]) -> np.ndarray:
+        return np.tile(np.array([0.1, 0.2, 0.3], dtype=np.float32), (len(texts), 1))
+
+    def embed_queries(self, texts: list[str]) -> np.ndarray:
+        self.query_calls += 1
+        return self.embed_texts(texts)
+
+
+class CountingStore(QdrantStore):
+    search_batch_calls = 0
+
+    def search_batch(self, query_vectors, searches):
+        self.search_batch_calls += 1
+        return super().search_batch(query_vectors, searches)
+
+
+class FakeService:
+    def __init__(self, store: QdrantStore) -> None:
+        self.store = store
+        self.embedder = CountingEmbedder()
+
+
+def _service(settings: Settings) -> FakeService:
+    chunks = [
+        ChunkRecord(
+            chunk_id=f"00000000-0000-0000-0000-00000000000{idx}",
+            chat_id=f"chat-{idx}",
+            message_ids=[f"m{idx}"],
+            text=text,
+        )
+        for idx, text in enumerate(["uvicorn runs fastapi apps", "qdrant stores vectors", "sql index tips"], start=1)
+    ]
+    write_chunks_jsonl(settings.chunks_jsonl_path, chunks)
+    store = CountingStore(url="http://localhost:6333", collection_name="chat_chunks", vector_size=3)
+    store.client = QdrantClient(location=":memory:")
+    service = FakeService(store)
+    run_reindex(service, settings, settings.chunks_jsonl_path, reset_collection=True)
+    return service
+
+
+DATASET = [
+    {"question": "How do I run FastAPI with Uvicorn?", "expected_chat_id": "chat-1", "expected_keywords": ["uvicorn"]},
+    {"question": "What did we use for vector storage?", "expected_chat_id": "chat-2", "expected_keywords": ["qdrant"]},
+]
+
+
+def test_parse_grid_builds_the_cross_product() -> None:
+    grid = parse_grid(["top_k=1,2", "hybrid_keyword=true,false"])
+    assert grid[0] == {"top_k": "1", "hybrid_keyword": "true"}
+    assert len(grid) == 4
+    with pytest.raises(ValueError):
+        parse_grid(["qdrant_url=x"])
+
+
+def test_sweep_embeds_once_and_reuses_retrieval_for_answer_settings(tmp_path: Path) -> None:
+    settings = Settings(processed_data_dir=tmp_path)
+    service = _service(settings)
+    cache = RetrievalCache(tmp_path / "cache.json", generation=1)
+
+    grid = parse_grid(["top_k=1,3", "hybrid_keyword=true,false", "confidence_threshold=0.0,2.0"])
+    rows = run_sweep(service, settings, DATASET, grid, default_top_k=5, workers=4, cache=cache)
+
+    assert [row["config"] for row in rows] == grid
+    assert service.embedder.query_calls == 1
+    assert service.store.search_batch_calls == 2  # once per distinct top_k
+    by_config = {tuple(row["config"].values()): row for row in rows}
+    assert by_config[("3", "true", "0.0")]["hit_at_k"] == 1.0
+    assert by_config[("3", "true", "0.0")]["abstain_rate"] == 0.0
+    assert by_config[("3", "true", "2.0")]["abstain_rate"] == 1.0
+    assert all(row["p50_ms"] <= row["p95_ms"] for row in rows)
+
+    # A later run that only changes answer-stage settings is served from the persisted cache.
+    reloaded = RetrievalCache(tmp_path / "cache.json", generation=1)
+    rows = run_sweep(service, settings, DATASET, parse_grid(["top_k=3", "confidence_threshold=0.5"]), 5, cache=reloaded)
+    assert len(rows) == 1
+    assert service.embedder.query_calls == 1
+    assert service.store.search_batch_calls == 2
+
+    # A new index generation invalidates it.
+    stale = RetrievalCache(tmp_path / "cache.json", generation=2)
+    assert not stale.has((3, False, False), DATASET[0]["question"])
@@ -0,0 +1,44 @@
+import json
+from pathlib import Path
+
+from app.bench.ingest_bench import compare, run_benchmark
+from app.bench.synthetic_export import ExportSpec, write_export
+from app.rag.ingest.export_reader import _read_file
+
+
+def test_synthetic_export_is_seeded_and_parses_completely(tmp_path: Path) -> None:
+    spec = ExportSpec(messages=1500, seed=3, html_ratio=0.2, pii_ratio=0.3)
+    first = write_export(tmp_path / "a.zip", spec)
+    second = write_export(tmp_path / "b.zip", spec)
+    plain = write_export(tmp_path / "c.json", spec)
+
+    assert (tmp_path / "a.zip").read_bytes() == (tmp_path / "b.zip").read_bytes()
+    assert first["json_messages"] + first["html_messages"] == 1500
+    assert first["html_messages"] > 0
+    assert plain["html_messages"] == 0
+
+    messages = _read_file(tmp_path / "a.zip")
+    assert len(messages) == 1500
+    assert {m.source for m in messages} == {"chatgpt_export_json", "chatgpt_export_html"}
+    # Regenerated answers share a parent with the answer they replace.
+    parents = [m.parent_message_id for m in messages if m.role == "assistant" and m.parent_message_id]
+    assert len(parents) > len(set(parents))
+    assert len(json.loads((tmp_path / "c.json").read_text(encoding="utf-8"))) == plain["chats"]
+
+
+def test_benchmark_reports_every_stage_and_flags_regressions(tmp_path: Path) -> None:
+    write_export(tmp_path / "export.zip", ExportSpec(messages=1000, pii_ratio=0.5))
+
+    report = run_benchmark(tmp_path / "export.zip", max_chunk_tokens=200, overlap_messages=1)
+
+    assert list(report["stages"]) == ["parse", "redact", "topics", "chunk"]
+    assert report["stages"]["parse"]["items"] == 1000
+    assert sum(report["stages"]["redact"]["redactions"].values()) > 0
+    assert all(stage["peak_mb"] >= 0 and stage["wall_s"] > 0 for stage in report["stages"].values())
+
+    slower = json.loads(json.dumps(report))
+    slower["stages"]["chunk"]["per_s"] = report["stages"]["chunk"]["per_s"] / 2
+    slower["stages"]["parse"]["peak_mb"] = report["stages"]["parse"]["peak_mb"] * 3 + 1
+    assert compare(report, report, threshold=0.2) == []
+    regressions = compare(slower, report, threshold=0.2)
+    assert [line.split(":")[0] for line in regressions] == ["parse", "chunk"]
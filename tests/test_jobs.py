@@ -0,0 +1,60 @@
+import threading
+
+import pytest
+
+from app.rag.jobs import JobConflictError, JobManager
+
+
+def _wait(manager: JobManager, job_id: str) -> None:
+    for _ in range(200):
+        if manager.get(job_id).done:
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError("job did not finish")
+
+
+def test_job_reports_progress_and_result() -> None:
+    manager = JobManager(max_workers=1)
+
+    def work(progress):
+        progress.stage("index", total=3)
+        progress.advance(3)
+        return {"indexed_chunks": 3}
+
+    job = manager.submit("reindex", work)
+    _wait(manager, job.job_id)
+
+    status = manager.get(job.job_id).to_dict()
+    assert status["status"] == "succeeded"
+    assert status["stage"] == "index"
+    assert status["processed"] == 3
+    assert status["result"] == {"indexed_chunks": 3}
+
+
+def test_single_mutating_job_and_cooperative_cancel() -> None:
+    manager = JobManager(max_workers=2)
+    started = threading.Event()
+
+    def work(progress):
+        progress.stage("index", total=1000)
+        started.set()
+        while True:
+            progress.advance(1)
+            threading.Event().wait(0.001)
+
+    job = manager.submit("ingest", work)
+    assert started.wait(2)
+
+    with pytest.raises(JobConflictError):
+        manager.submit("reindex", lambda progress: {})
+    with pytest.raises(JobConflictError):
+        with manager.exclusive("reset"):
+            pass
+
+    manager.cancel(job.job_id)
+    _wait(manager, job.job_id)
+    assert manager.get(job.job_id).status == "cancelled"
+
+    follow_up = manager.submit("reindex", lambda progress: {})
+    _wait(manager, follow_up.job_id)
+    assert manager.get(follow_up.job_id).status == "succeeded"
@@ -0,0 +1,58 @@
+from pathlib import Path
+
+import pytest
+from pydantic import ValidationError
+
+from app.rag import jsonl
+from app.rag.chunking import load_chunks_jsonl, write_chunks_jsonl
+from app.rag.ingest.export_reader import load_messages_jsonl
+from app.rag.schema import ChunkRecord
+
+
+def _chunks(count: int) -> list[ChunkRecord]:
+    return [
+        ChunkRecord(
+            chunk_id=f"c{idx}",
+            chat_id=f"chat-{idx % 3}",
+            message_ids=[f"m{idx}"],
+            text=f"naïve text {idx} ✓",
+            metadata={"roles": {"user": 1}},
+        )
+        for idx in range(count)
+    ]
+
+
+def test_round_trip_across_read_blocks_builds_equal_records(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(jsonl, "_READ_BLOCK_BYTES", 64)
+    chunks = _chunks(50)
+    path = tmp_path / "chunks.jsonl"
+    write_chunks_jsonl(path, chunks)
+
+    assert path.read_bytes().startswith(b'{"__schema__":"chunks","version":1}\n')
+    loaded = load_chunks_jsonl(path)
+    assert loaded == chunks
+    assert load_chunks_jsonl(path, validate=True) == chunks
+    assert loaded[0].model_dump_json() == chunks[0].model_dump_json()
+
+
+def test_files_without_a_current_header_are_validated(tmp_path: Path) -> None:
+    legacy = tmp_path / "legacy.jsonl"
+    legacy.write_text("\n".join(chunk.model_dump_json() for chunk in _chunks(3)) + "\n", encoding="utf-8")
+    assert load_chunks_jsonl(legacy) == _chunks(3)
+
+    broken = tmp_path / "broken.jsonl"
+    broken.write_text('{"chunk_id": "c1", "chat_id": "x"}\n', encoding="utf-8")
+    with pytest.raises(ValidationError):
+        load_chunks_jsonl(broken)
+
+    old_version = tmp_path / "old.jsonl"
+    old_version.write_text('{"__schema__": "chunks", "version": 0}\n{"chunk_id": "c1", "chat_id": "x"}\n', "utf-8")
+    with pytest.raises(ValidationError):
+        load_chunks_jsonl(old_version)
+
+
+def test_header_kind_mismatch_is_rejected(tmp_path: Path) -> None:
+    path = tmp_path / "chunks.jsonl"
+    write_chunks_jsonl(path, _chunks(1))
+    with pytest.raises(ValueError, match="holds chunks records, not messages"):
+        load_messages_jsonl(path)
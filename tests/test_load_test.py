@@ -0,0 +1,33 @@
+from pathlib import Path
+
+from app.bench.load_test import build_service, in_process_sender, question_mix, run_load_test, seed_index
+from app.core.config import Settings
+from app.eval.metrics import percentile
+from app.rag.chunking import load_chunks_jsonl
+
+
+def test_percentile_interpolates_between_ranks() -> None:
+    assert percentile([], 95) == 0.0
+    assert percentile([3.0, 1.0, 2.0], 50) == 2.0
+    assert percentile([0.0, 10.0], 95) == 9.5
+
+
+def test_in_process_load_test_reports_every_level(tmp_path: Path) -> None:
+    settings = Settings(processed_data_dir=tmp_path, collection_name="load_test_chunks", emb_vector_size=64)
+    service = build_service(settings, stub_embedder=True, qdrant=":memory:")
+    summary = seed_index(service, settings, messages=400, seed=3)
+    chunks = load_chunks_jsonl(settings.chunks_jsonl_path)
+    assert summary["chunk_count"] == len(chunks) > 0
+
+    requests = question_mix(Path("app/eval/dataset.example.json"), chunks, count=30, seed=3, filter_ratio=0.5)
+    assert any(r.topic or r.date_from or r.top_k != 10 for r in requests)
+
+    levels = run_load_test(in_process_sender(service), requests, levels=[1, 4], warmup=2)
+
+    assert [level["concurrency"] for level in levels] == [1, 4]
+    for level in levels:
+        assert level["requests"] == 30
+        assert level["error_rate"] == 0.0
+        assert level["qps"] > 0
+        assert 0 < level["p50_ms"] <= level["p95_ms"] <= level["p99_ms"]
+        assert 0.0 <= level["abstain_rate"] <= 1.0
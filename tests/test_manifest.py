@@ -0,0 +1,167 @@
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from app.api import routes_admin
+from app.api.main import app
+from app.core.config import Settings
+from app.rag.manifest import (
+    empty_manifest,
+    load_manifest,
+    record_chat_deleted,
+    record_ingest,
+    update_manifest,
+    write_manifest,
+)
+from app.rag.schema import ChunkRecord, NormalizedMessage
+
+
+def _message(chat_id: str, message_id: str, created_at: str, topic: str) -> NormalizedMessage:
+    return NormalizedMessage(
+        chat_id=chat_id,
+        chat_title=f"title {chat_id}",
+        message_id=message_id,
+        created_at=created_at,
+        text="hello",
+        topic=topic,
+        source="chatgpt_export_json",
+    )
+
+
+def _chunk(chat_id: str, chunk_id: str, topic: str) -> ChunkRecord:
+    return ChunkRecord(chunk_id=chunk_id, chat_id=chat_id, message_ids=["m"], topic=topic, text="hello")
+
+
+def _ingested_manifest(tmp_path: Path) -> dict:
+    messages = [
+        _message("chat-1", "m1", "2024-01-01T00:00:00Z", "python"),
+        _message("chat-1", "m2", "2024-01-02T00:00:00Z", "python"),
+        _message("chat-2", "m3", "2024-03-01T00:00:00Z", "devops"),
+    ]
+    chunks = [_chunk("chat-1", "c1", "python"), _chunk("chat-1", "c2", "python"), _chunk("chat-2", "c3", "devops")]
+    return record_ingest(
+        empty_manifest(),
+        messages=messages,
+        chunks=chunks,
+        messages_path=tmp_path / "messages.jsonl",
+        chunks_path=tmp_path / "chunks.jsonl",
+        input_path=tmp_path / "export.json",
+        timings_ms={"parse": 1.0},
+    )
+
+
+def test_ingest_and_delete_maintain_counts(tmp_path: Path) -> None:
+    manifest = _ingested_manifest(tmp_path)
+
+    assert manifest["messages_count"] == 3
+    assert manifest["chunks_count"] == 3
+    assert manifest["indexed_chunks_count"] == 3
+    assert manifest["topics"]["python"] == {"chats": 1, "messages": 2, "chunks": 2, "indexed_chunks": 2}
+    assert manifest["date_range"] == {"start": "2024-01-01T00:00:00Z", "end": "2024-03-01T00:00:00Z"}
+    assert manifest["index_generation"] == 1
+
+    path = tmp_path / "manifest.json"
+    write_manifest(path, manifest)
+    updated = update_manifest(
+        path,
+        tmp_path / "messages.jsonl",
+        tmp_path / "chunks.jsonl",
+        lambda m: record_chat_deleted(m, "chat-1"),
+    )
+
+    # chat-1's chunks are tombstoned, so it drops out of every count, not just the indexed ones.
+    assert updated["messages_count"] == 1
+    assert updated["chunks_count"] == 1
+    assert updated["indexed_chunks_count"] == 1
+    assert "python" not in updated["topics"]
+    assert updated["garbage_chunks"] == 2
+    assert updated["index_generation"] == 2
+    assert "chat-1" not in load_manifest(path)["chats"]
+
+
+class FakeStore:
+    def stats(self):
+        return {"collection_name": "chat_chunks", "points_count": 3, "indexed_vectors_count": 3}
+
+
+class FakeService:
+    store = FakeStore()
+
+
+def test_stats_endpoint_reads_manifest(monkeypatch, tmp_path: Path) -> None:
+    settings = Settings(processed_data_dir=tmp_path)
+    write_manifest(settings.manifest_path, _ingested_manifest(tmp_path))
+    monkeypatch.setattr(routes_admin, "_settings", lambda: settings)
+    monkeypatch.setattr(routes_admin, "_service", lambda: FakeService())
+    client = TestClient(app)
+
+    response = client.get("/admin/stats")
+    assert response.status_code == 200
+    payload = response.json()
+    assert payload["messages_count"] == 3
+    assert payload["chat_count"] == 2
+    assert payload["topics"]["devops"]["chunks"] == 1
+    assert payload["chats"] is None
+
+
+def test_empty_reindex_with_reset_records_the_reset(tmp_path: Path) -> None:
+    from app.rag.pipeline import run_reindex
+
+    class ResettableStore:
+        def create_collection(self, reset: bool = False) -> None:
+            self.reset = reset
+
+    class Service:
+        store = ResettableStore()
+
+    settings = Settings(processed_data_dir=tmp_path)
+    write_manifest(settings.manifest_path, _ingested_manifest(tmp_path))
+
+    result = run_reindex(Service(), settings, tmp_path / "missing.jsonl", reset_collection=True)
+
+    assert result["indexed_chunks"] == 0
+    manifest = load_manifest(settings.manifest_path)
+    assert manifest["indexed_chunks_count"] == 0
+    assert manifest["chunks_count"] == 3
+    assert manifest["index_generation"] == 2
+
+
+def test_cancelled_ingest_leaves_processed_files_untouched(tmp_path: Path) -> None:
+    import json
+
+    import pytest
+
+    from app.rag.jobs import JobCancelled
+    from app.rag.pipeline import PipelineProgress, run_ingest
+
+    class CancelAtIndex(PipelineProgress):
+        def stage(self, name: str, total: int | None = None) -> None:
+            if name == "index":
+                raise JobCancelled("cancelled")
+
+    class Store:
+        def create_collection(self, reset: bool = False) -> None:
+            pass
+
+    class Service:
+        store = Store()
+        embedder = None
+
+    settings = Settings(processed_data_dir=tmp_path, emb_pool_workers=1, max_chunk_tokens=50)
+    settings.messages_jsonl_path.write_text("previous messages\n", encoding="utf-8")
+    settings.chunks_jsonl_path.write_text("previous chunks\n", encoding="utf-8")
+    export = tmp_path / "export.json"
+    message = {"id": "msg-a", "author": {"role": "user"}, "content": {"parts": ["hello there"]}}
+    export.write_text(
+        json.dumps([{"id": "chat-1", "title": "t", "mapping": {"a": {"id": "a", "message": message}}}]),
+        encoding="utf-8",
+    )
+
+    with pytest.raises(JobCancelled):
+        run_ingest(
+            Service(), settings, export, allowlist_it_only=False, exclude_title_keywords=[], progress=CancelAtIndex()
+        )
+
+    assert settings.messages_jsonl_path.read_text(encoding="utf-8") == "previous messages\n"
+    assert settings.chunks_jsonl_path.read_text(encoding="utf-8") == "previous chunks\n"
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["chunks.jsonl", "export.json", "messages.jsonl"]
@@ -0,0 +1,59 @@
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from app.api import routes_admin
+from app.api.main import app
+from app.bench.load_test import build_service
+from app.bench.synthetic_export import ExportSpec, write_export
+from app.core.config import Settings
+from app.core.memory import MemoryTracker
+from app.rag.pipeline import run_ingest
+
+
+def test_tracker_reports_peak_retained_and_allocation_sites() -> None:
+    tracker = MemoryTracker(trace=True, top_n=5).start()
+    try:
+        with tracker.stage("build"):
+            kept = [str(idx) * 20 for idx in range(50_000)]
+        with tracker.stage("scratch"):
+            scratch = [bytes(1000) for _ in range(5_000)]
+            del scratch
+    finally:
+        tracker.stop()
+
+    report = tracker.report()
+    build, scratch = report["stages"]["build"], report["stages"]["scratch"]
+    assert build["retained_mb"] > 1 and build["peak_mb"] >= build["retained_mb"]
+    assert scratch["peak_mb"] > 4 and scratch["retained_mb"] < 1
+    assert any("test_memory.py" in site["site"] for site in report["top_allocations"])
+    assert len(kept) == 50_000
+
+
+def test_ingest_summary_and_admin_endpoint_report_memory(tmp_path: Path, monkeypatch) -> None:
+    settings = Settings(processed_data_dir=tmp_path, emb_vector_size=32, memory_trace_ingest=True, hybrid_keyword=True)
+    service = build_service(settings, stub_embedder=True, qdrant=":memory:")
+    write_export(tmp_path / "export.json", ExportSpec(messages=300, seed=5))
+
+    summary = run_ingest(
+        service, settings, tmp_path / "export.json", allowlist_it_only=False, exclude_title_keywords=[]
+    )
+
+    stages = summary["memory"]["stages"]
+    assert list(stages) == [
+        "read", "redact", "topics", "filter", "write_messages", "load_messages", "chunk", "index", "chunk_store",
+        "message_index",
+    ]
+    assert all("peak_mb" in stage and "retained_mb" in stage for stage in stages.values())
+    assert summary["memory"]["top_allocations"]
+
+    service.retriever.retrieve("docker restart error", top_k=5)  # loads the keyword corpus
+    monkeypatch.setattr(routes_admin, "_service", lambda: service)
+    monkeypatch.setattr(routes_admin, "_settings", lambda: settings)
+    payload = TestClient(app).get("/admin/memory").json()
+
+    assert payload["process"]["rss_mb"] > 0
+    assert payload["serving"]["keyword_corpus"]["chunks"] == summary["chunk_count"]
+    assert payload["serving"]["keyword_corpus"]["approx_mb"] > 0
+    assert payload["serving"]["keyword_corpus"]["mapped"] is True
+    assert payload["last_runs"]["ingest"]["stages"].keys() == stages.keys()
@@ -0,0 +1,94 @@
+import os
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from app.api import routes_chat
+from app.api.main import app
+from app.bench.load_test import build_service
+from app.core.config import Settings
+from app.rag.ingest.export_reader import _write_jsonl
+from app.rag.message_index import build_message_index, index_dir, open_message_index
+from app.rag.records import MessageRecord
+
+
+def _records() -> list[MessageRecord]:
+    records = []
+    for idx in range(6):
+        for chat in ("chat-a", "chat-b"):
+            records.append(
+                MessageRecord(
+                    chat_id=chat,
+                    chat_title=f"{chat} title",
+                    message_id=f"{chat}-m{idx}",
+                    parent_message_id=None,
+                    role="user" if idx % 2 == 0 else "assistant",
+                    # File order differs from conversation order; the last message has no timestamp.
+                    created_at=f"2024-03-0{6 - idx}T10:00:00Z" if idx < 5 else None,
+                    text=f"{chat} message {idx} ✓",
+                )
+            )
+    records.append(MessageRecord("chat-b", "chat-b title", "shared-id", None, "user", "2024-03-09T10:00:00Z", "b"))
+    records.append(MessageRecord("chat-a", "chat-a title", "shared-id", None, "user", "2024-03-09T10:00:00Z", "a"))
+    return records
+
+
+def test_index_reads_messages_and_chat_windows_in_conversation_order(tmp_path: Path) -> None:
+    path = tmp_path / "messages.jsonl"
+    records = _records()
+    _write_jsonl(path, records)
+    build_message_index(path, records)
+    index = open_message_index(path)
+
+    assert len(index) == len(records)
+    assert index.message("chat-b-m3") == records[7].to_model()
+    assert index.message("missing") is None
+
+    messages, total = index.chat_window("chat-a", around="chat-a-m2", window=1)
+    assert total == 7
+    assert [m.message_id for m in messages] == ["chat-a-m3", "chat-a-m2", "chat-a-m1"]
+    messages, _ = index.chat_window("chat-a", around=None, window=1)
+    assert [m.message_id for m in messages] == ["chat-a-m4", "chat-a-m3", "chat-a-m2"]
+    messages, _ = index.chat_window("chat-a", around="chat-a-m5", window=2)
+    assert [m.message_id for m in messages] == ["chat-a-m0", "shared-id", "chat-a-m5"]
+    assert messages[1].text == "a"
+
+    assert index.chat_window("chat-a", around="chat-b-m1", window=1) is None
+    assert index.chat_window("chat-z", around=None, window=1) is None
+
+
+def test_stale_index_is_rebuilt_while_open_indexes_keep_their_file(tmp_path: Path) -> None:
+    path = tmp_path / "messages.jsonl"
+    records = _records()
+    _write_jsonl(path, records)
+    old = open_message_index(path)
+    assert index_dir(path).exists() and len(old) == len(records)
+
+    # Ingest swaps new files in with os.replace rather than rewriting them in place.
+    _write_jsonl(tmp_path / "next.jsonl", records[:2])
+    os.replace(tmp_path / "next.jsonl", path)
+    new = open_message_index(path)
+
+    assert len(new) == 2 and new.message("chat-a-m3") is None
+    assert old.message("chat-a-m3") == records[6].to_model()
+
+
+def test_message_endpoints_seek_into_messages_jsonl(tmp_path: Path, monkeypatch) -> None:
+    settings = Settings(processed_data_dir=tmp_path, emb_vector_size=8)
+    service = build_service(settings, stub_embedder=True, qdrant=":memory:")
+    monkeypatch.setattr(routes_chat, "get_chat_service", lambda: service)
+    client = TestClient(app)
+
+    assert client.get("/messages/chat-a-m1").status_code == 404
+    _write_jsonl(settings.messages_jsonl_path, _records())
+
+    response = client.get("/messages/chat-a-m1")
+    assert response.status_code == 200
+    assert response.json()["text"] == "chat-a message 1 ✓"
+
+    payload = client.get("/chats/chat-b/messages", params={"around": "chat-b-m0", "window": 1}).json()
+    assert (payload["total"], payload["around"]) == (7, "chat-b-m0")
+    assert [m["message_id"] for m in payload["messages"]] == ["chat-b-m1", "chat-b-m0", "shared-id"]
+
+    assert client.get("/chats/chat-b/messages", params={"around": "chat-a-m0"}).status_code == 404
+    assert client.get("/chats/chat-b/messages", params={"window": 500}).status_code == 422
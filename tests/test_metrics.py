@@ -0,0 +1,126 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+from fastapi.testclient import TestClient
+from qdrant_client import QdrantClient
+
+from app.api import routes_chat
+from app.api.main import app
+from app.api.routes_chat import ChatService
+from app.core.config import Settings
+from app.core.metrics import Registry, render_metrics
+from app.rag.pipeline import record_index_points
+from app.rag.schema import AskRequest, ChunkRecord
+
+
+class FakeEmbedder:
+    def embed_query(self, text: str) -> np.ndarray:
+        return np.array([1.0, 0.0, 0.0], dtype=np.float32)
+
+
+def test_registry_renders_prometheus_text() -> None:
+    registry = Registry()
+    requests = registry.counter("demo_requests_total", "Requests", ["route"])
+    latency = registry.histogram("demo_latency_seconds", "Latency", buckets=(0.1, 1.0))
+    size = registry.gauge("demo_size", "Size")
+
+    requests.inc(route="/ask")
+    requests.inc(2, route="/ask")
+    latency.observe(0.05)
+    latency.observe(0.1)
+    latency.observe(3.0)
+    size.set(7)
+
+    text = registry.render()
+    assert '# TYPE demo_requests_total counter\ndemo_requests_total{route="/ask"} 3' in text
+    assert 'demo_latency_seconds_bucket{le="0.1"} 2' in text
+    assert 'demo_latency_seconds_bucket{le="1"} 2' in text
+    assert 'demo_latency_seconds_bucket{le="+Inf"} 3' in text
+    assert "demo_latency_seconds_sum 3.15" in text
+    assert "demo_latency_seconds_count 3" in text
+    assert "demo_size 7" in text
+
+
+def test_histogram_observe_is_cheap() -> None:
+    histogram = Registry().histogram("hot_path_seconds", "Hot path", ["stage"])
+    started = perf_counter()
+    for _ in range(20_000):
+        histogram.observe(0.003, stage="embed")
+    per_call_us = (perf_counter() - started) / 20_000 * 1e6
+    assert histogram.count(stage="embed") == 20_000
+    assert per_call_us < 50
+
+
+def test_metrics_endpoint_exposes_ask_stages_and_index_gauges(tmp_path: Path, monkeypatch) -> None:
+    settings = Settings(processed_data_dir=tmp_path, emb_vector_size=3)
+    service = ChatService(settings)
+    service.retriever.embedder = FakeEmbedder()
+    service.store.client = QdrantClient(location=":memory:")
+    service.store.create_collection(reset=False)
+    chunk = ChunkRecord(chunk_id="00000000-0000-0000-0000-000000000001", chat_id="c", message_ids=["m"], text="x")
+    service.store.upsert_chunks([chunk], np.array([[0.0, 1.0, 0.0]], dtype=np.float32))
+    record_index_points(service.store)
+    monkeypatch.setattr(routes_chat, "get_chat_service", lambda: service)
+
+    def stats_on_scrape():
+        raise AssertionError("/metrics must not query Qdrant")
+
+    monkeypatch.setattr(service.store, "stats", stats_on_scrape)
+
+    # Orthogonal vectors score 0, so this takes the insufficient-context path.
+    service.ask(AskRequest(question="unrelated"))
+    response = TestClient(app).get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    assert 'rag_ask_duration_seconds_count{mode="extractive"}' in text
+    for stage in ("retrieve", "embed", "vector_search", "answer"):
+        assert f'rag_stage_duration_seconds_count{{stage="{stage}"}}' in text
+    assert "rag_abstain_total " in text
+    assert "rag_index_points 1" in text
+
+
+def _demo_registry() -> Registry:
+    registry = Registry()
+    registry.counter("demo_requests_total", "Requests", ["route"])
+    registry.histogram("demo_latency_seconds", "Latency", buckets=(0.1, 1.0))
+    registry.gauge("demo_size", "Size")
+    return registry
+
+
+def test_render_merges_snapshots_of_other_processes() -> None:
+    here, worker = _demo_registry(), _demo_registry()
+    here._metrics["demo_requests_total"].inc(route="/ask")
+    here._metrics["demo_latency_seconds"].observe(0.05)
+    here._metrics["demo_size"].set(1)
+    worker._metrics["demo_requests_total"].inc(4, route="/ask")
+    worker._metrics["demo_latency_seconds"].observe(3.0)
+    worker._metrics["demo_size"].set(9)
+
+    # Snapshots travel through JSON files, so round-trip them the same way.
+    text = here.render([json.loads(json.dumps(worker.snapshot()))])
+
+    assert 'demo_requests_total{route="/ask"} 5' in text
+    assert 'demo_latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'demo_latency_seconds_bucket{le="+Inf"} 2' in text
+    assert "demo_latency_seconds_count 2" in text
+    # Gauges keep the most recently set value across processes.
+    assert "demo_size 9" in text
+
+
+def test_script_counters_reach_the_api_through_metrics_dir(tmp_path: Path) -> None:
+    code = (
+        "from pathlib import Path\n"
+        "from app.core.metrics import INDEXED_ITEMS, enable_snapshots\n"
+        f"enable_snapshots(Path({str(tmp_path)!r}), 'ingest')\n"
+        "INDEXED_ITEMS.inc(1234, kind='synthetic', item='chunks')\n"
+    )
+    subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).resolve().parents[1], check=True)
+
+    assert [path.name.split("-")[0] for path in tmp_path.glob("*.json")] == ["ingest"]
+    assert 'rag_indexed_items_total{kind="synthetic",item="chunks"} 1234' in render_metrics(tmp_path)
@@ -0,0 +1,45 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.rag.onnx_embedder import l2_normalize, mean_pool
+
+
+def test_mean_pool_ignores_padding_tokens() -> None:
+    tokens = np.array([[[1.0, 2.0], [3.0, 4.0], [100.0, 100.0]]], dtype=np.float32)
+    mask = np.array([[1, 1, 0]])
+
+    pooled = mean_pool(tokens, mask)
+
+    assert pooled.tolist() == [[2.0, 3.0]]
+    assert np.allclose(np.linalg.norm(l2_normalize(pooled), axis=1), 1.0)
+
+
+@pytest.mark.parametrize("quantized", [False, True])
+def test_onnx_backend_matches_torch_backend(tmp_path: Path, quantized: bool) -> None:
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("tokenizers")
+    pytest.importorskip("sentence_transformers")
+    from app.core.config import Settings
+    from app.rag.embeddings import LocalEmbedder
+    from app.rag.onnx_embedder import export_onnx
+
+    model_name = Settings().emb_model_name
+    try:
+        export_onnx(model_name, tmp_path, quantize=quantized)
+    except OSError as exc:  # model not cached and no network
+        pytest.skip(f"embedding model unavailable: {exc}")
+
+    texts = [
+        "How do I run FastAPI with uvicorn?",
+        "```python\nimport numpy as np\nprint(np.zeros(3))\n```",
+        "Qdrant stores the vectors in a collection with cosine distance.",
+    ]
+    torch_vectors = LocalEmbedder(model_name).embed_texts(texts)
+    onnx_embedder = LocalEmbedder(model_name, backend="onnx", onnx_dir=tmp_path, onnx_quantized=quantized)
+    onnx_vectors = onnx_embedder.embed_texts(texts)
+
+    cosine = (torch_vectors * onnx_vectors).sum(axis=1)
+    assert onnx_vectors.shape == torch_vectors.shape
+    assert cosine.min() > 0.99
@@ -0,0 +1,70 @@
+from pathlib import Path
+from time import perf_counter
+
+from fastapi.testclient import TestClient
+
+from app.api import routes_admin, routes_chat
+from app.api.main import app
+from app.core.config import Settings
+from app.core.profiling import list_profiles, profiled
+from app.rag.schema import AskResponse
+
+
+def _busy_loop(seconds: float) -> int:
+    total = 0
+    deadline = perf_counter() + seconds
+    while perf_counter() < deadline:
+        total += sum(range(200))
+    return total
+
+
+def test_profile_writes_stats_collapsed_stacks_and_summary(tmp_path: Path) -> None:
+    with profiled("unit", tmp_path, interval_ms=1, label="x") as profile:
+        assert profile is not None
+        # A second profile in the same process is skipped rather than nested.
+        with profiled("nested", tmp_path) as nested:
+            assert nested is None
+        _busy_loop(0.1)
+
+    [summary] = list_profiles(tmp_path)
+    assert summary["name"] == "unit" and summary["label"] == "x"
+    assert summary["samples"] > 0 and summary["duration_ms"] >= 100
+    assert any("_busy_loop" in row["function"] for row in summary["top_functions"])
+    collapsed = (tmp_path / summary["files"]["collapsed"]).read_text(encoding="utf-8")
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in collapsed.splitlines())
+    assert "_busy_loop (test_profiling.py" in collapsed
+    assert (tmp_path / summary["files"]["stats"]).stat().st_size > 0
+
+
+def test_profiles_are_pruned_to_the_newest(tmp_path: Path) -> None:
+    for _ in range(4):
+        with profiled("unit", tmp_path, keep=2):
+            pass
+    assert len(list_profiles(tmp_path)) == 2
+    assert len(list(tmp_path.iterdir())) == 6
+
+
+class FakeChatService:
+    def ask(self, request):
+        _busy_loop(0.02)
+        return AskResponse(answer="ok", citations=[], confidence=0.9, latency_ms=20.0)
+
+
+def test_ask_header_profiles_the_request_and_admin_lists_it(tmp_path: Path, monkeypatch) -> None:
+    settings = Settings(profile_header=True, profile_dir=tmp_path, profile_interval_ms=1)
+    monkeypatch.setattr(routes_chat, "get_chat_service", lambda: FakeChatService())
+    monkeypatch.setattr(routes_chat, "get_settings", lambda: settings)
+    monkeypatch.setattr(routes_admin, "_settings", lambda: settings)
+    client = TestClient(app)
+
+    assert client.post("/ask", json={"question": "hello"}).status_code == 200
+    assert list_profiles(tmp_path) == []
+
+    assert client.post("/ask", json={"question": "hello"}, headers={"X-Profile": "1"}).status_code == 200
+    listed = client.get("/admin/profiles").json()["profiles"]
+    assert [profile["name"] for profile in listed] == ["ask"]
+    assert listed[0]["latency_ms"] == 20.0
+
+    collapsed = client.get(f"/admin/profiles/{listed[0]['id']}/collapsed")
+    assert collapsed.status_code == 200 and "_busy_loop" in collapsed.text
+    assert client.get("/admin/profiles/missing/stats").status_code == 404
@@ -0,0 +1,47 @@
+from pathlib import Path
+
+from app.rag.ingest.export_reader import _write_jsonl, load_message_records, load_messages_jsonl
+from app.rag.ingest.parser_chatgpt_json import parse_chatgpt_json
+from app.rag.records import MessageRecord
+from app.rag.schema import NormalizedMessage
+
+
+def _payload() -> list[dict]:
+    return [
+        {
+            "id": "".join(["chat", "-1"]),
+            "title": "".join(["docker ", "notes"]),
+            "messages": [
+                {"id": "m1", "role": "user", "content": {"parts": ["why does the container exit"]}},
+                {
+                    "id": "m2",
+                    "role": "assistant",
+                    "content": {"parts": ["check the entrypoint", {"content_type": "image", "name": "a.png"}]},
+                },
+            ],
+        }
+    ]
+
+
+def test_parsed_records_share_interned_chat_fields() -> None:
+    first, second = parse_chatgpt_json(_payload())
+
+    assert isinstance(first, MessageRecord)
+    assert not hasattr(first, "__dict__")
+    assert first.chat_id is second.chat_id
+    assert first.chat_title is second.chat_title
+    assert first.attachments is MessageRecord("c", None, "m", None, "user", None, "t").attachments
+    assert second.attachments == [{"type": "image", "name": "a.png", "caption": None}]
+
+
+def test_records_round_trip_through_messages_jsonl(tmp_path: Path) -> None:
+    records = parse_chatgpt_json(_payload())
+    path = tmp_path / "messages.jsonl"
+    _write_jsonl(path, records)
+
+    assert load_message_records(path) == records
+    assert load_message_records(path, validate=True) == records
+    models = load_messages_jsonl(path)
+    assert models == [record.to_model() for record in records]
+    assert models[0].attachments == [] and isinstance(models[0], NormalizedMessage)
+    assert [MessageRecord.from_model(model) for model in models] == records
@@ -0,0 +1,112 @@
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from app.api import routes_chat
+from app.api.main import app
+from app.api.routes_chat import ChatService
+from app.core.config import Settings
+
+ROOT = Path(__file__).resolve().parents[1]
+HEAVY_MODULES = ("qdrant_client", "tiktoken", "bs4", "openai", "sentence_transformers", "torch", "onnxruntime")
+
+
+class FakeEmbedder:
+    def __init__(self, dim: int) -> None:
+        self.dim = dim
+        self.calls = 0
+
+    def embed_query(self, text: str) -> np.ndarray:
+        self.calls += 1
+        return np.zeros(self.dim, dtype=np.float32)
+
+
+class FlakyClient:
+    def __init__(self, failures: int) -> None:
+        self.failures = failures
+
+    def get_collections(self):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("qdrant not up yet")
+        return []
+
+
+class GatedClient:
+    """Qdrant stand-in that is down until ``up`` is set."""
+
+    def __init__(self) -> None:
+        self.up = threading.Event()
+
+    def get_collections(self):
+        if not self.up.is_set():
+            raise ConnectionError("qdrant not up yet")
+        return []
+
+
+def _service(failures: int, retries: int = 3, backoff_s: float = 0.0) -> ChatService:
+    settings = Settings(emb_vector_size=4, warmup_retries=retries, warmup_backoff_s=backoff_s)
+    service = ChatService(settings)
+    service.embedder = FakeEmbedder(dim=4)
+    service.store.client = FlakyClient(failures)
+    return service
+
+
+def test_importing_api_does_not_load_heavy_dependencies() -> None:
+    code = (
+        "import sys, time\n"
+        "started = time.perf_counter()\n"
+        "import app.api.main\n"
+        "elapsed = time.perf_counter() - started\n"
+        f"loaded = [name for name in {HEAVY_MODULES!r} if name in sys.modules]\n"
+        "print(repr((loaded, elapsed)))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    loaded, elapsed = eval(result.stdout.strip().splitlines()[-1])
+    assert loaded == []
+    # Generous bound: catches a heavy import sneaking back in, not machine noise.
+    assert elapsed < 3.0
+
+
+def test_warmup_retries_vector_store_and_reports_ready() -> None:
+    service = _service(failures=2)
+    assert service.readiness()["status"] == "not_ready"
+
+    service.warmup()
+
+    readiness = service.readiness()
+    assert readiness["status"] == "ready"
+    assert readiness["components"]["embedder"]["status"] == "ready"
+    assert readiness["components"]["vector_store"]["status"] == "ready"
+    assert service.embedder.calls == 1
+
+
+def test_ready_endpoint_returns_503_until_components_are_ready(monkeypatch) -> None:
+    service = _service(failures=0, retries=2, backoff_s=0.01)
+    qdrant = service.store.client = GatedClient()
+    monkeypatch.setattr(routes_chat, "get_chat_service", lambda: service)
+    client = TestClient(app)
+
+    response = client.get("/ready")
+    assert response.status_code == 503
+
+    service.warmup()
+    response = client.get("/ready")
+    assert response.status_code == 503
+    payload = response.json()
+    assert payload["components"]["embedder"]["status"] == "ready"
+    assert payload["components"]["vector_store"]["status"] == "failed"
+    assert "qdrant not up yet" in payload["components"]["vector_store"]["error"]
+    assert client.get("/health").status_code == 200
+
+    # A failed component keeps being re-probed in the background.
+    qdrant.up.set()
+    deadline = time.monotonic() + 5
+    while client.get("/ready").status_code != 200:
+        assert time.monotonic() < deadline, "vector store never recovered"
+        time.sleep(0.02)
@@ -0,0 +1,95 @@
+import json
+import logging
+from pathlib import Path
+
+import numpy as np
+from qdrant_client import QdrantClient
+
+from app.api.routes_chat import ChatService
+from app.core.config import Settings
+from app.core.metrics import ASK_DURATION
+from app.core.tracing import span, tracing
+from app.rag.chunking import write_chunks_jsonl
+from app.rag.schema import AskRequest, ChunkRecord
+
+
+class FakeEmbedder:
+    def embed_query(self, text: str) -> np.ndarray:
+        return np.array([1.0, 0.0, 0.0], dtype=np.float32)
+
+
+def _chunk(idx: int, text: str) -> ChunkRecord:
+    return ChunkRecord(
+        chunk_id=f"00000000-0000-0000-0000-00000000000{idx}", chat_id=f"chat-{idx}", message_ids=["m"], text=text
+    )
+
+
+def _service(tmp_path: Path) -> ChatService:
+    settings = Settings(processed_data_dir=tmp_path, emb_vector_size=3, hybrid_keyword=True, enable_rerank=True)
+    service = ChatService(settings)
+    service.retriever.embedder = FakeEmbedder()
+    service.store.client = QdrantClient(location=":memory:")
+    service.store.create_collection(reset=False)
+    chunks = [_chunk(1, "docker compose networking"), _chunk(2, "python packaging")]
+    service.store.upsert_chunks(chunks, np.array([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]], dtype=np.float32))
+    write_chunks_jsonl(settings.chunks_jsonl_path, chunks)
+    return service
+
+
+def test_span_is_a_noop_without_active_trace() -> None:
+    with span("orphan", items=1) as counts:
+        counts["more"] = 2
+    with tracing(False) as trace:
+        assert trace is None
+
+
+def test_traced_ask_reports_stage_spans_and_logs_json(tmp_path: Path, caplog) -> None:
+    service = _service(tmp_path)
+    assert service.ask(AskRequest(question="docker networking")).timings is None
+
+    with caplog.at_level(logging.INFO, logger="app.core.tracing"):
+        response = service.ask(AskRequest(question="docker networking", trace=True))
+
+    spans = {item.name: item for item in response.timings}
+    assert {"retrieve", "embed", "vector_search", "keyword_search", "merge", "rerank", "answer"} <= set(spans)
+    assert spans["embed"].parent == "retrieve"
+    assert spans["answer"].parent is None
+    assert spans["vector_search"].counts["round_trips"] == 1
+    assert spans["vector_search"].counts["hits"] == 2
+    # The first untraced ask loaded the keyword corpus; this one reuses it.
+    assert spans["keyword_search"].counts["cache_hit"] is True
+    assert spans["keyword_search"].counts["candidates_scanned"] == 2
+    assert spans["keyword_search"].counts["matches"] == 1
+    assert all(item.duration_ms >= 0 for item in response.timings)
+
+    logged = json.loads(caplog.records[-1].getMessage())
+    assert logged["event"] == "ask"
+    assert [item["name"] for item in logged["spans"]] == [item.name for item in response.timings]
+
+
+def test_traced_stream_reports_spans_and_records_ask_latency(tmp_path: Path) -> None:
+    service = _service(tmp_path)
+    before = ASK_DURATION.count(mode="extractive")
+
+    body = "".join(service.ask_stream(AskRequest(question="docker networking", trace=True)))
+
+    blocks = [dict(line.split(": ", 1) for line in block.splitlines()) for block in body.strip().split("\n\n")]
+    assert blocks[-1]["event"] == "done"
+    done = json.loads(blocks[-1]["data"])
+    spans = {item["name"]: item for item in done["timings"]}
+    assert {"retrieve", "embed", "vector_search", "keyword_search"} <= set(spans)
+    assert spans["embed"]["parent"] == "retrieve"
+    assert ASK_DURATION.count(mode="extractive") == before + 1
+
+
+def test_keyword_corpus_reloads_when_chunks_file_changes(tmp_path: Path) -> None:
+    service = _service(tmp_path)
+    retriever = service.retriever
+
+    corpus, cache_hit = retriever._keyword_corpus()
+    assert (len(corpus), cache_hit) == (2, False)
+    assert retriever._keyword_corpus()[1] is True
+
+    write_chunks_jsonl(service.settings.chunks_jsonl_path, [_chunk(3, "kubernetes ingress controller setup")])
+    corpus, cache_hit = retriever._keyword_corpus()
+    assert (len(corpus), cache_hit) == (1, False)